@@ -0,0 +1,256 @@
+"""
+Catalog version counters and change propagation.
+
+Every CRUD write bumps a per-table version inside the writing transaction and,
+on PostgreSQL, emits a NOTIFY on the same transaction so the event is only
+delivered if the write commits. A background listener in each app process
+keeps a local copy of the versions, so caches (statistics, embedding indexes,
+exports) can key on `get_catalog_version()` and invalidate precisely instead
+of relying on TTLs.
+"""
+import logging
+import select
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from TeacherLibrary.data.database import primary_reads
+from TeacherLibrary.models.schemas import CatalogVersion, DatabaseIdentity
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "catalog_changes"
+
+ChangeCallback = Callable[[str, int], None]
+
+
+def bump_catalog_version(db: Session, table_name: str) -> int:
+    """
+    Increment the version of a table within the current transaction.
+
+    The upsert row-locks the counter until commit, so concurrent writers to
+    the same table serialize on it and versions never go backwards. Call it
+    after the transaction's row writes have reached the database (flush
+    first), so every writer locks rows before the counter and two writers
+    cannot deadlock on opposite lock orders.
+
+    Returns:
+        The new version number
+    """
+    version = db.execute(
+        text(
+            "INSERT INTO catalog_versions (table_name, version) VALUES (:table_name, 1) "
+            "ON CONFLICT (table_name) DO UPDATE "
+            "SET version = catalog_versions.version + 1 "
+            "RETURNING version"
+        ),
+        {"table_name": table_name},
+    ).scalar_one()
+
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": f"{table_name}:{version}"},
+        )
+    db.info.setdefault("pending_catalog_versions", {})[table_name] = version
+    return version
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_versions(db: Session):
+    # Apply our own writes locally right away instead of waiting for the
+    # NOTIFY round-trip, so the rerun after a write never sees a stale version
+    pending = db.info.pop("pending_catalog_versions", None)
+    listener = _listener
+    if pending and listener is not None:
+        for table_name, version in pending.items():
+            listener._apply(table_name, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_versions(db: Session):
+    db.info.pop("pending_catalog_versions", None)
+
+
+def fetch_catalog_versions(db: Session) -> Dict[str, int]:
+    """Read all table versions from the database."""
+    return {row.table_name: row.version for row in db.query(CatalogVersion).all()}
+
+
+def read_catalog_version(db: Session, table_name: str, for_update: bool = False) -> int:
+    """
+    Read the version of a table from the primary, bypassing the listener's copy.
+
+    A replica may lag behind, and a stale version would let stale data pass
+    as current. With for_update the counter row stays locked until the
+    transaction ends, so no other writer can bump it in the meantime.
+    """
+    query = select(CatalogVersion.version).where(CatalogVersion.table_name == table_name)
+    if for_update:
+        query = query.with_for_update()
+    with primary_reads(db):
+        return db.scalar(query) or 0
+
+
+def get_catalog_version(db: Session, table_name: str) -> int:
+    """
+    Get the current version of a table.
+
+    Served from the listener's local copy when it is running, otherwise
+    read from the primary (a primary-key lookup). Read the data cached under
+    the version inside `primary_reads(db)` too, so it cannot trail it.
+    """
+    listener = _listener
+    if listener is not None and listener.connected.is_set():
+        return listener.versions.get(table_name, 0)
+    return read_catalog_version(db, table_name)
+
+
+def create_database_id(db) -> None:
+    """Store a random database id unless one exists (db: Session or Connection)."""
+    db.execute(
+        text(
+            "INSERT INTO database_identity (id, database_id) VALUES (1, :database_id) "
+            "ON CONFLICT (id) DO NOTHING"
+        ),
+        {"database_id": uuid.uuid4().hex},
+    )
+
+
+def get_database_id(db: Session) -> str:
+    """
+    Get the random id of the database behind a session.
+
+    init_db creates it; for a database set up otherwise it is created in the
+    current transaction.
+    """
+    row = db.get(DatabaseIdentity, 1)
+    if row is None:
+        create_database_id(db)
+        row = db.get(DatabaseIdentity, 1)
+    return row.database_id
+
+
+class CatalogChangeListener(threading.Thread):
+    """Background thread that LISTENs for catalog change notifications."""
+
+    def __init__(self, engine, poll_timeout: float = 5.0):
+        """Initialize the listener for an engine."""
+        super().__init__(name="catalog-change-listener", daemon=True)
+        self.engine = engine
+        self.poll_timeout = poll_timeout
+        # Written by this thread and, after their commits, by request threads
+        self.versions: Dict[str, int] = {}
+        self._versions_lock = threading.Lock()
+        self._callbacks: List[ChangeCallback] = []
+        self._stop_event = threading.Event()
+        # Set while LISTENing with an up-to-date local copy of the versions
+        self.connected = threading.Event()
+
+    def subscribe(self, callback: ChangeCallback):
+        """Register a callback invoked with (table_name, version) on every change."""
+        self._callbacks.append(callback)
+
+    def stop(self):
+        """Ask the listener to exit after the current poll."""
+        self._stop_event.set()
+
+    def _apply(self, table_name: str, version: int):
+        # Notifications and local commits may arrive out of order across
+        # transactions and threads; the check and the update are one step
+        with self._versions_lock:
+            if version <= self.versions.get(table_name, 0):
+                return
+            self.versions[table_name] = version
+        for callback in list(self._callbacks):
+            try:
+                callback(table_name, version)
+            except Exception as e:
+                logger.error(f"Catalog change callback failed: {e}")
+
+    def _connect(self):
+        """Open a dedicated DBAPI connection outside the pool."""
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        conn = self.engine.dialect.loaded_dbapi.connect(*cargs, **cparams)
+        conn.autocommit = True
+        return conn
+
+    def _resync(self):
+        """Reload all versions, catching up on changes missed while disconnected."""
+        with Session(self.engine) as db:
+            for table_name, version in fetch_catalog_versions(db).items():
+                self._apply(table_name, version)
+
+    def _wait_for_notifications(self, conn) -> List[str]:
+        """Wait up to poll_timeout and return the payloads received."""
+        if callable(getattr(conn, "notifies", None)):
+            # psycopg 3
+            return [n.payload for n in conn.notifies(timeout=self.poll_timeout)]
+
+        # psycopg2
+        if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+            return []
+        conn.poll()
+        payloads = [n.payload for n in conn.notifies]
+        conn.notifies.clear()
+        return payloads
+
+    def run(self):
+        """Listen until stopped, reconnecting with backoff on errors."""
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {CHANNEL}")
+                self._resync()
+                self.connected.set()
+                backoff = 1.0
+
+                while not self._stop_event.is_set():
+                    for payload in self._wait_for_notifications(conn):
+                        table_name, _, version = payload.rpartition(":")
+                        self._apply(table_name, int(version))
+            except Exception as e:
+                self.connected.clear()
+                logger.warning(f"Catalog listener disconnected: {e}; retrying in {backoff:.0f}s")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+_listener: Optional[CatalogChangeListener] = None
+_listener_lock = threading.Lock()
+
+
+def start_catalog_listener(engine=None) -> Optional[CatalogChangeListener]:
+    """
+    Start the process-wide change listener (idempotent).
+
+    Returns None on databases without LISTEN/NOTIFY; callers then fall back
+    to reading versions from the database.
+    """
+    global _listener
+    if engine is None:
+        from TeacherLibrary.data.database import get_engine
+        engine = get_engine()
+
+    if engine.dialect.name != "postgresql":
+        return None
+
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = CatalogChangeListener(engine)
+            _listener.start()
+            # Give the first resync a moment so early reads hit the local copy
+            _listener.connected.wait(2.0)
+    return _listener
@@ -1,25 +1,308 @@
 """Database session management."""
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import CheckConstraint, create_engine, event, exc, inspect, make_url, text
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from TeacherLibrary.config import Config
+from TeacherLibrary.data.instrumentation import InstrumentedQueuePool, install_query_instrumentation, pool_stats
 
 logger = logging.getLogger(__name__)
 
-# Create engine with connection pooling
-engine = create_engine(
-    Config.get_database_url(),
-    pool_size=5,              # Number of connections to maintain
-    max_overflow=10,          # Max connections beyond pool_size
-    pool_pre_ping=True,       # Verify connections before using
-    pool_recycle=3600,        # Recycle connections after 1 hour
-    echo=False                # Set to True for SQL query logging
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# The engine is created on first use, so importing the models (CLI tools,
+# tests) neither validates configuration nor sets up a connection pool.
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _pool_options() -> dict:
+    """Connection pool settings from Config."""
+    return {
+        "pool_size": Config.DB_POOL_SIZE,          # Number of connections to maintain
+        "max_overflow": Config.DB_MAX_OVERFLOW,    # Max connections beyond pool_size
+        "pool_timeout": Config.DB_POOL_TIMEOUT,    # Seconds to wait for a free connection
+        "pool_recycle": Config.DB_POOL_RECYCLE,    # Recycle connections after N seconds
+        "pool_pre_ping": Config.DB_POOL_PRE_PING,  # Verify connections before using
+    }
+
+
+def _driver_connect_args() -> dict:
+    """Driver-specific connection arguments for PostgreSQL."""
+    if Config.DB_DRIVER == "psycopg":
+        # Server-side prepare a query once it has run this many times on a
+        # connection; a negative setting disables prepared statements
+        threshold = Config.DB_PREPARE_THRESHOLD
+        return {"prepare_threshold": threshold if threshold >= 0 else None}
+    return {}
+
+
+# Applied to every SQLite connection: WAL lets readers run alongside the
+# single writer, and the rest trades a little durability for speed.
+SQLITE_PRAGMAS = {
+    "foreign_keys": "ON",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "cache_size": "-64000",      # 64 MB page cache
+    "temp_store": "MEMORY",
+    "mmap_size": "268435456",    # 256 MB
+}
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+class SerializedStaticPool(StaticPool):
+    """
+    StaticPool that lends its single connection to one checkout at a time.
+
+    An in-memory SQLite database lives in one connection, so threads take
+    turns with it instead of interleaving their transactions on it. Like
+    QueuePool, a checkout waits at most DB_POOL_TIMEOUT seconds; a thread
+    asking for a second connection while it holds the first fails at once,
+    since it would wait for itself.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_lock = threading.Lock()
+        self._holder: Optional[int] = None
+
+    def _do_get(self):
+        if self._holder == threading.get_ident():
+            raise exc.TimeoutError(
+                "In-memory SQLite supports one open session per thread; close the other session first"
+            )
+        start = time.perf_counter()
+        if not self._checkout_lock.acquire(timeout=Config.DB_POOL_TIMEOUT):
+            pool_stats.record_checkout((time.perf_counter() - start) * 1000, 1, timed_out=True)
+            raise exc.TimeoutError(
+                f"In-memory SQLite connection still in use after {Config.DB_POOL_TIMEOUT:g}s"
+            )
+        try:
+            record = super()._do_get()
+        except BaseException:
+            self._checkout_lock.release()
+            raise
+        self._holder = threading.get_ident()
+        pool_stats.record_checkout((time.perf_counter() - start) * 1000, 1)
+        return record
+
+    def _do_return_conn(self, record):
+        self._holder = None
+        self._checkout_lock.release()
+
+    def checkedout(self) -> int:
+        """Number of connections in use: 0 or 1."""
+        return int(self._checkout_lock.locked())
+
+
+def _create_sqlite_engine(database_url: str):
+    """Create an engine for a SQLite file or in-memory database."""
+    url = make_url(database_url)
+    memory = _is_memory_sqlite(url)
+    options = {"connect_args": {"check_same_thread": False}}
+    if memory:
+        # One shared connection, otherwise every checkout gets an empty database
+        options["poolclass"] = SerializedStaticPool
+    else:
+        options.update(poolclass=InstrumentedQueuePool, **_pool_options())
+    engine = create_engine(url, echo=False, **options)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself: pysqlite's implicit transaction
+        # handling breaks SAVEPOINTs (used for per-batch import savepoints)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        if not memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin_sqlite_transaction(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def get_engine():
+    """Get the shared engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                database_url = Config.get_database_url()
+                if Config.is_sqlite():
+                    engine = _create_sqlite_engine(database_url)
+                else:
+                    engine = create_engine(
+                        Config.with_driver(database_url),
+                        poolclass=InstrumentedQueuePool,
+                        connect_args=_driver_connect_args(),
+                        echo=False,  # Set to True for SQL query logging
+                        **_pool_options()
+                    )
+                install_query_instrumentation(engine)
+                _engine = engine
+    return _engine
+
+
+_replica_engine = None
+
+
+def get_replica_engine():
+    """Get the read replica engine, or None if no replica is configured."""
+    global _replica_engine
+    if _replica_engine is None:
+        replica_url = Config.get_replica_database_url()
+        if not replica_url:
+            return None
+        with _engine_lock:
+            if _replica_engine is None:
+                engine = create_engine(
+                    Config.with_driver(replica_url),
+                    poolclass=InstrumentedQueuePool,
+                    connect_args=_driver_connect_args(),
+                    echo=False,
+                    **_pool_options()
+                )
+                install_query_instrumentation(engine)
+                _replica_engine = engine
+    return _replica_engine
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain reads to the read replica and everything else to the primary.
+
+    Reads go to the primary while the current transaction has written and for
+    REPLICA_STICKY_SECONDS after it commits, so a session always sees its own
+    writes despite replication lag. To carry that across sessions (e.g.
+    Streamlit reruns), pass a persistent dict as `info={"routing_state": state}`.
+    Reads inside a `primary_reads(db)` block also go to the primary.
+    """
+
+    @property
+    def _routing_state(self) -> dict:
+        return self.info.get("routing_state", self.info)
+
+    def _uses_primary(self, clause) -> bool:
+        """Decide whether a statement must run on the primary."""
+        if self._flushing or not getattr(clause, "is_select", False):
+            self.info["wrote_in_transaction"] = True
+            return True
+        if getattr(clause, "_for_update_arg", None) is not None:
+            return True
+        if self.info.get("primary_reads") or self.info.get("wrote_in_transaction"):
+            return True
+        return time.monotonic() < self._routing_state.get("primary_until", 0.0)
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        """Route the statement to the replica or the primary."""
+        replica = get_replica_engine()
+        primary = super().get_bind(mapper, clause=clause, **kw)
+        # Explicitly bound sessions (e.g. to a connection) are never rerouted
+        if replica is None or primary is not get_engine():
+            return primary
+        return primary if self._uses_primary(clause) else replica
+
+
+@contextmanager
+def primary_reads(db: Session):
+    """
+    Send a session's reads to the primary for the duration of the block.
+
+    For reads that must not trail the primary, such as catalog versions and
+    the rows cached under them. A no-op without a read replica.
+    """
+    db.info["primary_reads"] = db.info.get("primary_reads", 0) + 1
+    try:
+        yield db
+    finally:
+        db.info["primary_reads"] -= 1
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _start_read_your_writes_window(db: RoutingSession):
+    if db.info.pop("wrote_in_transaction", None):
+        db._routing_state["primary_until"] = time.monotonic() + Config.REPLICA_STICKY_SECONDS
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _reset_write_flag(db: RoutingSession):
+    db.info.pop("wrote_in_transaction", None)
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to the shared engine when the first session is made."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+
+def __getattr__(name):
+    # Backwards compatible `from TeacherLibrary.data.database import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@contextmanager
+def pipeline(db: Session):
+    """
+    Send the block's statements in psycopg 3 pipeline mode.
+
+    For explicit loops of single statements; results are synchronised at
+    the end of the block. A no-op on psycopg2 and SQLite. The batched CRUD
+    writes (create_many, update_many, apply_changes) do not need it: they
+    go through executemany(), which psycopg 3 already pipelines. Do not wrap
+    ORM bulk UPDATEs in it either, since their matched-row check reads
+    rowcounts that pipeline mode does not report.
+    """
+    driver_connection = db.connection().connection.driver_connection
+    if hasattr(driver_connection, "pipeline"):
+        with driver_connection.pipeline():
+            yield
+    else:
+        yield
+
+
+@contextmanager
+def session_scope(**kwargs):
+    """
+    Provide a session for a short unit of work.
+
+    Rolls back if the block raises - including BaseException control flow
+    such as Streamlit's st.stop() and st.rerun() - and always closes the
+    session, so its connection goes back to the pool.
+
+    Args:
+        **kwargs: Extra arguments for SessionLocal (e.g. info)
+    """
+    db = SessionLocal(**kwargs)
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 
 def get_db():
     """Get database session."""
@@ -34,4 +317,141 @@ def init_db():
     """Initialize database tables."""
     # Import models to register them with Base.metadata
     from TeacherLibrary.models import schemas  # noqa: F401
+    from TeacherLibrary.data.catalog_version import create_database_id
+    engine = get_engine()
+    _enable_trigram_search()
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        create_database_id(conn)
+    _add_missing_columns()
+    _add_missing_check_constraints()
+    _sync_indexes(schemas.RETIRED_INDEXES)
+
+
+def _enable_trigram_search():
+    """Install pg_trgm so free-text search can use trigram indexes, if permitted."""
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        logger.warning(f"pg_trgm unavailable, text search will not be indexed: {e}")
+
+
+def _sync_indexes(retired_indexes):
+    """
+    Bring indexes on existing tables in line with the models.
+
+    create_all() only creates indexes together with new tables, so declared
+    indexes are created if missing and retired ones are dropped.
+    """
+    with get_engine().begin() as conn:
+        for name in retired_indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def _add_missing_columns():
+    """
+    Add nullable columns declared after their table was created.
+
+    create_all() skips existing tables, so new optional columns (such as
+    content hashes) are added with ALTER TABLE.
+    """
+    with get_engine().begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+
+def _add_missing_check_constraints():
+    """
+    Add check constraints to tables created before they were declared.
+
+    create_all() skips existing tables, so constraints are added NOT VALID:
+    enforced for every new write without failing on legacy rows.
+    """
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for constraint in table.constraints:
+                if not isinstance(constraint, CheckConstraint) or not constraint.name:
+                    continue
+                exists = conn.execute(
+                    text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+                    {"name": constraint.name},
+                ).first()
+                if not exists:
+                    logger.info(f"Adding constraint {constraint.name} to {table.name}")
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD CONSTRAINT {constraint.name} "
+                        f"CHECK ({constraint.sqltext}) NOT VALID"
+                    ))
+
+
+# Async engine and session factory, created on first use so that importing
+# this module does not require the asyncpg/aiosqlite driver.
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """Get the shared async engine, creating it on first use."""
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        if Config.is_sqlite():
+            # aiosqlite runs each connection on its own thread; no pool tuning applies
+            _async_engine = create_async_engine(Config.get_async_database_url(), echo=False)
+        else:
+            _async_engine = create_async_engine(
+                Config.get_async_database_url(),
+                connect_args=_driver_connect_args(),
+                echo=False,
+                **_pool_options()
+            )
+        install_query_instrumentation(_async_engine)
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    """Get the async session factory bound to the async engine."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        # expire_on_commit=False: attribute access after commit must not
+        # trigger implicit (blocking) IO on an async session.
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def get_async_db():
+    """Get async database session."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def init_async_db():
+    """Initialize database tables using the async engine."""
+    from TeacherLibrary.models import schemas  # noqa: F401
+    from TeacherLibrary.data.catalog_version import create_database_id
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_database_id)
@@ -0,0 +1,228 @@
+"""
+On-disk cache of generated export files.
+
+Exports are keyed by database, table, format, filters and the table's catalog
+version, so a cached file is exactly what a fresh export would return and is
+never served after the table changes - or for a recreated database whose
+versions started over. Repeat downloads of the same export (e.g. the
+full catalog as Excel) are served straight from the file. The cache is bounded
+by total size, evicting the least recently used files first. Only files named
+like cache entries are ever deleted, so the directory may be shared with other
+files and other app processes.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from TeacherLibrary.config import Config
+from TeacherLibrary.data.catalog_version import get_catalog_version, get_database_id
+from TeacherLibrary.data.database import primary_reads
+from TeacherLibrary.data.make_dataset import export_records
+from TeacherLibrary.models.crud import CRUDBase
+
+logger = logging.getLogger(__name__)
+
+# File extension per export format
+EXPORT_EXTENSIONS = {"csv": "csv", "excel": "xlsx", "parquet": "parquet"}
+
+# Name of a finished cache entry: <32 hex key>.<extension>
+_CACHE_FILE = re.compile(rf"[0-9a-f]{{32}}\.(?:{'|'.join(EXPORT_EXTENSIONS.values())})")
+
+
+class ExportCache:
+    """Size-bounded directory of export files, one per key."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """Initialize the cache in a directory holding at most max_bytes of exports."""
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def make_key(table_name: str, file_type: str, query: Dict[str, Any], version: int, database_id: str) -> str:
+        """Stable key for an export of a table version with a search, filters and sort order."""
+        payload = json.dumps([database_id, table_name, file_type, version, sorted(query.items())], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key: str, file_type: str) -> Path:
+        return self.directory / f"{key}.{EXPORT_EXTENSIONS[file_type]}"
+
+    def _cache_files(self) -> List[Path]:
+        """Finished cache entries; temporary and unrelated files are left alone."""
+        if not self.directory.exists():
+            return []
+        return [path for path in self.directory.iterdir() if _CACHE_FILE.fullmatch(path.name)]
+
+    def _touch(self, path: Path) -> bool:
+        """Mark a cached file as recently used; False if it is not cached."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get(self, key: str, file_type: str) -> Optional[Path]:
+        """Path of a cached export, or None."""
+        path = self._path(key, file_type)
+        if self._touch(path):
+            with self._lock:
+                self.hits += 1
+            return path
+        return None
+
+    def get_or_create(self, key: str, file_type: str, write: Callable[[BinaryIO], None]) -> Path:
+        """
+        Get a cached export, generating it on a miss.
+
+        Concurrent requests for the same key wait for a single generation.
+        The file is written under a temporary name and renamed into place,
+        so readers never see a partial export.
+
+        Args:
+            key: Key from make_key
+            file_type: 'csv', 'excel' or 'parquet'
+            write: Writes the export into the given binary file
+
+        Returns:
+            Path of the cached file
+        """
+        path = self.get(key, file_type)
+        if path is not None:
+            return path
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            path = self.get(key, file_type)
+            if path is not None:
+                return path
+
+            with self._lock:
+                self.misses += 1
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key, file_type)
+            output = tempfile.NamedTemporaryFile(dir=self.directory, prefix=f"{key}.", suffix=".tmp", delete=False)
+            try:
+                with output:
+                    write(output)
+                os.replace(output.name, path)
+            except BaseException:
+                os.unlink(output.name)
+                raise
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path):
+        """Delete the least recently used files until the cache fits in max_bytes."""
+        entries = []
+        for path in self._cache_files():
+            if path == keep:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries) + keep.stat().st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except OSError as e:
+                logger.warning(f"Could not evict cached export {path.name}: {e}")
+
+    def clear(self):
+        """Delete every cached export."""
+        for path in self._cache_files():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hit/miss counters and the current size of the cache."""
+        files = self._cache_files()
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "files": len(files),
+            "bytes": sum(path.stat().st_size for path in files if path.exists()),
+        }
+
+
+_export_cache: Optional[ExportCache] = None
+_export_cache_lock = threading.Lock()
+
+
+def get_export_cache() -> ExportCache:
+    """
+    Get the process-wide export cache, creating it on first use.
+
+    Files left by earlier runs are kept: keys include the database id, so
+    they are only served for the database they were exported from.
+    """
+    global _export_cache
+    if _export_cache is None:
+        with _export_cache_lock:
+            if _export_cache is None:
+                _export_cache = ExportCache(
+                    Path(Config.EXPORT_CACHE_DIR), int(Config.EXPORT_CACHE_MAX_MB * 1024 * 1024)
+                )
+    return _export_cache
+
+
+def export_key(db: Session, table_name: str, file_type: str, query: Dict[str, Any]) -> str:
+    """Cache key for an export of the table's current catalog version in this database."""
+    return ExportCache.make_key(
+        table_name, file_type, query, get_catalog_version(db, table_name), get_database_id(db)
+    )
+
+
+def cached_export(crud: CRUDBase, db: Session, file_type: str = "csv", **query) -> Path:
+    """
+    Get an export file from the cache, generating it on a miss.
+
+    The catalog version is read before the export runs, and both are read
+    from the primary, so a cached file is never older than the version in
+    its key.
+
+    Args:
+        crud: CRUD operations instance for the source model
+        db: Database session
+        file_type: 'csv', 'excel' or 'parquet'
+        **query: sort_by, search and column filters, as for export_records
+
+    Returns:
+        Path of the export file; read it right away, it may be evicted later
+    """
+    def write(output: BinaryIO):
+        for chunk in export_records(crud, db, file_type, **query):
+            output.write(chunk)
+
+    with primary_reads(db):
+        key = export_key(db, crud.model.__tablename__, file_type, query)
+        return get_export_cache().get_or_create(key, file_type, write)
@@ -2,12 +2,55 @@
 ISBN data fetching module.
 
 This module provides functions to fetch book metadata from ISBN using Google Books API.
+Lookups go through the configured metadata providers: a local Open Library
+index if one is built, then the shared Google Books client, whose response
+cache serves repeated ISBNs.
 Follows data science best practices: minimal code, clear error handling, single responsibility.
 """
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
 
 import requests
 
+from TeacherLibrary.data.metadata_client import get_metadata_provider
+
+
+def normalize_isbn(isbn: str) -> Optional[str]:
+    """
+    Validate an ISBN-10 or ISBN-13 and return it as ISBN-13.
+
+    Hyphens and spaces are ignored. Checksums are verified locally, so typos
+    are caught without a network request, and both forms of the same book
+    normalize to the same string.
+
+    Args:
+        isbn: ISBN as entered or scanned, e.g. "0-06-112008-1"
+
+    Returns:
+        13-digit ISBN, or None if the input is not a valid ISBN
+
+    Example:
+        >>> normalize_isbn("0-06-112008-1")
+        '9780061120084'
+    """
+    clean = (isbn or "").replace("-", "").replace(" ", "").upper()
+
+    if len(clean) == 10 and clean[:9].isdigit() and (clean[9].isdigit() or clean[9] == "X"):
+        digits = [int(c) for c in clean[:9]] + [10 if clean[9] == "X" else int(clean[9])]
+        if sum((10 - i) * d for i, d in enumerate(digits)) % 11:
+            return None
+        clean = "978" + clean[:9]
+    elif len(clean) == 13 and clean.isdigit():
+        if sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(clean)) % 10:
+            return None
+        return clean
+    else:
+        return None
+
+    # ISBN-10 converted to ISBN-13: recompute the check digit
+    check = -sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(clean)) % 10
+    return clean + str(check)
+
 
 def fetch_book_by_isbn(isbn: str) -> Optional[Dict[str, str]]:
     """
@@ -25,26 +68,17 @@ def fetch_book_by_isbn(isbn: str) -> Optional[Dict[str, str]]:
         >>> print(data['title'])
         'To Kill a Mockingbird'
     """
-    if not isbn or not isbn.replace("-", "").isdigit():
+    # Validate the checksum and normalize to ISBN-13 before going online
+    clean_isbn = normalize_isbn(isbn)
+    if clean_isbn is None:
         return None
 
-    # Clean ISBN (remove hyphens and spaces)
-    clean_isbn = isbn.replace("-", "").replace(" ", "")
-
     try:
-        # Google Books API - free, no API key required
-        url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{clean_isbn}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-
-        if data.get("totalItems", 0) == 0:
+        # Local index first if configured, then Google Books API (free, no API key required)
+        book_info = get_metadata_provider().volume_by_isbn(clean_isbn)
+        if book_info is None:
             return None
 
-        # Extract book information
-        book_info = data["items"][0]["volumeInfo"]
-
         # Parse authors (may be a list)
         authors = book_info.get("authors", [])
         author = ", ".join(authors) if authors else ""
@@ -71,3 +105,31 @@ def fetch_book_by_isbn(isbn: str) -> Optional[Dict[str, str]]:
     except (requests.RequestException, KeyError, ValueError):
         # Failed to fetch or parse data
         return None
+
+
+def fetch_books_by_isbns(isbns: Iterable[str], max_workers: int = 8) -> Dict[str, Optional[Dict[str, str]]]:
+    """
+    Fetch book metadata for many ISBNs at once, e.g. a scanned box of books.
+
+    ISBNs are validated and normalized locally, so invalid ones cost no
+    request and duplicates (also ISBN-10 vs ISBN-13 of the same book) are
+    looked up once. Local index and cached answers come back immediately; the
+    rest are fetched concurrently within the metadata client's rate limit.
+
+    Args:
+        isbns: ISBNs as entered
+        max_workers: Concurrent lookups
+
+    Returns:
+        Mapping of each distinct input ISBN to its book data (as returned by
+        fetch_book_by_isbn), or None if it is invalid or was not found
+    """
+    isbns = list(dict.fromkeys(isbn.strip() for isbn in isbns if isbn and isbn.strip()))
+    normalized = {isbn: normalize_isbn(isbn) for isbn in isbns}
+    unique = sorted({clean for clean in normalized.values() if clean})
+
+    found: Dict[str, Optional[Dict[str, str]]] = {}
+    if unique:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+            found = dict(zip(unique, pool.map(fetch_book_by_isbn, unique)))
+    return {isbn: found.get(clean) if clean else None for isbn, clean in normalized.items()}
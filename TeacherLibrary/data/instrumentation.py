@@ -0,0 +1,342 @@
+"""
+Query instrumentation for the SQLAlchemy engine.
+
+Records per-statement latency in a histogram, logs slow queries with their
+parameters redacted, and counts queries per scope (e.g. one Streamlit page
+render) so N+1 patterns become visible. Also measures connection pool
+checkout wait time and saturation, and how long each caller holds connections.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from TeacherLibrary.config import Config
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("TeacherLibrary.slow_query")
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended.
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+
+def _statement_key(statement: str) -> str:
+    """Collapse whitespace so identical statements group together."""
+    return " ".join(statement.split())[:300]
+
+
+class QueryStats:
+    """Thread-safe latency histogram across all statements on an engine."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded statistics."""
+        with self._lock:
+            self.count = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+            self.slow_count = 0
+            self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def record(self, duration_ms: float, slow: bool = False):
+        """Record one statement execution."""
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            self.max_ms = max(self.max_ms, duration_ms)
+            if slow:
+                self.slow_count += 1
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if duration_ms <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    def snapshot(self) -> Dict:
+        """Return a copy of the current statistics."""
+        with self._lock:
+            return {
+                "count": self.count,
+                "total_ms": self.total_ms,
+                "mean_ms": self.total_ms / self.count if self.count else 0.0,
+                "max_ms": self.max_ms,
+                "slow_count": self.slow_count,
+                "histogram": {
+                    (f"<={bound:g}ms" if bound != float("inf") else "inf"): n
+                    for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)
+                },
+            }
+
+
+class QueryScope:
+    """Query counter for one unit of work, such as a page render."""
+
+    def __init__(self, name: str, parent: Optional["QueryScope"] = None):
+        """Initialize an empty scope."""
+        self.name = name
+        self.parent = parent
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration_ms: float):
+        """Record a statement in this scope and all enclosing scopes."""
+        scope = self
+        key = _statement_key(statement)
+        while scope is not None:
+            scope.count += 1
+            scope.total_ms += duration_ms
+            scope.statements[key] += 1
+            scope = scope.parent
+
+    def repeated_statements(self, min_count: int = 2) -> List[tuple]:
+        """Statements executed at least `min_count` times (likely N+1)."""
+        return [(s, n) for s, n in self.statements.most_common() if n >= min_count]
+
+
+class PoolStats:
+    """Thread-safe connection pool checkout wait and saturation metrics."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded statistics."""
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.peak_checked_out = 0
+            self.wait_buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def record_checkout(self, wait_ms: float, checked_out: int, timed_out: bool = False):
+        """Record one pool checkout attempt and how long it waited."""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+
+    def snapshot(self, pool=None) -> Dict:
+        """
+        Return a copy of the current statistics.
+
+        If a pool is given, include its live size, checked-out count and
+        saturation (checked out / maximum connections). Pools without these
+        counters (e.g. StaticPool) are reported as one connection.
+        """
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            result = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "mean_wait_ms": self.total_wait_ms / attempts if attempts else 0.0,
+                "max_wait_ms": self.max_wait_ms,
+                "peak_checked_out": self.peak_checked_out,
+                "wait_histogram": {
+                    (f"<={bound:g}ms" if bound != float("inf") else "inf"): n
+                    for bound, n in zip(LATENCY_BUCKETS_MS, self.wait_buckets)
+                },
+            }
+        if pool is not None:
+            size = pool.size() if hasattr(pool, "size") else 1
+            checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+            overflow = max(pool.overflow(), 0) if hasattr(pool, "overflow") else 0
+            capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+            result.update({
+                "pool_size": size,
+                "checked_out": checked_out,
+                "overflow": overflow,
+                "saturation": checked_out / capacity if capacity else 0.0,
+            })
+        return result
+
+
+class ConnectionUsage:
+    """How one caller (e.g. a Streamlit session) holds pooled connections."""
+
+    def __init__(self):
+        """Initialize empty usage counters."""
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.held = 0
+        self.total_held_ms = 0.0
+        self.max_held_ms = 0.0
+
+    def record_checkout(self):
+        """Record that a connection was checked out."""
+        with self._lock:
+            self.checkouts += 1
+            self.held += 1
+
+    def record_checkin(self, held_ms: float):
+        """Record that a connection was returned after `held_ms`."""
+        with self._lock:
+            self.held = max(self.held - 1, 0)
+            self.total_held_ms += held_ms
+            self.max_held_ms = max(self.max_held_ms, held_ms)
+
+    def snapshot(self) -> Dict:
+        """Return a copy of the current counters."""
+        with self._lock:
+            returned = self.checkouts - self.held
+            return {
+                "checkouts": self.checkouts,
+                "held": self.held,
+                "mean_held_ms": self.total_held_ms / returned if returned else 0.0,
+                "max_held_ms": self.max_held_ms,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_checkout(
+                (time.perf_counter() - start) * 1000, self.checkedout(), timed_out=True
+            )
+            raise
+        pool_stats.record_checkout((time.perf_counter() - start) * 1000, self.checkedout())
+        return conn
+
+
+query_stats = QueryStats()
+pool_stats = PoolStats()
+_current_scope: ContextVar[Optional[QueryScope]] = ContextVar("query_scope", default=None)
+_current_usage: ContextVar[Optional[ConnectionUsage]] = ContextVar("connection_usage", default=None)
+
+
+def current_query_scope() -> Optional[QueryScope]:
+    """Get the innermost active query scope, if any."""
+    return _current_scope.get()
+
+
+def start_query_scope(name: str) -> QueryScope:
+    """
+    Start counting queries for the rest of the current context.
+
+    Intended for script-style callers such as Streamlit pages, where each
+    rerun runs in a fresh context and a `with` block would wrap the whole page.
+    """
+    scope = QueryScope(name, parent=_current_scope.get())
+    _current_scope.set(scope)
+    return scope
+
+
+@contextmanager
+def query_scope(name: str) -> Iterator[QueryScope]:
+    """Count queries executed inside the block."""
+    scope = QueryScope(name, parent=_current_scope.get())
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+@contextmanager
+def track_connection_usage(usage: ConnectionUsage) -> Iterator[ConnectionUsage]:
+    """Attribute connections checked out inside the block to `usage`."""
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def _redacted_params(parameters) -> str:
+    """Describe bound parameters without revealing their values."""
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(
+        parameters[0], (dict, list, tuple)
+    ):
+        return f"<{len(parameters)} parameter sets redacted>"
+    if isinstance(parameters, dict):
+        return f"<{len(parameters)} parameters redacted: {', '.join(sorted(parameters))}>"
+    return f"<{len(parameters or ())} parameters redacted>"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+
+    slow = duration_ms >= Config.SLOW_QUERY_MS
+    query_stats.record(duration_ms, slow=slow)
+
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.record(statement, duration_ms)
+
+    if slow:
+        slow_query_logger.warning(
+            "Slow query (%.1f ms): %s params=%s",
+            duration_ms, _statement_key(statement), _redacted_params(parameters)
+        )
+
+
+def _handle_error(exception_context):
+    # Drop the start time of a failed statement so timings stay paired
+    conn = exception_context.connection
+    start_times = conn.info.get("query_start_time") if conn is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.record_checkout()
+        connection_record.info["usage_checkout"] = (usage, time.perf_counter())
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    # The usage travels with the connection record, so a checkin from another
+    # context (e.g. garbage collection) is still attributed correctly
+    if connection_record is None:
+        return
+    checkout = connection_record.info.pop("usage_checkout", None)
+    if checkout is not None:
+        usage, start = checkout
+        usage.record_checkin((time.perf_counter() - start) * 1000)
+
+
+def install_query_instrumentation(engine: Engine):
+    """Attach timing hooks to an engine (idempotent)."""
+    target = getattr(engine, "sync_engine", engine)
+    if event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+    event.listen(target, "checkout", _on_checkout)
+    event.listen(target, "checkin", _on_checkin)
+    logger.debug("Query instrumentation installed on %s", target.url)
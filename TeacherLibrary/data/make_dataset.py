@@ -4,91 +4,869 @@ Dataset creation utilities for import/export operations.
 This module handles data import from CSV/Excel and export to various formats,
 following cookiecutter-data-science conventions for data processing.
 """
-from io import BytesIO
-from typing import List
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
 
 import pandas as pd
+from openpyxl import Workbook, load_workbook
+from pydantic import BaseModel
+from sqlalchemy import BigInteger, Table
 from sqlalchemy.orm import Session
 
-from TeacherLibrary.models.crud import CRUDBase
+from TeacherLibrary.data.catalog_version import read_catalog_version
+from TeacherLibrary.data.database import primary_reads
+from TeacherLibrary.models.crud import CRUDBase, book_crud
+from TeacherLibrary.models.schemas import Book
+from TeacherLibrary.models.validators import BookSchema, DVDSchema, validate_batch
 
+logger = logging.getLogger(__name__)
 
-def export_to_excel(data: List[dict], sheet_name: str) -> BytesIO:
+# Rows read, cleaned and inserted per batch; bounds memory for any file size
+IMPORT_BATCH_SIZE = 1000
+
+# Rows fetched per server-side cursor round-trip when exporting
+EXPORT_BATCH_SIZE = 5000
+
+# Bytes per chunk yielded by the exporters
+EXPORT_CHUNK_SIZE = 256 * 1024
+
+# Rows per Parquet row group; larger groups compress and scan better
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+# Called with (rows processed so far, fraction of the file read or None)
+ImportProgress = Callable[[int, Optional[float]], None]
+
+# Validation schema per table for imported rows
+IMPORT_SCHEMAS: Dict[str, Type[BaseModel]] = {"books": BookSchema, "dvds": DVDSchema}
+
+# Natural key matching file rows to stored records in a re-import
+IMPORT_KEYS: Dict[str, Tuple[str, ...]] = {"books": ("book_number",), "dvds": ("title", "director")}
+
+# Column holding each record's content hash; maintained by the importers, never read from files
+HASH_COLUMN = "content_hash"
+
+# Danish column labels used in the app and in spreadsheets
+COLUMN_LABELS = {
+    "id": "ID",
+    "book_number": "Bognr.",
+    "title": "Titel",
+    "author": "Forfatter",
+    "director": "Instruktør",
+    "location": "Placering",
+    "borrowed_count": "Udlånt",
+    "total_count": "I alt",
+    "theme": "Tema",
+    "geographical_area": "Geografisk område",
+    "publication_year": "År",
+    "genre": "Genre",
+    "subgenre": "Undergenre",
+    "material_type": "Materialetype",
+    "notes": "Noter",
+    "description": "Beskrivelse"
+}
+
+# Headers in the raw catalog spreadsheet that differ from COLUMN_LABELS
+RAW_HEADER_ALIASES = {
+    "Bogtitel": "title",
+    "Udlånt (Antal)": "borrowed_count",
+    "I alt (Antal)": "total_count",
+}
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+RAW_CATALOG_PATH = PROJECT_ROOT / "data" / "raw" / "Bogoversigt engelsk til KA.xlsx"
+RAW_CATALOG_SHEET = "Ark1"
+PROCESSED_CATALOG_PATH = PROJECT_ROOT / "data" / "processed" / "books.csv"
+
+# Book fields taken from the catalog spreadsheet
+CATALOG_FIELDS = ("book_number", "title", "author", "location", "borrowed_count", "total_count")
+
+_HEADER_FIELDS = {
+    **{field.casefold(): field for field in COLUMN_LABELS},
+    **{label.casefold(): field for field, label in COLUMN_LABELS.items()},
+    **{alias.casefold(): field for alias, field in RAW_HEADER_ALIASES.items()},
+}
+
+
+def header_to_field(header: Any) -> Optional[str]:
+    """Map a spreadsheet header (field name, Danish label or raw alias) to a model field."""
+    if header is None:
+        return None
+    return _HEADER_FIELDS.get(" ".join(str(header).split()).casefold())
+
+
+def content_hash(row: Dict[str, Any], fields: Iterable[str]) -> str:
+    """SHA-256 over a row's normalized values for `fields`, stable across runs."""
+    payload = json.dumps([row.get(field) for field in fields], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def hash_fields(table: Table) -> List[str]:
+    """
+    Fields covered by a record's content hash: every importable column, in table order.
+
+    The catalog ingest and diff_import both hash this list, with fields a
+    source does not provide counting as empty, so the same record hashes
+    the same on either path (e.g. an export re-imported after an ingest).
+    """
+    importable = _importable_columns(table)
+    return [column.name for column in table.columns if column.name in importable]
+
+
+def exportable_columns(table: Table) -> List[str]:
+    """Columns written by the exporters, in table order; the same names import_from_file reads."""
+    return [column.name for column in table.columns if column.name != HASH_COLUMN]
+
+
+def _iter_output_chunks(file, chunk_size: int) -> Iterator[bytes]:
+    """Yield a file's content from the start in chunks of chunk_size bytes."""
+    file.seek(0)
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_to_csv(
+    batches: Iterable[Sequence[Sequence[Any]]],
+    columns: Sequence[str],
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Export rows as CSV, written incrementally.
+
+    Args:
+        batches: Row batches, e.g. from `CRUDBase.iter_batches`
+        columns: Header row
+        chunk_size: Approximate size of the yielded chunks in bytes
+
+    Yields:
+        UTF-8 encoded CSV content, suitable for a streamed download
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def export_to_excel(
+    batches: Iterable[Sequence[Sequence[Any]]],
+    columns: Sequence[str],
+    sheet_name: str,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
     """
-    Export data to Excel file format.
+    Export rows as an Excel file with a write-only workbook.
+
+    Rows are streamed to openpyxl's temporary sheet file as they arrive and
+    the finished .xlsx is assembled in a temporary file, so memory stays flat
+    for any number of rows. The first chunk is yielded once all rows are
+    written, since the zip container is only complete at the end.
 
     Args:
-        data: List of dictionaries containing record data
+        batches: Row batches, e.g. from `CRUDBase.iter_batches`
+        columns: Header row
         sheet_name: Name for the Excel sheet
+        chunk_size: Size of the yielded chunks in bytes
+
+    Yields:
+        .xlsx file content, suitable for a streamed download
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(list(columns))
+    for batch in batches:
+        for row in batch:
+            sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        yield from _iter_output_chunks(output, chunk_size)
+
+
+def _pyarrow():
+    """Import pyarrow, which is only needed for Parquet files."""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError('Parquet support requires pyarrow: pip install ".[parquet]"') from e
+    return pyarrow
+
+
+def parquet_available() -> bool:
+    """Whether the optional pyarrow dependency for Parquet is installed."""
+    try:
+        _pyarrow()
+        return True
+    except ImportError:
+        return False
+
+
+def arrow_schema(table: Table, columns: Optional[Sequence[str]] = None):
+    """
+    Arrow schema for a table's columns, derived from the model's column types.
+
+    Args:
+        table: Model table, e.g. Book.__table__
+        columns: Columns to include, in order; defaults to exportable_columns
 
     Returns:
-        BytesIO object containing Excel file
+        pyarrow.Schema with nullability taken from the model
+    """
+    pa = _pyarrow()
+    fields = []
+    for name in columns or exportable_columns(table):
+        column = table.columns[name]
+        if isinstance(column.type, BigInteger):
+            arrow_type = pa.int64()
+        elif column.type.python_type is int:
+            arrow_type = pa.int32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields, metadata={"table": table.name})
+
+
+def export_to_parquet(
+    batches: Iterable[Sequence[Sequence[Any]]],
+    schema,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
     """
-    df = pd.DataFrame(data)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-    output.seek(0)
-    return output
+    Export rows as a typed Parquet file, written one row group at a time.
 
+    Args:
+        batches: Row batches, e.g. from `CRUDBase.iter_batches`
+        schema: Arrow schema of the rows (see arrow_schema)
+        row_group_size: Rows buffered per row group
+        chunk_size: Size of the yielded chunks in bytes
+
+    Yields:
+        Parquet file content, suitable for a streamed download
+    """
+    pa = _pyarrow()
+    with tempfile.TemporaryFile() as output:
+        with pa.parquet.ParquetWriter(output, schema, compression="zstd") as writer:
+            pending, pending_rows = [], 0
+            for batch in batches:
+                if not batch:
+                    continue
+                columns = zip(*batch)
+                pending.append(pa.record_batch(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+                ))
+                pending_rows += len(batch)
+                if pending_rows >= row_group_size:
+                    writer.write_table(pa.Table.from_batches(pending), row_group_size=pending_rows)
+                    pending, pending_rows = [], 0
+            if pending:
+                writer.write_table(pa.Table.from_batches(pending), row_group_size=pending_rows)
+        yield from _iter_output_chunks(output, chunk_size)
 
-def export_to_csv(data: List[dict]) -> str:
+
+def export_records(
+    crud: CRUDBase,
+    db: Session,
+    file_type: str = "csv",
+    batch_size: int = EXPORT_BATCH_SIZE,
+    sort_by: Optional[str] = None,
+    search: Optional[str] = None,
+    **filters,
+) -> Iterator[bytes]:
     """
-    Export data to CSV format.
+    Export a table's records matching a search and filters.
+
+    Rows are read through a server-side cursor in batches and written as
+    they arrive; consume the iterator while the session is open.
 
     Args:
-        data: List of dictionaries containing record data
+        crud: CRUD operations instance for the source model
+        db: Database session
+        file_type: 'csv', 'excel' or 'parquet'
+        batch_size: Rows fetched per round-trip
+        sort_by: Column to sort by (default: id)
+        search: Free-text search, as in get_all
+        **filters: Column equality filters, as in get_all
+
+    Yields:
+        File content in chunks
+    """
+    table = crud.model.__table__
+    columns = exportable_columns(table)
+    batches = crud.iter_batches(db, columns, batch_size=batch_size, sort_by=sort_by, search=search, **filters)
+    if file_type == "csv":
+        return export_to_csv(batches, columns)
+    if file_type == "parquet":
+        return export_to_parquet(batches, arrow_schema(table, columns))
+    return export_to_excel(batches, columns, sheet_name=table.name)
+
+
+def _file_size(file) -> Optional[int]:
+    """Size of a seekable file object in bytes, or None."""
+    try:
+        position = file.tell()
+        size = file.seek(0, 2)
+        file.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def _iter_csv_chunks(file, chunk_size: int) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    """Yield (chunk, fraction read) from a CSV file without loading it whole."""
+    size = _file_size(file)
+    # Read everything as text; types are converted per column in _clean_chunk
+    for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str, skipinitialspace=True):
+        yield chunk, (min(file.tell() / size, 1.0) if size else None)
+
+
+def _iter_excel_chunks(file, chunk_size: int) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    """Yield (chunk, fraction read) from the first sheet, streaming rows in read-only mode."""
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else None for name in header]
+        keep = [i for i, name in enumerate(columns) if name]
+        total = (sheet.max_row or 0) - 1
+
+        index, batch = [], []
+        for row_index, row in enumerate(rows):
+            if all(value is None for value in row):
+                continue
+            index.append(row_index)
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) == chunk_size:
+                yield (
+                    pd.DataFrame(batch, columns=[columns[i] for i in keep], index=index),
+                    min((row_index + 1) / total, 1.0) if total > 0 else None,
+                )
+                index, batch = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=[columns[i] for i in keep], index=index), 1.0
+    finally:
+        workbook.close()
+
+
+def _iter_parquet_chunks(file, chunk_size: int) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    """Yield (chunk, fraction read) from a Parquet file, keeping its column types."""
+    pa = _pyarrow()
+    parquet_file = pa.parquet.ParquetFile(file)
+    total = parquet_file.metadata.num_rows
+    # Integers stay nullable integers instead of becoming floats around nulls
+    types = {pa.int8(): pd.Int64Dtype(), pa.int16(): pd.Int64Dtype(), pa.int32(): pd.Int64Dtype(),
+             pa.int64(): pd.Int64Dtype()}
+    start = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        chunk = batch.to_pandas(types_mapper=types.get)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk, (start / total if total else None)
+
+
+def _clean_chunk(df: pd.DataFrame, table: Table) -> Tuple[List[dict], Dict[int, str]]:
+    """
+    Clean and type-convert a chunk column by column.
+
+    Strings are stripped with empty values becoming None, integer columns are
+    parsed, and NOT NULL columns fall back to their defaults (e.g. 0 copies).
+    Business rules (required fields, lengths, ranges) are left to the
+    Pydantic schemas in `validate_batch`.
+
+    Returns:
+        Tuple of (valid rows as dicts, {row index: error} for rejected rows)
+    """
+    errors: Dict[int, str] = {}
+
+    def reject(mask: pd.Series, message: str):
+        for index in mask[mask].index:
+            errors.setdefault(index, message)
+
+    cleaned = {}
+    for name in df.columns:
+        column = table.columns[name]
+        values = df[name]
+        python_type = column.type.python_type
+
+        if python_type is int and pd.api.types.is_integer_dtype(values):
+            # Already typed, e.g. from Parquet
+            values = values.astype("Int64")
+        elif python_type is int:
+            numeric = pd.to_numeric(values, errors="coerce")
+            reject(values.notna() & numeric.isna(), f"{name}: not a number")
+            reject(numeric.mod(1).fillna(0) != 0, f"{name}: not a whole number")
+            numeric = numeric.where(numeric.mod(1).fillna(0) == 0)
+            values = numeric.astype("Int64")
+        else:
+            values = values.astype("string").str.strip()
+            values = values.mask(values == "")
+
+        if column.default is not None and column.default.is_scalar:
+            values = values.fillna(column.default.arg)
+        cleaned[name] = values
+
+    valid_index = df.index.difference(list(errors), sort=False)
+    names = list(cleaned)
+    columns = []
+    for values in cleaned.values():
+        if errors:
+            values = values.loc[valid_index]
+        values = values.astype(object)
+        columns.append(values.where(values.notna(), None).tolist())
+    return [dict(zip(names, row)) for row in zip(*columns)], errors
+
+
+def _format_field_errors(field_errors: List[dict]) -> str:
+    """Join the structured errors of one row from `validate_batch` into a message."""
+    return "; ".join(
+        f"{error['field']}: {error['message']}" if error["field"] else error["message"]
+        for error in field_errors
+    )
+
+
+def _check_columns(table: Table, columns: Iterable[str], key_columns: Iterable[str] = ()) -> List[str]:
+    """
+    Check a file's columns against a table.
+
+    Raises:
+        ValueError: If required (or key) columns are missing
 
     Returns:
-        CSV string
+        Notes about columns that will be ignored
     """
-    df = pd.DataFrame(data)
-    return df.to_csv(index=False)
+    columns = list(columns)
+    required = {
+        column.name for column in table.columns
+        if not column.nullable and not column.primary_key and column.default is None
+    }
+    missing = (required | set(key_columns)) - set(columns)
+    if missing:
+        raise ValueError(f"missing required columns: {', '.join(sorted(missing))}")
+    importable = _importable_columns(table)
+    ignored = [c for c in columns if c not in importable and c != "id"]
+    return [f"Ignored unknown columns: {', '.join(map(str, ignored))}"] if ignored else []
+
+
+def _importable_columns(table: Table) -> set:
+    """Columns an import file may set (id is auto-generated, the hash is computed)."""
+    return {column.name for column in table.columns if not column.primary_key and column.name != HASH_COLUMN}
+
+
+def _validate_chunk(
+    chunk: pd.DataFrame, table: Table, schema: Type[BaseModel]
+) -> Tuple[List[Any], List[dict], Dict[Any, str]]:
+    """
+    Clean and validate a chunk of importable columns.
+
+    Returns:
+        Tuple of (row indexes of the valid rows, valid rows, {row index: error})
+    """
+    rows, row_errors = _clean_chunk(chunk, table)
+    row_numbers = [i for i in chunk.index if i not in row_errors]
+
+    valid, validation_errors = validate_batch(schema, rows)
+    for i, field_errors in validation_errors.items():
+        row_errors[row_numbers[i]] = _format_field_errors(field_errors)
+    return [row_numbers[i] for i in valid], list(valid.values()), row_errors
+
+
+def _iter_file_chunks(file, file_type: str, batch_size: int) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    """Yield (chunk, fraction read) from a CSV, Excel or Parquet file."""
+    if file_type == "csv":
+        return _iter_csv_chunks(file, batch_size)
+    if file_type == "parquet":
+        return _iter_parquet_chunks(file, batch_size)
+    return _iter_excel_chunks(file, batch_size)
 
 
 def import_from_file(
-    file, crud: CRUDBase, db: Session, file_type: str = "csv"
+    file,
+    crud: CRUDBase,
+    db: Session,
+    file_type: str = "csv",
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress: Optional[ImportProgress] = None,
+    schema: Optional[Type[BaseModel]] = None,
 ) -> tuple[int, List[str]]:
     """
     Import data from CSV or Excel file into database.
 
-    This function processes external data files and loads them into the database,
-    following the cookiecutter-data-science pattern for data ingestion.
+    The file is streamed in batches of `batch_size` rows (chunked CSV parsing,
+    read-only openpyxl for Excel, record batches for Parquet), so memory
+    stays bounded regardless of file size. Each batch is cleaned column-wise, validated in one call against
+    the table's Pydantic schema, and only the valid rows are inserted with
+    `crud.create_many`; rows that fail validation or the insert are skipped
+    and reported.
 
     Args:
         file: File object to import
         crud: CRUD operations instance for the target model
         db: Database session
-        file_type: Type of file ('csv' or 'excel')
+        file_type: Type of file ('csv', 'excel' or 'parquet')
+        batch_size: Number of rows per batch
+        progress: Optional callback receiving (rows processed, fraction of file read)
+        schema: Pydantic schema for one row; defaults to IMPORT_SCHEMAS for the table
 
     Returns:
         Tuple of (success_count, error_messages)
     """
+    table = crud.model.__table__
+    schema = schema or IMPORT_SCHEMAS[table.name]
+    importable = _importable_columns(table)
+
+    success_count = 0
+    processed = 0
+    errors = []
+    checked_columns = False
+
     try:
-        # Load data from file
-        if file_type == "csv":
-            df = pd.read_csv(file)
-        else:  # excel
-            df = pd.read_excel(file)
-
-        # Clean data: replace NaN with None
-        df = df.where(pd.notna(df), None)
-
-        success_count = 0
-        errors = []
-
-        # Process each row
-        for idx, row in df.iterrows():
-            try:
-                data = row.to_dict()
-                # Remove id if present (auto-generated for new records)
-                data.pop("id", None)
-                crud.create(db, data)
-                success_count += 1
-            except Exception as e:
-                errors.append(f"Row {idx + 2}: {str(e)}")
-
-        return success_count, errors
+        for chunk, fraction in _iter_file_chunks(file, file_type, batch_size):
+            if not checked_columns:
+                errors.extend(_check_columns(table, chunk.columns))
+                checked_columns = True
+
+            chunk = chunk[[c for c in chunk.columns if c in importable]]
+            row_numbers, rows, row_errors = _validate_chunk(chunk, table, schema)
+
+            inserted, insert_errors = crud.create_many(db, rows)
+            success_count += inserted
+            row_errors.update({row_numbers[i]: message for i, message in insert_errors})
+            errors.extend(f"Row {i + 2}: {message}" for i, message in sorted(row_errors.items()))
+
+            processed += len(chunk)
+            if progress:
+                progress(processed, fraction)
 
     except Exception as e:
-        return 0, [f"File error: {str(e)}"]
+        # Batches committed before the failure stay imported
+        errors.append(f"File error: {str(e)}")
+
+    return success_count, errors
+
+
+def diff_import(
+    file,
+    crud: CRUDBase,
+    db: Session,
+    file_type: str = "csv",
+    delete_missing: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress: Optional[ImportProgress] = None,
+    schema: Optional[Type[BaseModel]] = None,
+) -> Dict[str, Any]:
+    """
+    Compare an import file with the stored records without writing (dry run).
+
+    Rows are matched to records by the table's natural key (IMPORT_KEYS) and
+    compared by their content hash (see hash_fields), looked up one batch
+    of keys at a time. Only new and changed rows are kept, so the diff - and
+    applying it with `apply_import_diff` - scales with the number of changes
+    rather than the size of the file. For keys repeated in the file the last
+    row wins. Deletions are only listed when every row could be matched: a
+    rejected row's record would otherwise be deleted. Records that share a
+    key with a row in the file are all kept.
+
+    Args:
+        file: File object to compare
+        crud: CRUD operations instance for the target model
+        db: Database session
+        file_type: Type of file ('csv', 'excel' or 'parquet')
+        delete_missing: Also list stored records whose key is not in the file
+        batch_size: Number of rows per batch
+        progress: Optional callback receiving (rows processed, fraction of file read)
+        schema: Pydantic schema for one row; defaults to IMPORT_SCHEMAS for the table
+
+    Returns:
+        Dict with "inserts" and "updates" (column dicts, updates with "id"),
+        "deletes" ({"id", *key} dicts), the "unchanged" count, "errors", and
+        the catalog "version" the diff was computed against. After a file
+        error the diff holds no changes.
+    """
+    table = crud.model.__table__
+    schema = schema or IMPORT_SCHEMAS[table.name]
+    key_columns = IMPORT_KEYS[table.name]
+    importable = _importable_columns(table)
+    # Rows are read from the primary, like the version, so the diff cannot trail it
+    with primary_reads(db):
+        diff = {
+            "inserts": [], "updates": [], "deletes": [], "unchanged": 0, "errors": [],
+            # From the database rather than the listener's copy, which can trail it
+            "version": read_catalog_version(db, table.name),
+        }
+
+        # Natural key -> (row number, stored id or None, row to write or None if unchanged)
+        decisions: Dict[tuple, Tuple[int, Optional[int], Optional[dict]]] = {}
+        processed = 0
+        rejected = 0
+        checked_columns = False
+        fields = hash_fields(table)
+
+        try:
+            for chunk, fraction in _iter_file_chunks(file, file_type, batch_size):
+                if not checked_columns:
+                    diff["errors"].extend(_check_columns(table, chunk.columns, key_columns))
+                    checked_columns = True
+
+                chunk = chunk[[c for c in chunk.columns if c in importable]]
+                row_numbers, rows, row_errors = _validate_chunk(chunk, table, schema)
+
+                keyed = []
+                for row_number, row in zip(row_numbers, rows):
+                    key = tuple(row.get(column) for column in key_columns)
+                    if None in key:
+                        row_errors[row_number] = f"{', '.join(key_columns)}: Field required to match existing records"
+                    else:
+                        keyed.append((row_number, key, row))
+                rejected += len(row_errors)
+
+                stored = crud.get_content_hashes(db, key_columns, {key for _, key, _ in keyed})
+                for row_number, key, row in keyed:
+                    if key in decisions:
+                        row_errors[decisions[key][0]] = (
+                            f"Duplicate {', '.join(f'{c} {v}' for c, v in zip(key_columns, key))}, "
+                            f"superseded by row {row_number + 2}"
+                        )
+                    row_hash = content_hash(row, fields)
+                    existing = stored.get(key)
+                    if existing is None:
+                        decisions[key] = (row_number, None, {**row, HASH_COLUMN: row_hash})
+                    elif existing[1] != row_hash:
+                        decisions[key] = (row_number, existing[0], {**row, "id": existing[0], HASH_COLUMN: row_hash})
+                    else:
+                        decisions[key] = (row_number, existing[0], None)
+
+                diff["errors"].extend(f"Row {i + 2}: {message}" for i, message in sorted(row_errors.items()))
+                processed += len(chunk)
+                if progress:
+                    progress(processed, fraction)
+
+            for _, stored_id, row in decisions.values():
+                if row is None:
+                    diff["unchanged"] += 1
+                else:
+                    diff["updates" if stored_id is not None else "inserts"].append(row)
+
+            if delete_missing and rejected:
+                diff["errors"].append(
+                    f"Deletions skipped: {rejected} rows could not be matched to records; fix them and compare again"
+                )
+            elif delete_missing:
+                # Match by key, not id: every record sharing a key in the file (such
+                # as two copies of a DVD) is kept
+                diff["deletes"] = [
+                    {"id": stored_id, **dict(zip(key_columns, key))}
+                    for stored_id, key in crud.get_keys(db, key_columns) if key not in decisions
+                ]
+
+        except Exception as e:
+            # A partial diff would delete the records after the failure point
+            diff.update(inserts=[], updates=[], deletes=[], unchanged=0)
+            diff["errors"].append(f"File error: {str(e)}")
+
+        return diff
+
+
+def apply_import_diff(crud: CRUDBase, db: Session, diff: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Apply a diff from `diff_import` in one transaction.
+
+    The catalog version is checked inside that transaction, so a write
+    committed after the preview makes the whole diff roll back.
+
+    Raises:
+        ValueError: If the table changed since the diff was computed, or the changes fail
+
+    Returns:
+        Counts of "inserted", "updated" and "deleted" records
+    """
+    crud.apply_changes(
+        db, diff["inserts"], diff["updates"], [record["id"] for record in diff["deletes"]],
+        expected_version=diff["version"],
+    )
+    return {"inserted": len(diff["inserts"]), "updated": len(diff["updates"]), "deleted": len(diff["deletes"])}
+
+
+def read_raw_catalog(path: Path = RAW_CATALOG_PATH, sheet_name: str = RAW_CATALOG_SHEET) -> pd.DataFrame:
+    """
+    Read the raw book catalog spreadsheet.
+
+    The sheet starts with title rows, so the header row is located by its
+    headers (the first row with a title column) rather than assumed to be
+    the first row. Headers are mapped to model fields; unknown columns and
+    blank rows are dropped.
+
+    Args:
+        path: Path to the .xlsx file
+        sheet_name: Worksheet to read
+
+    Returns:
+        DataFrame of raw values indexed by spreadsheet row number
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        for header_row, row in enumerate(rows, start=1):
+            fields = [header_to_field(value) for value in row]
+            if "title" in fields:
+                break
+        else:
+            raise ValueError(f"No header row with a title column in sheet '{sheet_name}'")
+
+        keep = [(i, field) for i, field in enumerate(fields) if field]
+        index, data = [], []
+        for row_number, row in enumerate(rows, start=header_row + 1):
+            if all(value is None or str(value).strip() == "" for value in row):
+                continue
+            index.append(row_number)
+            data.append([row[i] if i < len(row) else None for i, _ in keep])
+        return pd.DataFrame(data, columns=[field for _, field in keep], index=index)
+    finally:
+        workbook.close()
+
+
+def normalize_catalog(raw: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Normalize raw catalog rows into book records.
+
+    Text is stripped with internal whitespace collapsed (numeric titles such
+    as 1984 become text), counts are parsed with missing values as 0, rows
+    are validated against BookSchema, and each row gets a content hash.
+    Rows without a book number are rejected since the number identifies
+    the book between ingests; for duplicated numbers the last row wins.
+
+    Args:
+        raw: Output of read_raw_catalog
+
+    Returns:
+        Tuple of (processed DataFrame with CATALOG_FIELDS and content_hash, error messages)
+    """
+    table = Book.__table__
+    raw = raw[[column for column in raw.columns if column in CATALOG_FIELDS]].copy()
+    for name in raw.columns:
+        if table.columns[name].type.python_type is str:
+            raw[name] = raw[name].astype("string").str.split().str.join(" ")
+
+    row_numbers, rows, row_errors = _validate_chunk(raw, table, BookSchema)
+
+    books: Dict[int, Tuple[int, dict]] = {}
+    for row_number, row in zip(row_numbers, rows):
+        book_number = row.get("book_number")
+        if book_number is None:
+            row_errors[row_number] = "book_number: Field required for the catalog ingest"
+            continue
+        if book_number in books:
+            row_errors[books[book_number][0]] = f"Duplicate book number {book_number}, superseded by row {row_number}"
+        books[book_number] = (row_number, row)
+
+    columns = [field for field in CATALOG_FIELDS if field in raw.columns]
+    records = [{field: row.get(field) for field in columns} for _, row in books.values()]
+    processed = pd.DataFrame(records, columns=columns, index=[number for number, _ in books.values()])
+    for field in columns:
+        if table.columns[field].type.python_type is int:
+            processed[field] = processed[field].astype("Int64")
+    processed[HASH_COLUMN] = [content_hash(record, hash_fields(table)) for record in records]
+
+    errors = [f"Row {number}: {message}" for number, message in sorted(row_errors.items())]
+    return processed, errors
+
+
+def write_processed_catalog(catalog: pd.DataFrame, path: Path = PROCESSED_CATALOG_PATH) -> Path:
+    """Write the processed catalog as CSV (the input of load_processed_catalog)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    catalog.to_csv(path, index=False)
+    return path
+
+
+def load_processed_catalog(
+    db: Session, path: Path = PROCESSED_CATALOG_PATH, batch_size: int = IMPORT_BATCH_SIZE
+) -> Dict[str, int]:
+    """
+    Load a processed catalog, touching only new and changed books.
+
+    Each row's content hash is compared with the hash stored on the book
+    with the same book number: unknown numbers are inserted, different
+    hashes are updated, and equal hashes are skipped, all in one
+    transaction. Edits made in the app to fields outside the spreadsheet,
+    or to unchanged rows, are therefore kept.
+
+    Args:
+        db: Database session
+        path: Processed catalog CSV
+        batch_size: Rows compared per lookup query
+
+    Returns:
+        Counts of "inserted", "updated" and "unchanged" books
+    """
+    table = Book.__table__
+    inserts, updates = [], []
+    unchanged = 0
+
+    with open(path, "rb") as file:
+        for chunk, _ in _iter_csv_chunks(file, batch_size):
+            hashes = chunk.pop(HASH_COLUMN).tolist()
+            rows, row_errors = _clean_chunk(chunk, table)
+            if row_errors:
+                raise ValueError(f"Processed catalog {path} is invalid: {row_errors}")
+
+            stored = book_crud.get_content_hashes(db, ("book_number",), [(row["book_number"],) for row in rows])
+            for row, row_hash in zip(rows, hashes):
+                existing = stored.get((row["book_number"],))
+                if existing is None:
+                    inserts.append({**row, HASH_COLUMN: row_hash})
+                elif existing[1] != row_hash:
+                    updates.append({**row, "id": existing[0], HASH_COLUMN: row_hash})
+                else:
+                    unchanged += 1
+
+    book_crud.apply_changes(db, inserts, updates)
+    return {"inserted": len(inserts), "updated": len(updates), "unchanged": unchanged}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Ingest the raw catalog: raw spreadsheet -> data/processed -> database."""
+    from TeacherLibrary.data.database import init_db, session_scope
+
+    parser = argparse.ArgumentParser(description="Ingest the raw book catalog spreadsheet.")
+    parser.add_argument("--raw", type=Path, default=RAW_CATALOG_PATH, help="Raw catalog .xlsx")
+    parser.add_argument("--sheet", default=RAW_CATALOG_SHEET, help="Worksheet name")
+    parser.add_argument("--processed", type=Path, default=PROCESSED_CATALOG_PATH, help="Processed CSV to write")
+    parser.add_argument("--no-load", action="store_true", help="Only write the processed file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    catalog, errors = normalize_catalog(read_raw_catalog(args.raw, args.sheet))
+    for error in errors:
+        logger.warning(error)
+    write_processed_catalog(catalog, args.processed)
+    logger.info(f"Wrote {len(catalog)} books to {args.processed} ({len(errors)} rows skipped)")
+
+    if not args.no_load:
+        init_db()
+        with session_scope() as db:
+            stats = load_processed_catalog(db, args.processed)
+        logger.info(
+            f"Loaded catalog: {stats['inserted']} inserted, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""
+Shared client for book metadata lookups on the Google Books API.
+
+All lookups go through one pooled `requests.Session`, so connections are kept
+alive and reused, and through a persistent SQLite response cache. Found
+volumes are cached for METADATA_CACHE_TTL_DAYS; "not found" answers are cached
+too (negative caching) for METADATA_NEGATIVE_TTL_HOURS, so re-scanning an ISBN
+or re-running the enrichment script does not repeat identical requests.
+Network errors are never cached.
+
+Requests that do reach the network draw from a shared token bucket, so any
+number of concurrent lookups stays within METADATA_RATE_LIMIT, and HTTP 429
+and 5xx answers are retried with exponential backoff (honouring Retry-After).
+
+Callers look books up through a MetadataProvider. The client is the remote
+provider; `get_metadata_provider()` chains it behind the providers listed in
+METADATA_PROVIDERS, e.g. a local Open Library index that answers offline.
+"""
+import abc
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from TeacherLibrary.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataProvider(abc.ABC):
+    """
+    Source of book metadata.
+
+    Lookups return a Google Books style volumeInfo dict (title, authors,
+    publisher, publishedDate, description, categories), or None if the book
+    is unknown. Providers raise on failures such as network errors, so
+    callers can tell "not found" from "could not ask".
+    """
+
+    name = "provider"
+
+    @abc.abstractmethod
+    def volume_by_isbn(self, isbn: str) -> Optional[Dict[str, Any]]:
+        """volumeInfo for a normalized ISBN-13, or None."""
+
+    @abc.abstractmethod
+    def volume_by_title(self, title: str, author: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """volumeInfo of the best title (and author) match, or None."""
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lookup counters."""
+        return {}
+
+    def close(self):
+        """Release connections and files."""
+
+
+class ChainProvider(MetadataProvider):
+    """
+    Ask providers in order, merging their answers.
+
+    The first provider that knows the book supplies the volume; later
+    providers are only asked while it lacks any of `complete_fields`, and
+    fill just the missing fields. A local index entry without a description
+    therefore still gets one from Google Books, while complete entries never
+    leave the machine.
+    """
+
+    name = "chain"
+
+    # volumeInfo fields the app fills from lookups (author, year, description, genre)
+    COMPLETE_FIELDS = ("authors", "publishedDate", "description", "categories")
+
+    def __init__(self, providers: Sequence[MetadataProvider], complete_fields: Sequence[str] = COMPLETE_FIELDS):
+        """Initialize with providers, fastest (e.g. local) first."""
+        self.providers = list(providers)
+        self.complete_fields = tuple(complete_fields)
+
+    def _missing(self, volume: Dict[str, Any]) -> List[str]:
+        return [field for field in self.complete_fields if not volume.get(field)]
+
+    def _lookup(self, method: str, *args) -> Optional[Dict[str, Any]]:
+        volume = None
+        error = None
+        for provider in self.providers:
+            try:
+                answer = getattr(provider, method)(*args)
+            except Exception as e:
+                # Try the next provider; only fail if nobody found the book
+                logger.warning(f"Metadata provider {provider.name} failed: {e}")
+                error = e
+                continue
+            if answer is None:
+                continue
+            if volume is None:
+                volume = dict(answer)
+            else:
+                volume.update({field: answer[field] for field in self._missing(volume) if answer.get(field)})
+            if not self._missing(volume):
+                break
+        if volume is None and error is not None:
+            raise error
+        return volume
+
+    def volume_by_isbn(self, isbn: str) -> Optional[Dict[str, Any]]:
+        """volumeInfo for the ISBN, completed by later providers where needed, or None."""
+        return self._lookup("volume_by_isbn", isbn)
+
+    def volume_by_title(self, title: str, author: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """volumeInfo of the title match, completed by later providers where needed, or None."""
+        return self._lookup("volume_by_title", title, author)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters per provider name."""
+        return {provider.name: provider.snapshot() for provider in self.providers}
+
+    def close(self):
+        """Close every provider."""
+        for provider in self.providers:
+            provider.close()
+
+
+class MetadataCache:
+    """SQLite-backed cache of lookup results, including misses."""
+
+    def __init__(self, path: str, ttl_seconds: float, negative_ttl_seconds: float):
+        """Open (or create) the cache database at path (":memory:" for a throwaway cache)."""
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, found INTEGER NOT NULL, body TEXT, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Look up a cached result.
+
+        Returns:
+            Tuple of (cached, value); value is None for a cached "not found"
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found, body FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[1]) if row[0] else None
+
+    def set(self, key: str, value: Optional[Dict[str, Any]]):
+        """Cache a result; None records "not found" with the negative TTL."""
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        body = json.dumps(value) if value is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, found, body, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value is not None, body, time.time() + ttl),
+            )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns the number removed."""
+        with self._lock:
+            return self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def close(self):
+        """Close the cache database."""
+        with self._lock:
+            self._conn.close()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` saved up."""
+
+    def __init__(self, rate: float, capacity: Optional[int] = None):
+        """Initialize a full bucket; capacity defaults to one second's worth of tokens."""
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        # _updated lies in the future while the bucket is paused
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        """Take one token, blocking until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._updated - now, 0) + (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Empty the bucket and hand out no tokens for `seconds` (e.g. after HTTP 429)."""
+        with self._lock:
+            self._tokens = 0
+            self._updated = max(self._updated, time.monotonic() + seconds)
+
+
+class MetadataClient(MetadataProvider):
+    """Google Books volume lookups over a pooled session with a response cache."""
+
+    name = "google"
+
+    def __init__(
+        self,
+        base_url: str = "https://www.googleapis.com/books/v1/volumes",
+        cache: Optional[MetadataCache] = None,
+        timeout: float = 10,
+        pool_size: int = 10,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = 0,
+        backoff_seconds: float = 1.0,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Volumes search endpoint
+            cache: Response cache; lookups are not cached if None
+            timeout: Request timeout in seconds
+            pool_size: Connections kept alive per host
+            rate_limiter: Token bucket every network request draws from
+            max_retries: Retries of a request answered with HTTP 429 or 5xx
+            backoff_seconds: First retry delay, doubled on each further retry
+        """
+        self.base_url = base_url
+        self.cache = cache
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats_lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "negative_hits": 0, "requests": 0, "retries": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        """Seconds to wait before retrying: Retry-After if given, else exponential backoff with jitter."""
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_seconds * 2 ** attempt * random.uniform(0.75, 1.25)
+
+    def _get(self, query: str) -> Dict[str, Any]:
+        """Send one search request, retrying HTTP 429/5xx answers with backoff."""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            self._count("requests")
+            response = self.session.get(self.base_url, params={"q": query}, timeout=self.timeout)
+            retryable = response.status_code == 429 or response.status_code >= 500
+            if not retryable or attempt == self.max_retries:
+                break
+            delay = self._retry_delay(response, attempt)
+            logger.info(f"Metadata lookup got HTTP {response.status_code}, retrying in {delay:.1f} s")
+            self._count("retries")
+            if self.rate_limiter is not None:
+                # Everyone sharing the limiter backs off, not just this thread
+                self.rate_limiter.pause(delay)
+            else:
+                time.sleep(delay)
+        response.raise_for_status()
+        return response.json()
+
+    def first_volume(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the volumeInfo of the first search result for a query.
+
+        Args:
+            query: Google Books query, e.g. "isbn:9780061120084"
+
+        Returns:
+            volumeInfo dict, or None if nothing was found
+
+        Raises:
+            requests.RequestException: On network or HTTP errors, after any
+                retries (not cached)
+        """
+        self._count("lookups")
+        key = f"{self.base_url}?q={query}"
+        if self.cache is not None:
+            cached, value = self.cache.get(key)
+            if cached:
+                self._count("hits" if value is not None else "negative_hits")
+                return value
+
+        try:
+            data = self._get(query)
+        except (requests.RequestException, ValueError):
+            self._count("errors")
+            raise
+
+        items = data.get("items") or []
+        volume = items[0].get("volumeInfo") if data.get("totalItems", 0) and items else None
+        if self.cache is not None:
+            self.cache.set(key, volume)
+        return volume
+
+    def volume_by_isbn(self, isbn: str) -> Optional[Dict[str, Any]]:
+        """volumeInfo for a cleaned ISBN, or None."""
+        return self.first_volume(f"isbn:{isbn}")
+
+    def volume_by_title(self, title: str, author: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """volumeInfo of the best title (and author) match, or None."""
+        query = f"intitle:{title}"
+        if author:
+            query += f" inauthor:{author}"
+        return self.first_volume(query)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lookup counters with the cache hit rate (positive and negative hits)."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = (stats["hits"] + stats["negative_hits"]) / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+    def close(self):
+        """Close pooled connections and the cache."""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def create_metadata_client(
+    base_url: Optional[str] = None,
+    rate_limit: Optional[float] = None,
+    burst: Optional[int] = None,
+    pool_size: int = 10,
+) -> MetadataClient:
+    """
+    Create a client with the configured cache, rate limit and retries.
+
+    Args:
+        base_url: Volumes endpoint, defaults to GOOGLE_BOOKS_URL (e.g. a local stub server)
+        rate_limit: Requests per second, defaults to METADATA_RATE_LIMIT
+        burst: Token bucket size, defaults to METADATA_BURST
+        pool_size: Connections kept alive; at least the number of worker threads
+
+    Returns:
+        New MetadataClient
+    """
+    cache = None
+    if Config.METADATA_CACHE_PATH:
+        cache = MetadataCache(
+            Config.METADATA_CACHE_PATH,
+            ttl_seconds=Config.METADATA_CACHE_TTL_DAYS * 86400,
+            negative_ttl_seconds=Config.METADATA_NEGATIVE_TTL_HOURS * 3600,
+        )
+    return MetadataClient(
+        base_url=base_url or Config.GOOGLE_BOOKS_URL,
+        cache=cache,
+        pool_size=pool_size,
+        rate_limiter=TokenBucket(rate_limit or Config.METADATA_RATE_LIMIT, burst or Config.METADATA_BURST),
+        max_retries=Config.METADATA_MAX_RETRIES,
+    )
+
+
+_client: Optional[MetadataClient] = None
+_client_lock = threading.Lock()
+
+
+def get_metadata_client() -> MetadataClient:
+    """Get the process-wide metadata client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_metadata_client()
+    return _client
+
+
+def create_metadata_provider(remote: Optional[MetadataClient] = None) -> MetadataProvider:
+    """
+    Build the provider chain configured in METADATA_PROVIDERS.
+
+    'local' is the Open Library index at METADATA_LOCAL_INDEX (skipped if it
+    has not been built), 'google' the remote client. Leave 'google' out to
+    never go online.
+
+    Args:
+        remote: Remote client to use for 'google' (default: the shared one)
+
+    Returns:
+        The single configured provider, or a ChainProvider over several
+    """
+    from TeacherLibrary.data.openlibrary_index import LocalIndexProvider
+
+    providers: List[MetadataProvider] = []
+    for name in (part.strip() for part in Config.METADATA_PROVIDERS.split(",")):
+        if name == "local":
+            if os.path.exists(Config.METADATA_LOCAL_INDEX):
+                providers.append(LocalIndexProvider(Config.METADATA_LOCAL_INDEX))
+            else:
+                logger.info(f"Local metadata index {Config.METADATA_LOCAL_INDEX} not found, skipping it")
+        elif name == "google":
+            providers.append(remote or get_metadata_client())
+        elif name:
+            raise ValueError(f"Unknown metadata provider: {name}")
+    return providers[0] if len(providers) == 1 else ChainProvider(providers)
+
+
+_provider: Optional[MetadataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_metadata_provider() -> MetadataProvider:
+    """Get the process-wide provider chain, creating it on first use."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_metadata_provider()
+    return _provider
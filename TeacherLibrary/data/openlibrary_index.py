@@ -0,0 +1,289 @@
+"""
+Local bibliographic index built from an Open Library data dump.
+
+The editions dump (https://openlibrary.org/developers/dumps, optionally with
+the authors dump for author names) is loaded once into a SQLite file indexed
+by ISBN-13 and normalized title. LocalIndexProvider answers lookups from that
+file in well under a millisecond and without network access; put it in front
+of Google Books with METADATA_PROVIDERS=local,google.
+
+Usage:
+    python -m TeacherLibrary.data.openlibrary_index ol_dump_editions.txt.gz \
+        [--authors ol_dump_authors.txt.gz] [--output data/interim/openlibrary_index.sqlite]
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from TeacherLibrary.config import Config
+from TeacherLibrary.data.fetch_isbn import normalize_isbn
+from TeacherLibrary.data.metadata_client import MetadataProvider
+
+logger = logging.getLogger(__name__)
+
+# Rows written per transaction while building the index
+BUILD_BATCH_SIZE = 10000
+# Subjects kept as categories (they end up in the 100-character genre field)
+MAX_SUBJECTS = 2
+
+_LEADING_ARTICLE = re.compile(r"^(the|a|an) ")
+_YEAR = re.compile(r"\b(\d{4})\b")
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """
+    Normalize a title for matching: no accents, punctuation, case or leading article.
+
+    Example:
+        >>> normalize_title("The Catcher in the Rye!")
+        'catcher in the rye'
+    """
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = " ".join(re.sub(r"[^\w]+", " ", text).split())
+    return _LEADING_ARTICLE.sub("", text)
+
+
+def _iter_dump(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the JSON records of an Open Library dump (tab-separated, optionally gzipped)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line.rsplit("\t", 1)[-1])
+            except ValueError:
+                continue
+
+
+def _text(value: Any) -> Optional[str]:
+    """Plain string from a dump field that may be {"type": "/type/text", "value": ...}."""
+    if isinstance(value, dict):
+        value = value.get("value")
+    return value.strip() or None if isinstance(value, str) else None
+
+
+def _edition_row(record: Dict[str, Any]) -> Optional[Tuple[tuple, List[str], List[str]]]:
+    """(book row, ISBN-13s, author keys) for an edition with a title and at least one valid ISBN."""
+    title = _text(record.get("title"))
+    isbns = {normalize_isbn(isbn) for isbn in record.get("isbn_13", []) + record.get("isbn_10", [])}
+    isbns.discard(None)
+    if not title or not isbns:
+        return None
+
+    year = _YEAR.search(record.get("publish_date") or "")
+    subjects = [s for s in record.get("subjects", []) if isinstance(s, str)][:MAX_SUBJECTS]
+    by_statement = _text(record.get("by_statement"))
+    row = (
+        title,
+        normalize_title(title),
+        by_statement.rstrip(".") if by_statement else None,
+        (record.get("publishers") or [None])[0],
+        year.group(1) if year else None,
+        _text(record.get("description")),
+        ", ".join(subjects) or None,
+    )
+    author_keys = [a["key"] for a in record.get("authors", []) if isinstance(a, dict) and a.get("key")]
+    return row, sorted(isbns), author_keys
+
+
+def build_index(editions_path: str, output_path: str, authors_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Build the SQLite index from Open Library dump files.
+
+    The index is written to a temporary file and renamed into place, so a
+    running app keeps reading the previous index until the new one is done.
+
+    Args:
+        editions_path: Editions dump (.txt or .txt.gz)
+        output_path: Index file to create or replace
+        authors_path: Optional authors dump, for author names
+
+    Returns:
+        Counts of books, ISBNs and authors loaded
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.building"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript("""
+        PRAGMA journal_mode=OFF;
+        PRAGMA synchronous=OFF;
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY, title TEXT NOT NULL, norm_title TEXT NOT NULL, authors TEXT,
+            publisher TEXT, published TEXT, description TEXT, subjects TEXT
+        );
+        CREATE TABLE isbns (isbn TEXT PRIMARY KEY, book_id INTEGER NOT NULL) WITHOUT ROWID;
+        CREATE TABLE book_authors (book_id INTEGER NOT NULL, position INTEGER NOT NULL, author_key TEXT NOT NULL);
+        CREATE TABLE authors (key TEXT PRIMARY KEY, name TEXT NOT NULL) WITHOUT ROWID;
+    """)
+    counts = {"books": 0, "isbns": 0, "authors": 0}
+    try:
+        book_id = 0
+        books, isbns, book_authors = [], [], []
+
+        def flush():
+            conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?)", books)
+            # The first edition seen keeps an ISBN listed on several editions
+            conn.executemany("INSERT OR IGNORE INTO isbns VALUES (?, ?)", isbns)
+            conn.executemany("INSERT INTO book_authors VALUES (?, ?, ?)", book_authors)
+            conn.commit()
+            books.clear()
+            isbns.clear()
+            book_authors.clear()
+
+        for record in _iter_dump(editions_path):
+            parsed = _edition_row(record)
+            if parsed is None:
+                continue
+            row, edition_isbns, author_keys = parsed
+            book_id += 1
+            books.append((book_id, *row))
+            isbns.extend((isbn, book_id) for isbn in edition_isbns)
+            book_authors.extend((book_id, position, key) for position, key in enumerate(author_keys))
+            if len(books) >= BUILD_BATCH_SIZE:
+                flush()
+        flush()
+        counts["books"] = book_id
+
+        if authors_path:
+            conn.execute("CREATE INDEX ix_book_authors_key ON book_authors (author_key)")
+            wanted = {key for (key,) in conn.execute("SELECT DISTINCT author_key FROM book_authors")}
+            rows = []
+            for record in _iter_dump(authors_path):
+                if record.get("key") in wanted and _text(record.get("name")):
+                    rows.append((record["key"], _text(record["name"])))
+                    if len(rows) >= BUILD_BATCH_SIZE:
+                        conn.executemany("INSERT OR IGNORE INTO authors VALUES (?, ?)", rows)
+                        rows.clear()
+            conn.executemany("INSERT OR IGNORE INTO authors VALUES (?, ?)", rows)
+            counts["authors"] = conn.execute("SELECT COUNT(*) FROM authors").fetchone()[0]
+            # Author names replace the free-text "by" statement where known
+            conn.execute("""
+                UPDATE books SET authors = names.authors FROM (
+                    SELECT ba.book_id, group_concat(a.name, ', ') AS authors
+                    FROM (SELECT * FROM book_authors ORDER BY book_id, position) ba
+                    JOIN authors a ON a.key = ba.author_key
+                    GROUP BY ba.book_id
+                ) AS names WHERE books.id = names.book_id
+            """)
+
+        conn.executescript("""
+            DROP TABLE book_authors;
+            DROP TABLE authors;
+            CREATE INDEX ix_books_norm_title ON books (norm_title);
+        """)
+        counts["isbns"] = conn.execute("SELECT COUNT(*) FROM isbns").fetchone()[0]
+        conn.commit()
+        conn.execute("VACUUM")
+    except BaseException:
+        conn.close()
+        os.unlink(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, output_path)
+    return counts
+
+
+class LocalIndexProvider(MetadataProvider):
+    """Metadata lookups in a local index built by build_index."""
+
+    name = "local"
+
+    def __init__(self, path: str):
+        """Open the index read-only."""
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "seconds": 0.0}
+
+    def _query(self, sql: str, params: tuple) -> List[tuple]:
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._stats["lookups"] += 1
+            self._stats["hits"] += bool(rows)
+            self._stats["seconds"] += time.perf_counter() - start
+        return rows
+
+    @staticmethod
+    def _volume(row: tuple) -> Dict[str, Any]:
+        """Google Books style volumeInfo from a books row."""
+        title, authors, publisher, published, description, subjects = row
+        volume = {"title": title, "authors": authors.split(", ") if authors else []}
+        if publisher:
+            volume["publisher"] = publisher
+        if published:
+            volume["publishedDate"] = published
+        if description:
+            volume["description"] = description
+        volume["categories"] = subjects.split(", ") if subjects else []
+        return volume
+
+    def volume_by_isbn(self, isbn: str) -> Optional[Dict[str, Any]]:
+        """volumeInfo for a normalized ISBN-13, or None."""
+        rows = self._query(
+            "SELECT title, authors, publisher, published, description, subjects "
+            "FROM isbns JOIN books ON books.id = isbns.book_id WHERE isbn = ?",
+            (isbn,),
+        )
+        return self._volume(rows[0]) if rows else None
+
+    def volume_by_title(self, title: str, author: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        volumeInfo of an edition with the same normalized title, or None.
+
+        With an author, only editions sharing a name part with it match (as
+        Google's inauthor: does). Editions with a description are preferred.
+        """
+        rows = self._query(
+            "SELECT title, authors, publisher, published, description, subjects FROM books "
+            "WHERE norm_title = ? ORDER BY description IS NULL, authors IS NULL, id LIMIT 50",
+            (normalize_title(title),),
+        )
+        if author:
+            wanted = {part for part in normalize_title(author).split() if len(part) > 2}
+            rows = [row for row in rows if wanted & set(normalize_title(row[1]).split())]
+        return self._volume(rows[0]) if rows else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lookups, hits and mean lookup time."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mean_ms"] = stats.pop("seconds") * 1000 / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+    def close(self):
+        """Close the index."""
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    """Build the local index from dump files."""
+    parser = argparse.ArgumentParser(description="Build the local Open Library metadata index.")
+    parser.add_argument("editions", help="Open Library editions dump (.txt or .txt.gz)")
+    parser.add_argument("--authors", help="Open Library authors dump, for author names")
+    parser.add_argument("--output", default=Config.METADATA_LOCAL_INDEX, help="Index file to write")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    start = time.perf_counter()
+    counts = build_index(args.editions, args.output, args.authors)
+    logger.info(
+        f"Indexed {counts['books']} editions, {counts['isbns']} ISBNs and {counts['authors']} author names "
+        f"into {args.output} in {time.perf_counter() - start:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
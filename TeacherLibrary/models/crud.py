@@ -1,19 +1,55 @@
 """Generic CRUD operations."""
 import logging
-from typing import Any, Dict, List, Optional, Type, TypeVar
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Type, TypeVar
 
-from sqlalchemy import or_
+from sqlalchemy import Select, delete, func, insert, literal, or_, select, tuple_, union_all, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from TeacherLibrary.data.catalog_version import bump_catalog_version, read_catalog_version
 from TeacherLibrary.data.database import Base
-from TeacherLibrary.models.schemas import Book, DVD
+from TeacherLibrary.models.schemas import Book, DVD, search_filter
 
 logger = logging.getLogger(__name__)
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
+def _select_all(
+    model: Type[ModelType],
+    skip: int,
+    limit: int,
+    sort_by: Optional[str],
+    search: Optional[str],
+    filters: Dict[str, Any],
+) -> Select:
+    """Build the list query shared by the sync and async CRUD classes."""
+    query = select(model)
+
+    # Apply search filter (matches the trigram index on the search document)
+    if search:
+        query = query.where(search_filter(model, search))
+
+    # Apply field filters
+    for key, value in filters.items():
+        if value is not None and hasattr(model, key):
+            query = query.where(getattr(model, key) == value)
+
+    # Apply sorting; id breaks ties so offset pages neither repeat nor skip rows
+    if sort_by and hasattr(model, sort_by):
+        query = query.order_by(getattr(model, sort_by))
+        if sort_by != "id":
+            query = query.order_by(model.id)
+
+    return query.offset(skip).limit(limit)
+
+
+def _is_missing(column):
+    """SQL predicate for an unset value: NULL, or '' / 0 (falsy, like `not value` in Python)."""
+    return or_(column.is_(None), column == ("" if column.type.python_type is str else 0))
+
+
 class CRUDBase:
     """Generic CRUD operations."""
 
@@ -26,6 +62,9 @@ class CRUDBase:
         try:
             db_obj = self.model(**obj_data)
             db.add(db_obj)
+            # Write (and lock) the row before the version counter, as every write path does
+            db.flush()
+            bump_catalog_version(db, self.model.__tablename__)
             db.commit()
             db.refresh(db_obj)
             return db_obj
@@ -34,6 +73,182 @@ class CRUDBase:
             logger.error(f"Error creating {self.model.__name__}: {e}")
             raise ValueError(f"Failed to create {self.model.__name__}: {str(e)}")
 
+    def _execute_batch(self, db: Session, statement, rows: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Execute a bulk statement for a batch of rows, isolating rejected rows.
+
+        The batch runs as one statement inside a savepoint. If any row is
+        rejected, only that savepoint is rolled back and the rows are retried
+        one at a time, each in its own savepoint, so a bad row costs itself
+        rather than the batch. Does not commit.
+
+        Returns:
+            Tuple of (rows written, list of (index in rows, error message))
+        """
+        try:
+            with db.begin_nested():
+                db.execute(statement, rows)
+            return len(rows), []
+        except SQLAlchemyError:
+            written = 0
+            errors = []
+            for index, row in enumerate(rows):
+                try:
+                    with db.begin_nested():
+                        db.execute(statement, [row])
+                    written += 1
+                except SQLAlchemyError as e:
+                    message = str(getattr(e, "orig", None) or e).strip().splitlines()[0]
+                    errors.append((index, message))
+            return written, errors
+
+    def create_many(self, db: Session, rows: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Insert a batch of records and commit.
+
+        The batch goes to the database as one multi-row INSERT; rows the
+        database rejects are skipped and reported, the rest are inserted.
+
+        Args:
+            db: Database session
+            rows: Column dicts with the same keys
+
+        Returns:
+            Tuple of (inserted count, list of (index in rows, error message))
+        """
+        if not rows:
+            return 0, []
+
+        try:
+            inserted, errors = self._execute_batch(db, insert(self.model.__table__), rows)
+            if inserted:
+                bump_catalog_version(db, self.model.__tablename__)
+            db.commit()
+            return inserted, errors
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error creating {self.model.__name__} batch: {e}")
+            raise ValueError(f"Failed to create {self.model.__name__} batch: {str(e)}")
+
+    def update_many(self, db: Session, rows: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Update a batch of records by primary key and commit.
+
+        The batch goes to the database as one bulk UPDATE; rows the database
+        rejects (e.g. a value too long for its column) are skipped and
+        reported, the rest are updated.
+
+        Args:
+            db: Database session
+            rows: Column dicts, each including the record's "id"
+
+        Returns:
+            Tuple of (updated count, list of (index in rows, error message))
+        """
+        if not rows:
+            return 0, []
+
+        try:
+            # ORM bulk UPDATE by primary key, batched per set of columns
+            updated, errors = self._execute_batch(db, update(self.model), rows)
+            if updated:
+                bump_catalog_version(db, self.model.__tablename__)
+            db.commit()
+            return updated, errors
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error updating {self.model.__name__} batch: {e}")
+            raise ValueError(f"Failed to update {self.model.__name__} batch: {str(e)}")
+
+    def get_content_hashes(
+        self, db: Session, key_columns: Sequence[str], keys: Optional[Iterable[tuple]] = None
+    ) -> Dict[tuple, Tuple[int, Optional[str]]]:
+        """
+        Map natural keys of stored records to their (id, content_hash).
+
+        Args:
+            db: Database session
+            key_columns: Columns forming the natural key, e.g. ("book_number",)
+            keys: Only look up these key tuples; all records if None
+
+        Returns:
+            Dict of key tuple -> (id, content_hash)
+        """
+        columns = [getattr(self.model, name) for name in key_columns]
+        query = select(self.model.id, self.model.content_hash, *columns)
+        if keys is not None:
+            keys = list(keys)
+            if not keys:
+                return {}
+            if len(columns) == 1:
+                query = query.where(columns[0].in_([key[0] for key in keys]))
+            else:
+                query = query.where(tuple_(*columns).in_(keys))
+        return {tuple(row[2:]): (row[0], row[1]) for row in db.execute(query)}
+
+    def get_keys(self, db: Session, key_columns: Sequence[str]) -> List[Tuple[int, tuple]]:
+        """
+        List (id, natural key tuple) for every stored record.
+
+        Unlike get_content_hashes this keeps records that share a key.
+        """
+        columns = [getattr(self.model, name) for name in key_columns]
+        return [(row[0], tuple(row[1:])) for row in db.execute(select(self.model.id, *columns))]
+
+    def apply_changes(
+        self,
+        db: Session,
+        inserts: List[Dict[str, Any]],
+        updates: List[Dict[str, Any]],
+        deletes: Sequence[int] = (),
+        batch_size: int = 1000,
+        expected_version: Optional[int] = None,
+    ) -> None:
+        """
+        Insert, update and delete records in one transaction.
+
+        Args:
+            db: Database session
+            inserts: Column dicts for new records
+            updates: Column dicts for existing records, each including its "id"
+            deletes: IDs of records to delete
+            batch_size: IDs per DELETE statement
+            expected_version: Only commit if the table is still at this catalog
+                version; checked in the same transaction, after the rows are
+                written and before the version counter is bumped
+
+        Raises:
+            ValueError: If the table changed since expected_version, or the changes fail
+        """
+        if not inserts and not updates and not deletes:
+            return
+        try:
+            if inserts:
+                db.execute(insert(self.model.__table__), inserts)
+            if updates:
+                # ORM bulk UPDATE by primary key, batched per set of columns
+                db.execute(update(self.model), updates)
+            deletes = list(deletes)
+            for start in range(0, len(deletes), batch_size):
+                db.execute(
+                    delete(self.model.__table__).where(self.model.id.in_(deletes[start:start + batch_size]))
+                )
+            # The counter is locked after the rows, in the same order as every writer
+            if expected_version is not None:
+                current = read_catalog_version(db, self.model.__tablename__, for_update=True)
+                if current != expected_version:
+                    db.rollback()
+                    raise ValueError(
+                        f"{self.model.__name__} records changed since version {expected_version} "
+                        f"(now {current}); reload and try again"
+                    )
+            bump_catalog_version(db, self.model.__tablename__)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error applying {self.model.__name__} changes: {e}")
+            raise ValueError(f"Failed to apply {self.model.__name__} changes: {str(e)}")
+
     def get(self, db: Session, id: int) -> Optional[ModelType]:
         """Get record by ID."""
         return db.query(self.model).filter(self.model.id == id).first()
@@ -48,27 +263,95 @@ class CRUDBase:
         **filters,
     ) -> List[ModelType]:
         """Get all records with optional filtering and sorting."""
-        query = db.query(self.model)
+        query = _select_all(self.model, skip, limit, sort_by, search, filters)
+        return list(db.scalars(query).all())
 
-        # Apply search filter
-        if search:
-            search_cols = [
-                col for col in self.model.__table__.columns if col.type.python_type == str
-            ]
-            query = query.filter(
-                or_(*[col.ilike(f"%{search}%") for col in search_cols])
-            )
-
-        # Apply field filters
-        for key, value in filters.items():
-            if value is not None and hasattr(self.model, key):
-                query = query.filter(getattr(self.model, key) == value)
+    def count(self, db: Session, search: Optional[str] = None, **filters) -> int:
+        """Count records matching the same search and filters as get_all."""
+        query = _select_all(self.model, 0, None, None, search, filters)
+        return db.scalar(select(func.count()).select_from(query.subquery()))
+
+    def iter_batches(
+        self,
+        db: Session,
+        columns: Sequence[str],
+        batch_size: int = 5000,
+        sort_by: Optional[str] = None,
+        search: Optional[str] = None,
+        **filters,
+    ) -> Iterator[List[tuple]]:
+        """
+        Stream the rows matching get_all's search and filters in batches.
+
+        Uses a server-side cursor (yield_per), so only one batch is in memory
+        at a time. The session must stay open while the iterator is consumed.
+
+        Args:
+            db: Database session
+            columns: Columns to select, in output order
+            batch_size: Rows fetched per round-trip
+            sort_by: Column to sort by; defaults to id for a stable order
+            search: Free-text search, as in get_all
+            **filters: Column equality filters, as in get_all
 
-        # Apply sorting
-        if sort_by and hasattr(self.model, sort_by):
-            query = query.order_by(getattr(self.model, sort_by))
+        Yields:
+            Lists of row tuples
+        """
+        query = _select_all(self.model, 0, None, sort_by or "id", search, filters)
+        query = query.with_only_columns(*[getattr(self.model, name) for name in columns])
+        result = db.execute(query, execution_options={"yield_per": batch_size})
+        try:
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+        finally:
+            result.close()
+
+    def get_missing(
+        self,
+        db: Session,
+        fields: Sequence[str],
+        columns: Sequence[str],
+        after_id: int = 0,
+        limit: int = 1000,
+    ) -> List[Tuple[tuple, List[str]]]:
+        """
+        Get the next records with any of the given fields unset, in id order.
 
-        return query.offset(skip).limit(limit).all()
+        The filter runs in SQL and only the requested columns plus one flag per
+        field are fetched, so complete records cost nothing on the Python side.
+        Page through all of them by passing the last id seen as after_id; no
+        cursor stays open between pages, so the session can write in between.
+
+        Args:
+            db: Database session
+            fields: Fields to check; NULL, '' and 0 count as unset
+            columns: Columns to select, in output order
+            after_id: Only records with a higher id
+            limit: Maximum number of records
+
+        Returns:
+            List of (row tuple, names of the unset fields)
+        """
+        flags = [_is_missing(getattr(self.model, field)).label(f"missing_{field}") for field in fields]
+        query = (
+            select(*[getattr(self.model, name) for name in columns], *flags)
+            .where(self.model.id > after_id)
+            .where(or_(*[flag.element for flag in flags]))
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        return [
+            (tuple(row[:len(columns)]), [field for field, unset in zip(fields, row[len(columns):]) if unset])
+            for row in db.execute(query)
+        ]
+
+    def get_distinct(self, db: Session, column: str) -> List[Any]:
+        """Get the sorted distinct non-empty values of a column (e.g. genres for a filter)."""
+        col = getattr(self.model, column)
+        query = select(col).where(col.is_not(None)).distinct().order_by(col)
+        if col.type.python_type == str:
+            query = query.where(col != "")
+        return list(db.scalars(query).all())
 
     def update(self, db: Session, id: int, obj_data: Dict[str, Any]) -> Optional[ModelType]:
         """Update a record."""
@@ -80,6 +363,8 @@ class CRUDBase:
 
             for key, value in obj_data.items():
                 setattr(db_obj, key, value)
+            db.flush()
+            bump_catalog_version(db, self.model.__tablename__)
             db.commit()
             db.refresh(db_obj)
             return db_obj
@@ -97,6 +382,8 @@ class CRUDBase:
                 return False
 
             db.delete(db_obj)
+            db.flush()
+            bump_catalog_version(db, self.model.__tablename__)
             db.commit()
             return True
         except SQLAlchemyError as e:
@@ -105,6 +392,295 @@ class CRUDBase:
             raise ValueError(f"Failed to delete {self.model.__name__}: {str(e)}")
 
 
+class BookCRUD(CRUDBase):
+    """CRUD operations for books, with atomic checkout and return."""
+
+    def _adjust_borrowed(self, db: Session, id: int, delta: int) -> Optional[int]:
+        """
+        Change borrowed_count by delta in a single conditional UPDATE.
+
+        The bounds check runs inside the UPDATE, so concurrent sessions cannot
+        lose updates or over-borrow. Returns the new count, or None if the
+        book does not exist or the change would break 0 <= borrowed <= total.
+        """
+        stmt = (
+            update(Book)
+            .where(Book.id == id)
+            .where(Book.borrowed_count + delta >= 0)
+            .where(Book.borrowed_count + delta <= Book.total_count)
+            .values(borrowed_count=Book.borrowed_count + delta)
+            .returning(Book.borrowed_count)
+            .execution_options(synchronize_session=False)
+        )
+        return db.execute(stmt).scalar_one_or_none()
+
+    def _unavailable_error(self, db: Session, id: int, quantity: int, action: str) -> ValueError:
+        """Build the error for a rejected checkout or return."""
+        book = self.get(db, id)
+        if not book:
+            return ValueError(f"Book with id {id} not found")
+        if action == "checkout":
+            available = book.total_count - book.borrowed_count
+            return ValueError(f"Cannot check out {quantity} of '{book.title}': only {available} available")
+        return ValueError(f"Cannot return {quantity} of '{book.title}': only {book.borrowed_count} borrowed")
+
+    def _apply_borrowed(self, db: Session, changes: Mapping[int, int], action: str) -> Dict[int, int]:
+        """Apply borrowed_count deltas for several books in one transaction."""
+        try:
+            new_counts = {}
+            # Lock rows in id order so concurrent batches cannot deadlock
+            for id in sorted(changes):
+                delta = changes[id] if action == "checkout" else -changes[id]
+                new_count = self._adjust_borrowed(db, id, delta)
+                if new_count is None:
+                    error = self._unavailable_error(db, id, changes[id], action)
+                    db.rollback()
+                    raise error
+                new_counts[id] = new_count
+            bump_catalog_version(db, Book.__tablename__)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Error during book {action}: {e}")
+            raise ValueError(f"Failed to {action} books: {str(e)}")
+
+        # Refresh any loaded instances, since the UPDATE bypassed the ORM
+        for id in new_counts:
+            db_obj = db.identity_map.get(db.identity_key(Book, id))
+            if db_obj is not None:
+                db.expire(db_obj, ["borrowed_count"])
+        return new_counts
+
+    def checkout(self, db: Session, id: int, quantity: int = 1) -> int:
+        """
+        Check out copies of a book atomically.
+
+        Returns:
+            The new borrowed_count
+
+        Raises:
+            ValueError: If the book does not exist or not enough copies are available
+        """
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        return self._apply_borrowed(db, {id: quantity}, "checkout")[id]
+
+    def return_copies(self, db: Session, id: int, quantity: int = 1) -> int:
+        """
+        Return borrowed copies of a book atomically.
+
+        Returns:
+            The new borrowed_count
+
+        Raises:
+            ValueError: If the book does not exist or fewer copies are borrowed
+        """
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        return self._apply_borrowed(db, {id: quantity}, "return")[id]
+
+    def checkout_many(self, db: Session, quantities: Mapping[int, int]) -> Dict[int, int]:
+        """
+        Check out several books at once, e.g. a class set, all or nothing.
+
+        Args:
+            db: Database session
+            quantities: Mapping of book id to number of copies
+
+        Returns:
+            Mapping of book id to new borrowed_count
+
+        Raises:
+            ValueError: If any book is missing or short on copies; nothing is checked out
+        """
+        if any(quantity < 1 for quantity in quantities.values()):
+            raise ValueError("Quantity must be at least 1")
+        return self._apply_borrowed(db, quantities, "checkout")
+
+
+class MaterialsReadModel:
+    """
+    Read-only view over books and DVDs together.
+
+    Both tables are combined with UNION ALL on their shared columns. Filters,
+    sorting and the page limit are applied inside each branch, so each table
+    is read as an indexed top-N (at most skip + limit rows) before the
+    branches are merged. The total match count is a separate COUNT, skipped
+    when the first page already holds every match.
+    """
+
+    SHARED_COLUMNS = ("title", "theme", "genre", "geographical_area", "publication_year", "description")
+    SORT_COLUMNS = ("title", "creator", "theme", "geographical_area", "publication_year", "genre")
+    FILTER_COLUMNS = ("theme", "genre", "geographical_area", "publication_year")
+    SOURCES = {"book": (Book, Book.author), "dvd": (DVD, DVD.director)}
+
+    def _branch(self, kind: str, search: Optional[str], filters: Dict[str, Any]) -> Select:
+        """Build the SELECT for one material type."""
+        model, creator = self.SOURCES[kind]
+        query = select(
+            literal(kind).label("material_kind"),
+            model.id.label("id"),
+            creator.label("creator"),
+            *[getattr(model, col) for col in self.SHARED_COLUMNS],
+        )
+
+        if search:
+            query = query.where(search_filter(model, search))
+
+        for key, value in filters.items():
+            if value is not None and key in self.FILTER_COLUMNS:
+                query = query.where(getattr(model, key) == value)
+
+        return query
+
+    def get_all(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 50,
+        sort_by: Optional[str] = "title",
+        search: Optional[str] = None,
+        material_kind: Optional[str] = None,
+        **filters,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Get one page of books and DVDs.
+
+        Args:
+            db: Database session
+            skip: Number of rows to skip
+            limit: Page size
+            sort_by: One of SORT_COLUMNS
+            search: Case-insensitive text matched against the text columns
+            material_kind: 'book' or 'dvd' to restrict to one type
+            **filters: Equality filters on FILTER_COLUMNS
+
+        Returns:
+            Tuple of (rows as dicts with a 'material_kind' key, total match count)
+        """
+        kinds = [material_kind] if material_kind else list(self.SOURCES)
+        branches = [self._branch(kind, search, filters) for kind in kinds]
+        sort_by = sort_by if sort_by in self.SORT_COLUMNS else None
+
+        # material_kind is constant within a branch, so (sort column, id)
+        # orders each branch exactly as the merged page is ordered
+        top_n = []
+        for branch in branches:
+            order = [branch.selected_columns.id]
+            if sort_by:
+                order.insert(0, branch.selected_columns[sort_by])
+            top_n.append(select(branch.order_by(*order).limit(skip + limit).subquery()))
+        materials = union_all(*top_n).subquery("materials")
+
+        order = [materials.c.material_kind, materials.c.id]
+        if sort_by:
+            order.insert(0, materials.c[sort_by])
+        query = select(materials).order_by(*order).offset(skip).limit(limit)
+        rows = [dict(row) for row in db.execute(query).mappings().all()]
+
+        if not skip and len(rows) < limit:
+            total = len(rows)
+        else:
+            total = db.scalar(select(func.count()).select_from(union_all(*branches).subquery()))
+        return rows, total
+
+    def get_distinct(self, db: Session, column: str) -> List[Any]:
+        """Get the sorted distinct non-empty values of a shared column across both types."""
+        branches = []
+        for model, _ in self.SOURCES.values():
+            col = getattr(model, column)
+            branch = select(col.label("value")).where(col.is_not(None))
+            if col.type.python_type == str:
+                branch = branch.where(col != "")
+            branches.append(branch)
+        values = union_all(*branches).subquery()
+        return list(db.scalars(select(values.c.value).distinct().order_by(values.c.value)).all())
+
+
+class AsyncCRUDBase:
+    """Generic CRUD operations on an async session."""
+
+    def __init__(self, model: Type[ModelType]):
+        """Initialize with model."""
+        self.model = model
+
+    async def create(self, db: AsyncSession, obj_data: Dict[str, Any]) -> ModelType:
+        """Create a new record."""
+        try:
+            db_obj = self.model(**obj_data)
+            db.add(db_obj)
+            # Write (and lock) the row before the version counter, as every write path does
+            await db.flush()
+            await db.run_sync(bump_catalog_version, self.model.__tablename__)
+            await db.commit()
+            await db.refresh(db_obj)
+            return db_obj
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Error creating {self.model.__name__}: {e}")
+            raise ValueError(f"Failed to create {self.model.__name__}: {str(e)}")
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[ModelType]:
+        """Get record by ID."""
+        return await db.get(self.model, id)
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 1000,
+        sort_by: Optional[str] = None,
+        search: Optional[str] = None,
+        **filters,
+    ) -> List[ModelType]:
+        """Get all records with optional filtering and sorting."""
+        query = _select_all(self.model, skip, limit, sort_by, search, filters)
+        return list((await db.scalars(query)).all())
+
+    async def update(
+        self, db: AsyncSession, id: int, obj_data: Dict[str, Any]
+    ) -> Optional[ModelType]:
+        """Update a record."""
+        try:
+            db_obj = await self.get(db, id)
+            if not db_obj:
+                logger.warning(f"{self.model.__name__} with id {id} not found")
+                return None
+
+            for key, value in obj_data.items():
+                setattr(db_obj, key, value)
+            await db.flush()
+            await db.run_sync(bump_catalog_version, self.model.__tablename__)
+            await db.commit()
+            await db.refresh(db_obj)
+            return db_obj
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Error updating {self.model.__name__} {id}: {e}")
+            raise ValueError(f"Failed to update {self.model.__name__}: {str(e)}")
+
+    async def delete(self, db: AsyncSession, id: int) -> bool:
+        """Delete a record."""
+        try:
+            db_obj = await self.get(db, id)
+            if not db_obj:
+                logger.warning(f"{self.model.__name__} with id {id} not found")
+                return False
+
+            await db.delete(db_obj)
+            await db.flush()
+            await db.run_sync(bump_catalog_version, self.model.__tablename__)
+            await db.commit()
+            return True
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Error deleting {self.model.__name__} {id}: {e}")
+            raise ValueError(f"Failed to delete {self.model.__name__}: {str(e)}")
+
+
 # Create instances for each model
-book_crud = CRUDBase(Book)
+book_crud = BookCRUD(Book)
 dvd_crud = CRUDBase(DVD)
+materials_read_model = MaterialsReadModel()
+async_book_crud = AsyncCRUDBase(Book)
+async_dvd_crud = AsyncCRUDBase(DVD)
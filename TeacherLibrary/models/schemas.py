@@ -1,29 +1,100 @@
 """Database models for books and DVDs."""
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import BigInteger, CheckConstraint, Column, Index, Integer, String, Text, func, literal_column, text
 
 from TeacherLibrary.data.database import Base
 
+# Joins the columns of the search document. Search terms have it stripped,
+# so a term can never match across a column boundary.
+SEARCH_SEPARATOR = "\x1f"
+
+
+def search_document(model):
+    """
+    Concatenate a model's text columns into the expression used for free-text search.
+
+    The expression is rendered with inline literals so that the SQL in queries
+    matches the trigram index expression exactly, whatever the driver's
+    parameter binding style.
+    """
+    table = getattr(model, "__table__", model)
+    parts = [
+        func.coalesce(col, literal_column("''"))
+        for col in table.columns if col.type.python_type == str and col.info.get("searchable", True)
+    ]
+    document = parts[0]
+    for part in parts[1:]:
+        document = document + literal_column(f"'{SEARCH_SEPARATOR}'") + part
+    return document
+
+
+def search_filter(model, search: str):
+    """Case-insensitive substring match of a search term within one column of the search document."""
+    return search_document(model).ilike(f"%{search.replace(SEARCH_SEPARATOR, '')}%")
+
+
+def _has_pg_trgm(ddl, target, bind, **kw):
+    """Only emit trigram indexes where the pg_trgm extension is installed."""
+    if bind is None:
+        return True
+    return bind.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+
+def _add_query_indexes(model, creator):
+    """
+    Add the indexes matching the queries CRUDBase.get_all emits.
+
+    - (genre, X) for "filter by genre, order by X, then page", partial on
+      genre IS NOT NULL since the filter is always an equality on a value
+    - a trigram GIN index on the search document for ILIKE '%term%' search
+      (PostgreSQL with pg_trgm only)
+    """
+    table_name = model.__tablename__
+    for column in (model.title, creator, model.publication_year):
+        Index(
+            f"ix_{table_name}_genre_{column.key}",
+            model.genre,
+            column,
+            postgresql_where=model.genre.is_not(None),
+            sqlite_where=model.genre.is_not(None),
+        )
+
+    # Expression-only indexes are not attached to a table automatically
+    model.__table__.append_constraint(
+        Index(
+            f"ix_{table_name}_search_trgm",
+            search_document(model).label("search_document"),
+            postgresql_using="gin",
+            postgresql_ops={"search_document": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql", callable_=_has_pg_trgm)
+    )
+
 
 class Book(Base):
     """Book model."""
 
     __tablename__ = "books"
+    __table_args__ = (
+        CheckConstraint("borrowed_count >= 0", name="ck_books_borrowed_nonnegative"),
+        CheckConstraint("borrowed_count <= total_count", name="ck_books_borrowed_within_total"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     book_number = Column(Integer, unique=True, index=True, nullable=True)
     title = Column(String(255), nullable=False, index=True)
     author = Column(String(255), nullable=True, index=True)
     location = Column(String(100), nullable=True)
     borrowed_count = Column(Integer, default=0, nullable=False)
     total_count = Column(Integer, default=0, nullable=False)
-    theme = Column(String(255), index=True)
-    geographical_area = Column(String(255), index=True)
+    theme = Column(String(255))
+    geographical_area = Column(String(255))
     publication_year = Column(Integer, index=True)
-    genre = Column(String(100), index=True)
-    subgenre = Column(String(100), index=True)
-    material_type = Column(String(100), index=True)
+    genre = Column(String(100))
+    subgenre = Column(String(100))
+    material_type = Column(String(100))
     notes = Column(Text)
     description = Column(Text)
+    # SHA-256 of the source spreadsheet row last loaded by the catalog ingest or a re-import
+    content_hash = Column(String(64), nullable=True, info={"searchable": False})
 
     def to_dict(self):
         """Convert model to dictionary."""
@@ -51,17 +122,19 @@ class DVD(Base):
 
     __tablename__ = "dvds"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False, index=True)
     director = Column(String(255), nullable=False, index=True)
-    theme = Column(String(255), index=True)
-    geographical_area = Column(String(255), index=True)
+    theme = Column(String(255))
+    geographical_area = Column(String(255))
     publication_year = Column(Integer, index=True)
-    genre = Column(String(100), index=True)
-    subgenre = Column(String(100), index=True)
-    material_type = Column(String(100), index=True)
+    genre = Column(String(100))
+    subgenre = Column(String(100))
+    material_type = Column(String(100))
     notes = Column(Text)
     description = Column(Text)
+    # SHA-256 of the import file row last loaded by a re-import
+    content_hash = Column(String(64), nullable=True, info={"searchable": False})
 
     def to_dict(self):
         """Convert model to dictionary."""
@@ -78,3 +151,39 @@ class DVD(Base):
             "notes": self.notes,
             "description": self.description,
         }
+
+
+_add_query_indexes(Book, Book.author)
+_add_query_indexes(DVD, DVD.director)
+
+# Indexes replaced by the composite indexes above (or never used by a query);
+# init_db drops them from existing databases.
+RETIRED_INDEXES = [
+    f"ix_{table}_{column}"
+    for table in ("books", "dvds")
+    for column in ("id", "theme", "geographical_area", "genre", "subgenre", "material_type")
+]
+
+
+class CatalogVersion(Base):
+    """Monotonic change counter per catalog table, bumped by every CRUD write."""
+
+    __tablename__ = "catalog_versions"
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+
+
+class DatabaseIdentity(Base):
+    """
+    Random id generated once per database.
+
+    State kept outside the database (cached exports, enrichment checkpoints)
+    is keyed by it, since catalog versions and record ids start over when a
+    database is recreated.
+    """
+
+    __tablename__ = "database_identity"
+
+    id = Column(Integer, primary_key=True)  # Always 1: a single row
+    database_id = Column(String(32), nullable=False)
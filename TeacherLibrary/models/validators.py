@@ -1,6 +1,7 @@
 """Pydantic validators for data validation."""
-from typing import Optional
-from pydantic import BaseModel, Field, field_validator
+from functools import lru_cache
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, WrapValidator, field_validator, model_validator
 
 
 class BookSchema(BaseModel):
@@ -37,6 +38,13 @@ class BookSchema(BaseModel):
             return None
         return v.strip() if v else None
 
+    @model_validator(mode="after")
+    def borrowed_within_total(self):
+        """Mirror the database check that borrowed copies never exceed the total."""
+        if self.borrowed_count > self.total_count:
+            raise ValueError("borrowed_count cannot exceed total_count")
+        return self
+
     class Config:
         from_attributes = True
 
@@ -65,3 +73,55 @@ class DVDSchema(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+def _keep_row_errors(value: Any, handler) -> Any:
+    """Return a row's ValidationError instead of failing the whole batch."""
+    try:
+        return handler(value)
+    except ValidationError as e:
+        return e
+
+
+@lru_cache(maxsize=None)
+def batch_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """
+    Compiled validator for a list of `schema` rows, built once per schema.
+
+    Each item yields either a model instance or the ValidationError for that
+    row, so one pass over a batch validates every row.
+    """
+    return TypeAdapter(List[Annotated[schema, WrapValidator(_keep_row_errors)]])
+
+
+def validate_batch(
+    schema: Type[BaseModel], rows: List[Dict[str, Any]]
+) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, List[Dict[str, Any]]]]:
+    """
+    Validate a batch of rows with one call into the compiled list validator.
+
+    Args:
+        schema: Pydantic model for one row, e.g. BookSchema
+        rows: Row dicts
+
+    Returns:
+        Tuple of ({index in rows: validated row with the keys given in the input},
+        {index in rows: [{"field": ..., "message": ..., "input": ...}, ...]})
+    """
+    valid: Dict[int, Dict[str, Any]] = {}
+    errors: Dict[int, List[Dict[str, Any]]] = {}
+    for index, result in enumerate(batch_adapter(schema).validate_python(rows)):
+        if not isinstance(result, ValidationError):
+            valid[index] = result.model_dump(exclude_unset=True)
+            continue
+        for error in result.errors(include_url=False):
+            message = error["msg"]
+            if error.get("input") is None and error["type"].endswith("_type"):
+                # An empty cell in a required column
+                message = "Field required"
+            errors.setdefault(index, []).append({
+                "field": ".".join(map(str, error["loc"])) or None,
+                "message": message,
+                "input": error.get("input"),
+            })
+    return valid, errors
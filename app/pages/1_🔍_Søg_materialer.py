@@ -6,10 +6,12 @@ Søg, vis, rediger og slet bøger og DVD'er.
 import streamlit as st
 import pandas as pd
 
-from TeacherLibrary.data.database import SessionLocal
-from TeacherLibrary.models.crud import book_crud, dvd_crud
+from TeacherLibrary.models.crud import book_crud, dvd_crud, materials_read_model
 from TeacherLibrary.data.semantic_search import semantic_search, semantic_search_dvd
-from app.shared_utils import apply_custom_styling, render_page_header, get_column_mapping
+from app.shared_utils import (
+    apply_custom_styling, render_page_header, render_query_debug_panel, start_page_query_tracking, db_session,
+    get_column_mapping, render_export_section, get_page_window, render_pagination
+)
 
 # Page config
 st.set_page_config(
@@ -21,6 +23,9 @@ st.set_page_config(
 # Apply styling
 apply_custom_styling()
 
+# Count database queries for this render
+query_scope = start_page_query_tracking("Søg materialer")
+
 # Render header
 render_page_header(
     "Søg Materialer",
@@ -31,18 +36,116 @@ render_page_header(
 # Material type selector
 material_type = st.radio(
     "Vælg materialetype:",
-    ["📖 Bøger", "📀 DVD'er"],
+    ["📖 Bøger", "📀 DVD'er", "📚 Alle materialer"],
     horizontal=True,
     label_visibility="collapsed"
 )
 
 is_books = material_type == "📖 Bøger"
+is_all = material_type == "📚 Alle materialer"
 
-# Get database session
-db = SessionLocal()
-
+# Database access happens in short `db_session()` blocks so no connection is
+# held while widgets render or search embeddings are computed
 try:
-    if is_books:
+    if is_all:
+        # === COMBINED BOOKS AND DVDs SECTION ===
+        st.subheader("Søg i Hele Samlingen")
+
+        search_query = st.text_input(
+            "Søgetekst",
+            placeholder="Søg efter titel, forfatter, instruktør, tema, etc.",
+            help="Søger i både bøger og DVD'er",
+            key="all_search"
+        )
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            sort_options = {
+                "title": "Titel",
+                "creator": "Forfatter / instruktør",
+                "theme": "Tema",
+                "geographical_area": "Geografisk område",
+                "publication_year": "Udgivelsesår",
+                "genre": "Genre"
+            }
+            sort_by = st.selectbox("Sortér efter", options=list(sort_options.keys()),
+                                  format_func=lambda x: sort_options[x], key="all_sort")
+
+        with col2:
+            with db_session() as db:
+                genres = materials_read_model.get_distinct(db, "genre")
+            selected_genre = st.selectbox("Filtrér efter genre", ["Alle"] + genres, key="all_genre")
+
+        # Only the visible page is fetched; the total is a separate count
+        skip, limit = get_page_window("all", reset_on=(search_query, sort_by, selected_genre))
+        with db_session() as db:
+            items, total = materials_read_model.get_all(
+                db,
+                skip=skip,
+                limit=limit,
+                sort_by=sort_by,
+                search=search_query if search_query else None,
+                genre=None if selected_genre == "Alle" else selected_genre,
+            )
+
+        if total > len(items):
+            st.info(f"📊 Fundet {total} materialer (viser {skip + 1}-{skip + len(items)})")
+        else:
+            st.info(f"📊 Fundet {total} materialer")
+
+        if total:
+            render_pagination(total, "all")
+
+        if items:
+            kind_labels = {"book": "📖 Bog", "dvd": "📀 DVD"}
+            df = pd.DataFrame(items)
+            df["material_kind"] = df["material_kind"].map(kind_labels)
+            column_order = ["material_kind", "title", "creator", "theme", "geographical_area", "publication_year", "genre"]
+            column_mapping = get_column_mapping()
+            column_mapping.update({"material_kind": "Type", "creator": "Forfatter / instruktør"})
+            st.dataframe(df[column_order].rename(columns=column_mapping), use_container_width=True)
+
+            # Detail view section
+            st.markdown("---")
+            st.subheader("📚 Detaljevisning")
+
+            material_options = {
+                f"{kind_labels[item['material_kind']]}: {item['title']} - {item['creator'] or 'Ukendt'}": index
+                for index, item in enumerate(items)
+            }
+            selected_material = st.selectbox(
+                "Vælg materiale for at se detaljer:",
+                options=list(material_options.keys()),
+                key="all_detail_select"
+            )
+
+            if selected_material:
+                item = items[material_options[selected_material]]
+                creator_label = "Forfatter" if item["material_kind"] == "book" else "Instruktør"
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    st.markdown("### 📚 Grundlæggende Information")
+                    st.markdown(f"**Titel:** {item['title']}")
+                    st.markdown(f"**{creator_label}:** {item['creator'] or 'Ukendt'}")
+                    st.markdown(f"**År:** {item['publication_year'] or 'N/A'}")
+
+                with col2:
+                    st.markdown("### 🏷️ Kategorisering")
+                    st.markdown(f"**Genre:** {item['genre'] or 'N/A'}")
+                    st.markdown(f"**Tema:** {item['theme'] or 'N/A'}")
+                    st.markdown(f"**Geografisk område:** {item['geographical_area'] or 'N/A'}")
+
+                if item["description"]:
+                    st.markdown("### 📝 Beskrivelse")
+                    st.write(item["description"])
+
+                st.caption("Vælg bøger eller DVD'er øverst for at se alle felter.")
+        else:
+            st.info("Ingen materialer fundet. Prøv en anden søgning.")
+
+    elif is_books:
         # === BOOKS SECTION ===
         st.subheader("Søg i Bogsamlingen")
 
@@ -80,25 +183,38 @@ try:
                                   format_func=lambda x: sort_options[x], key="book_sort")
 
         with col2:
-            all_items = book_crud.get_all(db)
-            genres = sorted(set(item.genre for item in all_items if item.genre))
+            with db_session() as db:
+                genres = book_crud.get_distinct(db, "genre")
             selected_genre = st.selectbox("Filtrér efter genre", ["Alle"] + genres, key="book_genre")
 
-        # Get and display items
+        # Get and display items: only the visible page is fetched and rendered
+        skip, limit = get_page_window("book", reset_on=(search_query, use_semantic, sort_by, selected_genre))
         if use_semantic and search_query:
-            all_items_dict = [item.to_dict() for item in all_items]
+            with db_session() as db:
+                all_items_dict = [item.to_dict() for item in book_crud.get_all(db)]
             results = semantic_search(search_query, all_items_dict, top_k=50)
             items = [item[0] for item in results]
             if selected_genre != "Alle":
                 items = [item for item in items if item.get("genre") == selected_genre]
+            total = len(items)
+            items = items[skip:skip + limit]
         else:
             filters = {}
             if selected_genre != "Alle":
                 filters["genre"] = selected_genre
-            items = book_crud.get_all(db, search=search_query if search_query else None, sort_by=sort_by, **filters)
-            items = [item.to_dict() for item in items]
+            search = search_query if search_query else None
+            with db_session() as db:
+                total = book_crud.count(db, search=search, **filters)
+                items = book_crud.get_all(db, skip=skip, limit=limit, search=search, sort_by=sort_by, **filters)
+                items = [item.to_dict() for item in items]
+
+        if total > len(items):
+            st.info(f"📊 Fundet {total} bøger (viser {skip + 1}-{skip + len(items)})")
+        else:
+            st.info(f"📊 Fundet {total} bøger")
 
-        st.info(f"📊 Fundet {len(items)} bøger")
+        if total:
+            render_pagination(total, "book")
 
         if items:
             df = pd.DataFrame(items)
@@ -109,11 +225,17 @@ try:
             df_display = df_display.rename(columns=column_mapping)
             st.dataframe(df_display, use_container_width=True)
 
+            if not (use_semantic and search_query):
+                with st.expander("📤 Eksportér bøger"):
+                    render_export_section(
+                        book_crud, "book", sort_by=sort_by, search=search_query, filters=filters
+                    )
+
             # Detail view section
             st.markdown("---")
             st.subheader("📖 Detaljevisning")
 
-            # Create selection dropdown
+            # Create selection dropdown (books on this page)
             book_options = {f"{item['title']} - {item.get('author', 'Ukendt')} ({item.get('book_number', item['id'])})"
                           : item['id'] for item in items}
             selected_book = st.selectbox(
@@ -124,7 +246,8 @@ try:
 
             if selected_book:
                 book_id = book_options[selected_book]
-                book = book_crud.get(db, book_id)
+                with db_session() as db:
+                    book = book_crud.get(db, book_id)
 
                 if book:
                     col1, col2 = st.columns(2)
@@ -195,24 +318,37 @@ try:
                                   format_func=lambda x: sort_options[x], key="dvd_sort")
 
         with col2:
-            all_items = dvd_crud.get_all(db)
-            genres = sorted(set(item.genre for item in all_items if item.genre))
+            with db_session() as db:
+                genres = dvd_crud.get_distinct(db, "genre")
             selected_genre = st.selectbox("Filtrér efter genre", ["Alle"] + genres, key="dvd_genre")
 
+        skip, limit = get_page_window("dvd", reset_on=(search_query, use_semantic, sort_by, selected_genre))
         if use_semantic and search_query:
-            all_items_dict = [item.to_dict() for item in all_items]
+            with db_session() as db:
+                all_items_dict = [item.to_dict() for item in dvd_crud.get_all(db)]
             results = semantic_search_dvd(search_query, all_items_dict, top_k=50)
             items = [item[0] for item in results]
             if selected_genre != "Alle":
                 items = [item for item in items if item.get("genre") == selected_genre]
+            total = len(items)
+            items = items[skip:skip + limit]
         else:
             filters = {}
             if selected_genre != "Alle":
                 filters["genre"] = selected_genre
-            items = dvd_crud.get_all(db, search=search_query if search_query else None, sort_by=sort_by, **filters)
-            items = [item.to_dict() for item in items]
+            search = search_query if search_query else None
+            with db_session() as db:
+                total = dvd_crud.count(db, search=search, **filters)
+                items = dvd_crud.get_all(db, skip=skip, limit=limit, search=search, sort_by=sort_by, **filters)
+                items = [item.to_dict() for item in items]
+
+        if total > len(items):
+            st.info(f"📊 Fundet {total} DVD'er (viser {skip + 1}-{skip + len(items)})")
+        else:
+            st.info(f"📊 Fundet {total} DVD'er")
 
-        st.info(f"📊 Fundet {len(items)} DVD'er")
+        if total:
+            render_pagination(total, "dvd")
 
         if items:
             df = pd.DataFrame(items)
@@ -223,11 +359,17 @@ try:
             df_display = df_display.rename(columns=column_mapping)
             st.dataframe(df_display, use_container_width=True)
 
+            if not (use_semantic and search_query):
+                with st.expander("📤 Eksportér DVD'er"):
+                    render_export_section(
+                        dvd_crud, "dvd", sort_by=sort_by, search=search_query, filters=filters
+                    )
+
             # Detail view section
             st.markdown("---")
             st.subheader("📀 Detaljevisning")
 
-            # Create selection dropdown
+            # Create selection dropdown (DVDs on this page)
             dvd_options = {f"{item['title']} - {item.get('director', 'Ukendt')} ({item['id']})"
                           : item['id'] for item in items}
             selected_dvd = st.selectbox(
@@ -238,7 +380,8 @@ try:
 
             if selected_dvd:
                 dvd_id = dvd_options[selected_dvd]
-                dvd = dvd_crud.get(db, dvd_id)
+                with db_session() as db:
+                    dvd = dvd_crud.get(db, dvd_id)
 
                 if dvd:
                     col1, col2 = st.columns(2)
@@ -268,4 +411,4 @@ try:
             st.info("Ingen DVD'er fundet. Prøv en anden søgning.")
 
 finally:
-    db.close()
+    render_query_debug_panel(query_scope)
@@ -3,14 +3,18 @@ Engelsklærernes Bibliotek - Administrer Materialer
 
 Tilføj, rediger og slet bøger og DVD'er.
 """
+import re
+
 import streamlit as st
 import pandas as pd
 
-from TeacherLibrary.data.database import SessionLocal
 from TeacherLibrary.models.crud import book_crud, dvd_crud
 from TeacherLibrary.models.validators import BookSchema, DVDSchema
-from TeacherLibrary.data.fetch_isbn import fetch_book_by_isbn
-from app.shared_utils import apply_custom_styling, render_page_header, get_column_mapping, build_data_dict
+from TeacherLibrary.data.fetch_isbn import fetch_book_by_isbn, fetch_books_by_isbns, normalize_isbn
+from app.shared_utils import (
+    apply_custom_styling, render_page_header, render_query_debug_panel, start_page_query_tracking, db_session,
+    get_column_mapping, build_data_dict, render_import_section
+)
 
 # Page config
 st.set_page_config(
@@ -22,6 +26,9 @@ st.set_page_config(
 # Apply styling
 apply_custom_styling()
 
+# Count database queries for this render
+query_scope = start_page_query_tracking("Administrer materialer")
+
 # Render header
 render_page_header(
     "Administrer Materialer",
@@ -39,15 +46,14 @@ material_type = st.radio(
 
 is_books = material_type == "📖 Bøger"
 
-# Get database session
-db = SessionLocal()
-
+# Database access happens in short `db_session()` blocks so no connection is
+# held while widgets render or ISBN lookups wait on the network
 try:
     if is_books:
         # === BOOKS MANAGEMENT ===
 
         # Tabs for different actions
-        tab1, tab2, tab3 = st.tabs(["➕ Tilføj Ny Bog", "✏️ Rediger Bog", "🗑️ Slet Bog"])
+        tab1, tab2, tab3, tab4 = st.tabs(["➕ Tilføj Ny Bog", "✏️ Rediger Bog", "🗑️ Slet Bog", "📥 Importér Bøger"])
 
         # ===== ADD BOOK TAB =====
         with tab1:
@@ -149,19 +155,115 @@ try:
                                 notes=notes, description=description
                             )
                             BookSchema(**book_data)
-                            book_crud.create(db, book_data)
+                            with db_session() as db:
+                                book_crud.create(db, book_data)
                             st.success(f"✅ Bogen '{title}' er tilføjet!")
                             st.session_state.book_form_data = {}
                             st.rerun()
                         except Exception as e:
                             st.error(f"❌ Fejl ved tilføjelse: {str(e)}")
 
+            # ===== ADD MANY BOOKS BY ISBN =====
+            st.markdown("---")
+            st.markdown("**📦 Tilføj flere bøger via ISBN** - Scan eller indsæt en hel kasse bøger på én gang")
+
+            batch_outcome = st.session_state.pop("isbn_batch_outcome", None)
+            if batch_outcome:
+                inserted, failures = batch_outcome
+                st.success(f"✅ {inserted} bøger er tilføjet!")
+                for message in failures:
+                    st.error(f"❌ {message}")
+
+            isbn_batch_input = st.text_area(
+                "ISBN'er",
+                placeholder="Én ISBN pr. linje (eller adskilt af komma)",
+                height=150,
+                key="isbn_batch_input"
+            )
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                batch_location = st.text_input("Placering", placeholder="F.eks. gml.kælder", key="isbn_batch_location")
+            with col2:
+                batch_total_count = st.number_input("Antal pr. bog", min_value=1, value=1, step=1, key="isbn_batch_count")
+            with col3:
+                st.markdown("<br>", unsafe_allow_html=True)
+                lookup_batch = st.button("🔍 Søg ISBN'er", use_container_width=True, key="lookup_isbn_batch")
+
+            if lookup_batch:
+                isbns = [isbn for isbn in re.split(r"[\n,;]+", isbn_batch_input) if isbn.strip()]
+                if not isbns:
+                    st.warning("⚠️ Indtast mindst én ISBN")
+                else:
+                    with st.spinner(f"Henter bogoplysninger for {len(isbns)} ISBN'er..."):
+                        st.session_state.isbn_batch_results = fetch_books_by_isbns(isbns)
+
+            batch_results = st.session_state.get("isbn_batch_results")
+            if batch_results:
+                found = {isbn: data for isbn, data in batch_results.items() if data}
+                invalid = [isbn for isbn in batch_results if normalize_isbn(isbn) is None]
+                not_found = [isbn for isbn, data in batch_results.items() if not data and isbn not in invalid]
+
+                # Scanning the same book twice (also as ISBN-10 and -13) creates it once
+                books_by_isbn = {data["isbn"]: data for data in found.values()}
+
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Fundet", len(books_by_isbn))
+                col2.metric("Ikke fundet", len(not_found))
+                col3.metric("Ugyldige", len(invalid))
+                if not_found:
+                    st.warning(f"⚠️ Ikke fundet: {', '.join(not_found)}")
+                if invalid:
+                    st.error(f"❌ Ugyldige ISBN'er (forkert kontrolciffer eller længde): {', '.join(invalid)}")
+
+                if books_by_isbn:
+                    st.dataframe(
+                        pd.DataFrame([
+                            {"ISBN": isbn, "Titel": data["title"], "Forfatter": data["author"],
+                             "År": data["publication_year"], "Genre": data["categories"]}
+                            for isbn, data in books_by_isbn.items()
+                        ]),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
+                    if st.button(f"💾 Opret {len(books_by_isbn)} bøger", type="primary", key="create_isbn_batch"):
+                        rows, invalid_rows = [], []
+                        for isbn, data in books_by_isbn.items():
+                            row = build_data_dict(
+                                title=data["title"], author=data["author"], location=batch_location,
+                                borrowed_count=0, total_count=batch_total_count,
+                                publication_year=data["publication_year"], genre=data["categories"],
+                                description=data["description"]
+                            )
+                            try:
+                                BookSchema(**row)
+                                rows.append(row)
+                            except Exception as e:
+                                invalid_rows.append(f"{isbn}: {e}")
+                        try:
+                            # One multi-row INSERT for the whole box
+                            with db_session() as db:
+                                inserted, errors = book_crud.create_many(db, rows)
+                            failures = [f"{rows[index]['title']}: {message}" for index, message in errors] + invalid_rows
+                        except Exception as e:
+                            st.error(f"❌ Fejl ved tilføjelse: {str(e)}")
+                        else:
+                            if inserted:
+                                # Messages shown now are lost in the rerun; show them on the next run instead
+                                st.session_state.isbn_batch_outcome = (inserted, failures)
+                                st.session_state.pop("isbn_batch_results", None)
+                                st.rerun()
+                            st.error("❌ Ingen bøger blev tilføjet")
+                            for message in failures:
+                                st.error(f"❌ {message}")
+
         # ===== EDIT BOOK TAB =====
         with tab2:
             st.subheader("Rediger Bog")
 
             # Get all books
-            all_books = book_crud.get_all(db)
+            with db_session() as db:
+                all_books = book_crud.get_all(db)
 
             if not all_books:
                 st.info("📚 Ingen bøger i samlingen endnu.")
@@ -176,7 +278,8 @@ try:
 
                 if selected_book_name:
                     book_id = book_options[selected_book_name]
-                    book = book_crud.get(db, book_id)
+                    with db_session() as db:
+                        book = book_crud.get(db, book_id)
 
                     if book:
                         st.markdown("---")
@@ -225,7 +328,8 @@ try:
                                             notes=notes, description=description
                                         )
                                         BookSchema(**update_data)
-                                        book_crud.update(db, book_id, update_data)
+                                        with db_session() as db:
+                                            book_crud.update(db, book_id, update_data)
                                         st.success(f"✅ Bogen '{title}' er opdateret!")
                                         st.rerun()
                                     except Exception as e:
@@ -236,7 +340,8 @@ try:
             st.subheader("Slet Bog")
 
             # Get all books
-            all_books = book_crud.get_all(db)
+            with db_session() as db:
+                all_books = book_crud.get_all(db)
 
             if not all_books:
                 st.info("📚 Ingen bøger i samlingen endnu.")
@@ -253,7 +358,8 @@ try:
 
                 if selected_book_name:
                     book_id = book_options[selected_book_name]
-                    book = book_crud.get(db, book_id)
+                    with db_session() as db:
+                        book = book_crud.get(db, book_id)
 
                     if book:
                         # Show book details
@@ -276,17 +382,23 @@ try:
                         with col1:
                             if st.button("🗑️ Slet Bog", use_container_width=True, type="primary"):
                                 try:
-                                    book_crud.delete(db, book_id)
+                                    with db_session() as db:
+                                        book_crud.delete(db, book_id)
                                     st.success(f"✅ Bogen '{book.title}' er slettet!")
                                     st.rerun()
                                 except Exception as e:
                                     st.error(f"❌ Fejl ved sletning: {str(e)}")
 
+        # ===== IMPORT BOOKS TAB =====
+        with tab4:
+            st.subheader("Importér Bøger")
+            render_import_section(book_crud, "bøger", key="book")
+
     else:
         # === DVD MANAGEMENT ===
 
         # Tabs for different actions
-        tab1, tab2, tab3 = st.tabs(["➕ Tilføj Ny DVD", "✏️ Rediger DVD", "🗑️ Slet DVD"])
+        tab1, tab2, tab3, tab4 = st.tabs(["➕ Tilføj Ny DVD", "✏️ Rediger DVD", "🗑️ Slet DVD", "📥 Importér DVD'er"])
 
         # ===== ADD DVD TAB =====
         with tab1:
@@ -329,7 +441,8 @@ try:
                                 material_type=material_type_field, notes=notes, description=description
                             )
                             DVDSchema(**dvd_data)
-                            dvd_crud.create(db, dvd_data)
+                            with db_session() as db:
+                                dvd_crud.create(db, dvd_data)
                             st.success(f"✅ DVD'en '{title}' er tilføjet!")
                             st.rerun()
                         except Exception as e:
@@ -340,7 +453,8 @@ try:
             st.subheader("Rediger DVD")
 
             # Get all DVDs
-            all_dvds = dvd_crud.get_all(db)
+            with db_session() as db:
+                all_dvds = dvd_crud.get_all(db)
 
             if not all_dvds:
                 st.info("📀 Ingen DVD'er i samlingen endnu.")
@@ -355,7 +469,8 @@ try:
 
                 if selected_dvd_name:
                     dvd_id = dvd_options[selected_dvd_name]
-                    dvd = dvd_crud.get(db, dvd_id)
+                    with db_session() as db:
+                        dvd = dvd_crud.get(db, dvd_id)
 
                     if dvd:
                         st.markdown("---")
@@ -398,7 +513,8 @@ try:
                                             material_type=material_type_field, notes=notes, description=description
                                         )
                                         DVDSchema(**update_data)
-                                        dvd_crud.update(db, dvd_id, update_data)
+                                        with db_session() as db:
+                                            dvd_crud.update(db, dvd_id, update_data)
                                         st.success(f"✅ DVD'en '{title}' er opdateret!")
                                         st.rerun()
                                     except Exception as e:
@@ -409,7 +525,8 @@ try:
             st.subheader("Slet DVD")
 
             # Get all DVDs
-            all_dvds = dvd_crud.get_all(db)
+            with db_session() as db:
+                all_dvds = dvd_crud.get_all(db)
 
             if not all_dvds:
                 st.info("📀 Ingen DVD'er i samlingen endnu.")
@@ -426,7 +543,8 @@ try:
 
                 if selected_dvd_name:
                     dvd_id = dvd_options[selected_dvd_name]
-                    dvd = dvd_crud.get(db, dvd_id)
+                    with db_session() as db:
+                        dvd = dvd_crud.get(db, dvd_id)
 
                     if dvd:
                         # Show DVD details
@@ -449,11 +567,17 @@ try:
                         with col1:
                             if st.button("🗑️ Slet DVD", use_container_width=True, type="primary"):
                                 try:
-                                    dvd_crud.delete(db, dvd_id)
+                                    with db_session() as db:
+                                        dvd_crud.delete(db, dvd_id)
                                     st.success(f"✅ DVD'en '{dvd.title}' er slettet!")
                                     st.rerun()
                                 except Exception as e:
                                     st.error(f"❌ Fejl ved sletning: {str(e)}")
 
+        # ===== IMPORT DVDs TAB =====
+        with tab4:
+            st.subheader("Importér DVD'er")
+            render_import_section(dvd_crud, "DVD'er", key="dvd")
+
 finally:
-    db.close()
+    render_query_debug_panel(query_scope)
@@ -3,7 +3,27 @@ Shared utilities for the Library application.
 
 Contains common styling, helper functions, and configurations.
 """
+import math
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
 import streamlit as st
+from sqlalchemy.orm import Session
+
+from TeacherLibrary.config import Config
+from TeacherLibrary.data.database import get_engine, session_scope
+from TeacherLibrary.data.export_cache import cached_export, get_export_cache
+from TeacherLibrary.data.metadata_client import ChainProvider, get_metadata_provider
+from TeacherLibrary.data.instrumentation import (
+    ConnectionUsage, QueryScope, pool_stats, query_stats, start_query_scope, track_connection_usage
+)
+from TeacherLibrary.data.make_dataset import (
+    COLUMN_LABELS, IMPORT_KEYS, apply_import_diff, diff_import, import_from_file, parquet_available
+)
+
+_active_session: ContextVar[Optional[Session]] = ContextVar("active_db_session", default=None)
 
 
 def apply_custom_styling():
@@ -140,24 +160,7 @@ def render_page_header(title: str, icon: str, description: str = None):
 
 def get_column_mapping():
     """Get Danish column name mappings."""
-    return {
-        "id": "ID",
-        "book_number": "Bognr.",
-        "title": "Titel",
-        "author": "Forfatter",
-        "director": "Instruktør",
-        "location": "Placering",
-        "borrowed_count": "Udlånt",
-        "total_count": "I alt",
-        "theme": "Tema",
-        "geographical_area": "Geografisk område",
-        "publication_year": "År",
-        "genre": "Genre",
-        "subgenre": "Undergenre",
-        "material_type": "Materialetype",
-        "notes": "Noter",
-        "description": "Beskrivelse"
-    }
+    return dict(COLUMN_LABELS)
 
 
 def to_none_if_empty(value):
@@ -174,3 +177,346 @@ def build_data_dict(**kwargs):
 def render_detail_field(label, value, fallback="N/A"):
     """Render a detail field with fallback."""
     st.markdown(f"**{label}:** {value if value else fallback}")
+
+
+@contextmanager
+def db_session():
+    """
+    Check out a database session for a short block of queries.
+
+    Wrap only the queries, not slow work such as embedding encodes or ISBN
+    lookups: the connection goes back to the pool when the block exits, also
+    on exceptions, st.stop() and st.rerun(). Nested blocks in the same rerun
+    reuse the enclosing session instead of checking out a second connection.
+
+    The routing state lives in st.session_state, so after a teacher saves a
+    change the following reruns read from the primary rather than a lagging
+    read replica. Connection hold times are recorded per browser session.
+    """
+    active = _active_session.get()
+    if active is not None:
+        yield active
+        return
+
+    routing_state = st.session_state.setdefault("db_routing_state", {})
+    usage = st.session_state.setdefault("db_connection_usage", ConnectionUsage())
+    with track_connection_usage(usage), session_scope(info={"routing_state": routing_state}) as db:
+        token = _active_session.set(db)
+        try:
+            yield db
+        finally:
+            _active_session.reset(token)
+
+
+def _show_import_errors(errors):
+    """List skipped rows and file problems from an import."""
+    if errors:
+        st.warning(f"⚠️ {len(errors)} rækker eller problemer blev sprunget over")
+        with st.expander("Vis detaljer"):
+            st.text("\n".join(errors[:500]))
+            if len(errors) > 500:
+                st.caption(f"... og {len(errors) - 500} flere")
+
+
+def _show_import_diff(diff: dict, material_label: str):
+    """Summarize a dry-run diff with a preview of each kind of change."""
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Nye", len(diff["inserts"]))
+    col2.metric("Ændrede", len(diff["updates"]))
+    col3.metric("Slettes", len(diff["deletes"]))
+    col4.metric("Uændrede", diff["unchanged"])
+
+    for label, records in (("Nye", diff["inserts"]), ("Ændrede", diff["updates"]), ("Slettes", diff["deletes"])):
+        if records:
+            with st.expander(f"{label} {material_label} ({len(records)})"):
+                preview = pd.DataFrame(records[:200]).drop(columns=["content_hash"], errors="ignore")
+                st.dataframe(preview.rename(columns=get_column_mapping()), use_container_width=True, hide_index=True)
+                if len(records) > 200:
+                    st.caption(f"... og {len(records) - 200} flere")
+    _show_import_errors(diff["errors"])
+
+
+def render_import_section(crud, material_label: str, key: str):
+    """
+    Render a CSV/Excel file import with a progress bar.
+
+    "Tilføj" inserts every row of the file. "Opdatér" re-imports a full
+    file: it first shows a dry-run diff against the stored records (matched
+    by IMPORT_KEYS), then applies only the inserts, updates and optional
+    deletes in one transaction.
+
+    Args:
+        crud: CRUD operations instance for the target table
+        material_label: Danish plural used in messages, e.g. "bøger"
+        key: Prefix for widget keys
+    """
+    key_labels = ", ".join(f"`{column}`" for column in IMPORT_KEYS[crud.model.__tablename__])
+    st.markdown(
+        f"Importér {material_label} fra en CSV- eller Excel-fil (.xlsx) eller Parquet. Første række skal "
+        "indeholde feltnavnene, f.eks. `title`, `author`, `total_count`."
+    )
+    file_types = ["csv", "xlsx"] + (["parquet"] if parquet_available() else [])
+    uploaded_file = st.file_uploader("Vælg fil", type=file_types, key=f"{key}_import_file")
+    mode = st.radio(
+        "Importtype",
+        ["Tilføj alle rækker", "Opdatér fra fil (kun ændringer)"],
+        horizontal=True,
+        key=f"{key}_import_mode",
+        help=f"Opdatér matcher rækker med eksisterende {material_label} på {key_labels}",
+    )
+    update_mode = mode.startswith("Opdatér")
+    delete_missing = update_mode and st.checkbox(
+        f"Slet {material_label}, der ikke findes i filen", key=f"{key}_import_delete"
+    )
+
+    if not uploaded_file:
+        st.session_state.pop(f"{key}_import_diff", None)
+        return
+
+    file_type = {"xlsx": "excel", "parquet": "parquet"}.get(uploaded_file.name.lower().rsplit(".", 1)[-1], "csv")
+    progress_text = "Sammenligner..." if update_mode else "Importerer..."
+    button_label = "🔍 Vis ændringer" if update_mode else "📥 Importér"
+
+    if st.button(button_label, use_container_width=True, key=f"{key}_import_button"):
+        progress_bar = st.progress(0.0, text=progress_text)
+
+        def show_progress(rows: int, fraction):
+            progress_bar.progress(fraction or 0.0, text=f"{progress_text} {rows} rækker behandlet")
+
+        if update_mode:
+            with db_session() as db:
+                diff = diff_import(
+                    uploaded_file, crud, db, file_type=file_type,
+                    delete_missing=delete_missing, progress=show_progress
+                )
+            progress_bar.progress(1.0, text="Sammenligning færdig")
+            # Kept across the rerun triggered by the apply button
+            st.session_state[f"{key}_import_diff"] = (uploaded_file.name, diff)
+        else:
+            with db_session() as db:
+                success_count, errors = import_from_file(
+                    uploaded_file, crud, db, file_type=file_type, progress=show_progress
+                )
+            progress_bar.progress(1.0, text="Import færdig")
+
+            if success_count:
+                st.success(f"✅ {success_count} {material_label} importeret!")
+            _show_import_errors(errors)
+
+    pending = st.session_state.get(f"{key}_import_diff")
+    if not update_mode or pending is None or pending[0] != uploaded_file.name:
+        return
+
+    diff = pending[1]
+    _show_import_diff(diff, material_label)
+    if not (diff["inserts"] or diff["updates"] or diff["deletes"]):
+        st.info(f"Ingen ændringer - alle {material_label} er opdaterede")
+        return
+
+    if st.button("✅ Anvend ændringer", type="primary", use_container_width=True, key=f"{key}_import_apply"):
+        st.session_state.pop(f"{key}_import_diff")
+        try:
+            with db_session() as db:
+                counts = apply_import_diff(crud, db, diff)
+            st.success(
+                f"✅ {counts['inserted']} tilføjet, {counts['updated']} opdateret, "
+                f"{counts['deleted']} slettet"
+            )
+        except ValueError as e:
+            st.error(f"❌ Fejl ved import: {str(e)}")
+
+
+PAGE_SIZES = (25, 50, 100, 200)
+
+
+def get_page_window(key: str, reset_on: Any = None) -> Tuple[int, int]:
+    """
+    Get the rows to fetch for the current page of a result list.
+
+    Call before querying and pass the same key to render_pagination after.
+    The page goes back to 1 whenever reset_on (e.g. the search, filters and
+    sort order) changes.
+
+    Args:
+        key: Prefix for the pagination state and widget keys
+        reset_on: Value identifying the current result list
+
+    Returns:
+        Tuple of (skip, limit)
+    """
+    page_key, size_key, list_key = f"{key}_page", f"{key}_page_size", f"{key}_page_list"
+    if st.session_state.get(list_key) != reset_on:
+        st.session_state[list_key] = reset_on
+        st.session_state[page_key] = 1
+    page_size = st.session_state.setdefault(size_key, PAGE_SIZES[0])
+    page = st.session_state.setdefault(page_key, 1)
+    return (page - 1) * page_size, page_size
+
+
+def _step_page(page_key: str, step: int):
+    st.session_state[page_key] += step
+
+
+def _reset_page(page_key: str):
+    st.session_state[page_key] = 1
+
+
+def render_pagination(total: int, key: str):
+    """
+    Render page navigation and page size for a result list of `total` rows.
+
+    Reruns the page if the current page is past the end (e.g. after a
+    deletion), so the rows are fetched again for the last page.
+
+    Args:
+        total: Total number of matching rows
+        key: Same key as passed to get_page_window
+    """
+    page_key, size_key = f"{key}_page", f"{key}_page_size"
+    pages = max(1, math.ceil(total / st.session_state[size_key]))
+    if st.session_state[page_key] > pages:
+        st.session_state[page_key] = pages
+        st.rerun()
+    page = st.session_state[page_key]
+
+    col1, col2, col3, col4 = st.columns([1, 2, 1, 2])
+    with col1:
+        st.button("◀ Forrige", key=f"{key}_page_prev", disabled=page <= 1,
+                  on_click=_step_page, args=(page_key, -1), use_container_width=True)
+    with col2:
+        st.number_input(f"Side (af {pages})", min_value=1, max_value=pages, step=1, key=page_key,
+                        label_visibility="collapsed")
+    with col3:
+        st.button("Næste ▶", key=f"{key}_page_next", disabled=page >= pages,
+                  on_click=_step_page, args=(page_key, 1), use_container_width=True)
+    with col4:
+        st.selectbox("Pr. side", PAGE_SIZES, key=size_key, format_func=lambda n: f"{n} pr. side",
+                     on_change=_reset_page, args=(page_key,), label_visibility="collapsed")
+    st.caption(f"Side {page} af {pages}")
+
+
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": ("excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "csv", "text/csv"),
+    "Parquet": ("parquet", "parquet", "application/vnd.apache.parquet"),
+}
+
+
+def render_export_section(
+    crud, key: str, sort_by: Optional[str] = None, search: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None
+):
+    """
+    Render an export of the records matching the current search and filters.
+
+    The file is only built when asked for: records are streamed from the
+    database into the shared export cache, so teachers asking for the same
+    export of the same catalog version get the cached file instantly.
+
+    Args:
+        crud: CRUD operations instance for the source table
+        key: Prefix for widget keys
+        sort_by: Sort column of the current listing
+        search: Current search text
+        filters: Current column filters
+    """
+    query = {"sort_by": sort_by, "search": search or None, **(filters or {})}
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        formats = [label for label, (file_type, _, _) in EXPORT_FORMATS.items()
+                   if file_type != "parquet" or parquet_available()]
+        format_label = st.selectbox("Format", formats, key=f"{key}_export_format")
+    file_type, extension, mime = EXPORT_FORMATS[format_label]
+    request = (file_type, tuple(sorted(query.items())))
+
+    with col2:
+        st.write("")
+        if st.button("📤 Forbered eksport", use_container_width=True, key=f"{key}_export_button"):
+            with st.spinner("Eksporterer..."), db_session() as db:
+                path = cached_export(crud, db, file_type, **query)
+            st.session_state[f"{key}_export"] = (request, path)
+
+    prepared = st.session_state.get(f"{key}_export")
+    if not prepared or prepared[0] != request:
+        return
+    try:
+        with open(prepared[1], "rb") as f:
+            st.download_button(
+                f"⬇️ Download {format_label}",
+                data=f,
+                file_name=f"{crud.model.__tablename__}.{extension}",
+                mime=mime,
+                use_container_width=True,
+                key=f"{key}_export_download",
+            )
+    except FileNotFoundError:
+        # Evicted from the cache since it was prepared
+        st.session_state.pop(f"{key}_export")
+
+
+def start_page_query_tracking(page_name: str) -> QueryScope:
+    """Start counting database queries for this page render."""
+    return start_query_scope(page_name)
+
+
+def render_query_debug_panel(scope: QueryScope):
+    """Show query counts for this render and session in the sidebar (DEBUG_QUERIES=true)."""
+    if not Config.DEBUG_QUERIES:
+        return
+
+    totals = st.session_state.setdefault("query_totals", {"renders": 0, "queries": 0})
+    totals["renders"] += 1
+    totals["queries"] += scope.count
+
+    with st.sidebar.expander("🐞 Databaseforespørgsler"):
+        st.metric("Forespørgsler på denne side", scope.count)
+        st.caption(
+            f"{scope.total_ms:.1f} ms i alt · Session: {totals['queries']} "
+            f"forespørgsler over {totals['renders']} visninger"
+        )
+        repeated = scope.repeated_statements()
+        if repeated:
+            st.markdown("**Gentagne forespørgsler (mulig N+1):**")
+            for statement, count in repeated:
+                st.code(f"-- {count}x\n{statement}", language="sql")
+        st.markdown("**Svartider (alle forespørgsler):**")
+        st.bar_chart(query_stats.snapshot()["histogram"])
+
+        pool = pool_stats.snapshot(get_engine().pool)
+        st.markdown("**Forbindelsespulje:**")
+        st.caption(
+            f"{pool['checked_out']} i brug af {pool['pool_size']} (+{pool['overflow']} overflow) · "
+            f"Udnyttelse {pool['saturation']:.0%} · Ventetid gns. {pool['mean_wait_ms']:.1f} ms, "
+            f"maks. {pool['max_wait_ms']:.1f} ms · Timeouts: {pool['timeouts']}"
+        )
+        usage = st.session_state.get("db_connection_usage")
+        if usage is not None:
+            usage = usage.snapshot()
+            st.caption(
+                f"Denne session: {usage['checkouts']} udlån af forbindelser · "
+                f"Holdt gns. {usage['mean_held_ms']:.1f} ms, maks. {usage['max_held_ms']:.1f} ms · "
+                f"I brug nu: {usage['held']}"
+            )
+        exports = get_export_cache().snapshot()
+        st.markdown("**Eksport-cache:**")
+        st.caption(
+            f"{exports['files']} filer, {exports['bytes'] / 1024 / 1024:.1f} MB · "
+            f"Hitrate {exports['hit_rate']:.0%} ({exports['hits']} hits, {exports['misses']} misses) · "
+            f"Fjernet: {exports['evictions']}"
+        )
+        provider = get_metadata_provider()
+        for source in provider.providers if isinstance(provider, ChainProvider) else [provider]:
+            lookups = source.snapshot()
+            if source.name == "local":
+                st.markdown("**ISBN-opslag (lokalt Open Library-indeks):**")
+                st.caption(
+                    f"{lookups['lookups']} opslag · {lookups['hits']} fundet · "
+                    f"Gns. {lookups['mean_ms']:.1f} ms pr. opslag"
+                )
+            else:
+                st.markdown("**ISBN-opslag (Google Books):**")
+                st.caption(
+                    f"{lookups['lookups']} opslag · Hitrate {lookups['hit_rate']:.0%} "
+                    f"({lookups['hits']} fundet, {lookups['negative_hits']} ikke fundet i cachen) · "
+                    f"{lookups['requests']} forespørgsler, {lookups['errors']} fejl"
+                )
@@ -5,28 +5,37 @@ Hovedside for bibliotekssystemet.
 """
 import streamlit as st
 
-from TeacherLibrary.data.database import SessionLocal, init_db
+from TeacherLibrary.data.catalog_version import get_catalog_version, start_catalog_listener
+from TeacherLibrary.data.database import init_db, primary_reads, session_scope
 from TeacherLibrary.models.crud import book_crud, dvd_crud
-from app.shared_utils import apply_custom_styling, render_page_header
+from app.shared_utils import (
+    apply_custom_styling, render_page_header, render_query_debug_panel, start_page_query_tracking, db_session
+)
 
 
 @st.cache_resource
 def initialize_database():
-    """Initialize database tables once."""
+    """Initialize database tables and start the catalog change listener once."""
     init_db()
+    start_catalog_listener()
     return True
 
 
-@st.cache_data(ttl=60)  # Cache for 60 seconds
-def get_statistics():
-    """Get library statistics with caching."""
-    db = SessionLocal()
-    try:
-        total_books = len(book_crud.get_all(db))
-        total_dvds = len(dvd_crud.get_all(db))
-        return total_books, total_dvds
-    finally:
-        db.close()
+@st.cache_data
+def get_statistics(books_version: int, dvds_version: int):
+    """Get library statistics, cached until the catalog versions change."""
+    # Shared across browser sessions, so not tied to one session's routing state;
+    # counted on the primary so the result cannot trail the versions it is cached under
+    with session_scope() as db, primary_reads(db):
+        total_books = book_crud.count(db)
+        total_dvds = dvd_crud.count(db)
+    return total_books, total_dvds
+
+
+def get_catalog_versions():
+    """Get the current (books, dvds) catalog versions used as cache keys."""
+    with db_session() as db:
+        return get_catalog_version(db, "books"), get_catalog_version(db, "dvds")
 
 
 # Initialize database once
@@ -43,6 +52,9 @@ st.set_page_config(
 # Apply custom styling
 apply_custom_styling()
 
+# Count database queries for this render
+query_scope = start_page_query_tracking("Hjem")
+
 # Render header
 render_page_header(
     "Engelsklærernes Bibliotek",
@@ -50,7 +62,7 @@ render_page_header(
 )
 
 # Get statistics
-total_books, total_dvds = get_statistics()
+total_books, total_dvds = get_statistics(*get_catalog_versions())
 
 # Display statistics immediately after header
 st.subheader("📊 Oversigt")
@@ -153,3 +165,5 @@ st.markdown(
     "</p>",
     unsafe_allow_html=True
 )
+
+render_query_debug_panel(query_scope)
@@ -0,0 +1,126 @@
+"""
+Contention benchmark for book checkout and return.
+
+Runs many concurrent sessions that check out and return copies of the same
+book, comparing the atomic `book_crud.checkout`/`return_copies` against the
+old read-modify-write through `CRUDBase.update`. Reports throughput and
+whether the final borrowed_count is consistent (lost updates show up as drift).
+
+Runs against the configured DATABASE_URL and removes its benchmark book afterwards.
+"""
+import argparse
+import threading
+import time
+
+from TeacherLibrary.data.database import SessionLocal, init_db
+from TeacherLibrary.models.crud import CRUDBase, book_crud
+from TeacherLibrary.models.schemas import Book
+
+naive_crud = CRUDBase(Book)
+
+
+def atomic_worker(book_id: int, iterations: int, results: dict):
+    """Check out and return one copy per iteration using conditional UPDATEs."""
+    db = SessionLocal()
+    ok = rejected = 0
+    try:
+        for _ in range(iterations):
+            try:
+                book_crud.checkout(db, book_id)
+                book_crud.return_copies(db, book_id)
+                ok += 1
+            except ValueError:
+                rejected += 1
+    finally:
+        db.close()
+    with results["lock"]:
+        results["ok"] += ok
+        results["rejected"] += rejected
+
+
+def naive_worker(book_id: int, iterations: int, results: dict):
+    """Check out and return one copy per iteration via read-modify-write."""
+    db = SessionLocal()
+    ok = rejected = 0
+    try:
+        for _ in range(iterations):
+            try:
+                book = naive_crud.get(db, book_id)
+                naive_crud.update(db, book_id, {"borrowed_count": book.borrowed_count + 1})
+                book = naive_crud.get(db, book_id)
+                naive_crud.update(db, book_id, {"borrowed_count": book.borrowed_count - 1})
+                ok += 1
+            except ValueError:
+                rejected += 1
+    finally:
+        db.close()
+    with results["lock"]:
+        results["ok"] += ok
+        results["rejected"] += rejected
+
+
+def run(worker, book_id: int, sessions: int, iterations: int) -> dict:
+    """Run one benchmark round and return its measurements."""
+    results = {"ok": 0, "rejected": 0, "lock": threading.Lock()}
+    threads = [
+        threading.Thread(target=worker, args=(book_id, iterations, results))
+        for _ in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        final_borrowed = book_crud.get(db, book_id).borrowed_count
+    finally:
+        db.close()
+
+    return {
+        "elapsed": elapsed,
+        "ops_per_sec": results["ok"] * 2 / elapsed,
+        "ok": results["ok"],
+        "rejected": results["rejected"],
+        "final_borrowed": final_borrowed,
+    }
+
+
+def main():
+    """Run the checkout contention benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="Concurrent sessions")
+    parser.add_argument("--iterations", type=int, default=50, help="Checkout/return pairs per session")
+    parser.add_argument("--copies", type=int, default=5, help="total_count of the benchmark book")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    book = book_crud.create(db, {"title": "__checkout_benchmark__", "total_count": args.copies})
+    book_id = book.id
+    db.close()
+
+    print(f"{args.sessions} sessions x {args.iterations} iterations, {args.copies} copies")
+    print("=" * 70)
+    try:
+        for name, worker in [("atomic", atomic_worker), ("read-modify-write", naive_worker)]:
+            stats = run(worker, book_id, args.sessions, args.iterations)
+            print(
+                f"{name:>18}: {stats['ops_per_sec']:8.1f} ops/s  "
+                f"ok={stats['ok']} rejected={stats['rejected']}  "
+                f"final borrowed_count={stats['final_borrowed']} (expected 0)"
+            )
+            # Reset drift left by the naive run before the next round
+            db = SessionLocal()
+            naive_crud.update(db, book_id, {"borrowed_count": 0})
+            db.close()
+    finally:
+        db = SessionLocal()
+        book_crud.delete(db, book_id)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
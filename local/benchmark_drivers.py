@@ -0,0 +1,152 @@
+"""
+Driver benchmark: psycopg2 vs psycopg 3.
+
+Seeds books into a scratch PostgreSQL schema and times the repository's own
+CRUD workloads on each driver: repeated list/count/search queries (which
+psycopg 3 prepares server-side after DB_PREPARE_THRESHOLD executions),
+primary-key lookups, a bulk UPDATE as sent by CRUDBase.update_many (one
+executemany, which psycopg 3 pipelines), and a batch of single-row UPDATEs
+sent with and without the pipeline() helper.
+
+Usage:
+    python local/benchmark_drivers.py [--books 20000] [--repeat 200] [--updates 2000]
+
+Runs against the configured DATABASE_URL and drops its scratch schema afterwards.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.orm import Session
+
+from TeacherLibrary.config import Config
+from TeacherLibrary.data.database import Base, pipeline
+from TeacherLibrary.models.crud import book_crud
+from TeacherLibrary.models.schemas import Book
+
+SCHEMA = "driver_bench"
+DRIVERS = ("psycopg2", "psycopg")
+
+
+def make_engine(driver: str):
+    """Create an engine for one driver, rendering all tables into SCHEMA."""
+    _, rest = Config.get_database_url().split("://", 1)
+    connect_args = {}
+    if driver == "psycopg":
+        threshold = Config.DB_PREPARE_THRESHOLD
+        connect_args["prepare_threshold"] = threshold if threshold >= 0 else None
+    engine = create_engine(f"postgresql+{driver}://{rest}", connect_args=connect_args)
+    return engine.execution_options(schema_translate_map={None: SCHEMA})
+
+
+def seed(engine, books: int):
+    """Create the scratch schema and fill it with synthetic books."""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(conn)
+        conn.execute(text(
+            f"INSERT INTO {SCHEMA}.books (book_number, title, author, borrowed_count, total_count, "
+            "publication_year, genre) "
+            "SELECT i, 'Title ' || md5(i::text), 'Author ' || (i % 500), 0, 5, 1900 + i % 120, "
+            "'Genre ' || (i % 20) FROM generate_series(1, :books) AS i"
+        ), {"books": books})
+        conn.execute(text(f"ANALYZE {SCHEMA}.books"))
+
+
+def timed(fn, repeat: int) -> float:
+    """Run fn `repeat` times and return the mean duration in milliseconds."""
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run_workloads(engine, books: int, repeat: int, updates: int) -> dict:
+    """Time each workload on one engine; all writes are rolled back."""
+    results = {}
+    with Session(engine) as db:
+        results["get_all (sort + genre filter)"] = timed(
+            lambda i: book_crud.get_all(db, limit=50, sort_by="title", genre=f"Genre {i % 20}"), repeat
+        )
+        results["count (genre filter)"] = timed(
+            lambda i: book_crud.count(db, genre=f"Genre {i % 20}"), repeat
+        )
+        results["get_all (text search)"] = timed(
+            lambda i: book_crud.get_all(db, limit=50, search=f"Author {i % 500}"), repeat
+        )
+        results["get by id"] = timed(lambda i: book_crud.get(db, 1 + i % books), repeat)
+        db.expunge_all()
+
+        def single_updates():
+            for i in range(updates):
+                db.execute(
+                    update(Book).where(Book.id == 1 + i % books).values(borrowed_count=Book.borrowed_count + 1)
+                )
+
+        start = time.perf_counter()
+        single_updates()
+        results[f"{updates} UPDATEs"] = (time.perf_counter() - start) * 1000
+        db.rollback()
+
+        start = time.perf_counter()
+        with pipeline(db):
+            single_updates()
+        results[f"{updates} UPDATEs (pipeline)"] = (time.perf_counter() - start) * 1000
+        db.rollback()
+
+        # The statement update_many (and the enrichment script) sends per batch
+        rows = [{"id": 1 + i % books, "notes": f"Note {i}"} for i in range(min(updates, books))]
+        start = time.perf_counter()
+        db.execute(update(Book), rows)
+        results[f"bulk UPDATE ({len(rows)} rows)"] = (time.perf_counter() - start) * 1000
+        db.rollback()
+    return results
+
+
+def main():
+    """Seed the scratch schema and compare the drivers."""
+    parser = argparse.ArgumentParser(description="Compare psycopg2 and psycopg 3.")
+    parser.add_argument("--books", type=int, default=20000, help="Number of seeded books")
+    parser.add_argument("--repeat", type=int, default=200, help="Executions per read workload")
+    parser.add_argument("--updates", type=int, default=2000, help="UPDATEs in the write workload")
+    args = parser.parse_args()
+
+    if Config.is_sqlite():
+        print("The driver benchmark requires PostgreSQL")
+        sys.exit(2)
+
+    engines = {}
+    for driver in DRIVERS:
+        try:
+            engines[driver] = make_engine(driver)
+        except ImportError:
+            print(f"[SKIP] {driver} is not installed")
+    if not engines:
+        sys.exit(2)
+
+    seed(next(iter(engines.values())), args.books)
+    results = {}
+    try:
+        for driver, engine in engines.items():
+            # Warm up the pool so connection setup is not measured
+            run_workloads(engine, args.books, repeat=5, updates=10)
+            results[driver] = run_workloads(engine, args.books, args.repeat, args.updates)
+    finally:
+        with next(iter(engines.values())).begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        for engine in engines.values():
+            engine.dispose()
+
+    print(f"{args.books} books, {args.repeat} repeats per read, prepare_threshold={Config.DB_PREPARE_THRESHOLD}")
+    print("=" * 70)
+    print(f"{'workload':<34}" + "".join(f"{d:>14}" for d in results))
+    for workload in next(iter(results.values())):
+        unit = "ms total" if "UPDATE" in workload else "ms/query"
+        row = "".join(f"{results[d][workload]:>14.2f}" for d in results)
+        print(f"{workload:<34}{row}  {unit}")
+
+
+if __name__ == "__main__":
+    main()
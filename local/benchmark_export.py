@@ -0,0 +1,168 @@
+"""
+Export benchmark: streaming exporters vs the previous in-memory export.
+
+Seeds books into a scratch schema and times `export_records` (server-side
+cursor, incremental CSV / write-only openpyxl / Parquet row groups) against the previous approach
+of loading every record with `get_all`, converting them with `to_dict`,
+building a DataFrame and writing it into memory. Each variant runs in its own
+process so its peak resident memory (ru_maxrss) can be reported. The cached
+variant times a repeat download served from the export cache.
+
+Usage:
+    python local/benchmark_export.py [--rows 1000000] [--legacy-rows 200000]
+
+On PostgreSQL the rows live in a scratch schema that is dropped afterwards;
+on SQLite the configured database file is used (e.g. DATABASE_URL=sqlite:///bench.db).
+"""
+import argparse
+import json
+import logging
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from TeacherLibrary.config import Config
+from TeacherLibrary.data.database import Base, get_engine
+from TeacherLibrary.data.export_cache import cached_export
+from TeacherLibrary.data.make_dataset import export_records
+from TeacherLibrary.models.crud import book_crud
+
+SCHEMA = "export_bench"
+VARIANTS = {
+    "stream-csv": "streaming CSV",
+    "stream-excel": "streaming Excel",
+    "stream-parquet": "streaming Parquet",
+    "cached-excel": "cached Excel (repeat)",
+    "legacy-csv": "in-memory CSV (old)",
+    "legacy-excel": "in-memory Excel (old)",
+}
+
+
+def bench_engine():
+    """The configured engine, rendering model tables into SCHEMA on PostgreSQL."""
+    engine = get_engine()
+    if engine.dialect.name == "postgresql":
+        return engine.execution_options(schema_translate_map={None: SCHEMA})
+    return engine
+
+
+def seed(rows: int):
+    """Create the tables and fill them with synthetic books."""
+    engine = bench_engine()
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            series = "generate_series(1, :rows) AS s(i)"
+            table = f"{SCHEMA}.books"
+        else:
+            Base.metadata.drop_all(conn)
+            series = "(WITH RECURSIVE s(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM s WHERE i < :rows) SELECT i FROM s)"
+            table = "books"
+        Base.metadata.create_all(conn)
+        conn.execute(text(
+            f"INSERT INTO {table} (book_number, title, author, location, borrowed_count, total_count, "
+            "theme, publication_year, genre, description) "
+            "SELECT i, 'Title ' || i, 'Author ' || (i % 5000), 'gml.kælder', 0, 5, 'Theme ' || (i % 50), "
+            f"1900 + i % 120, 'Genre ' || (i % 40), 'lorem ipsum dolor sit amet' FROM {series}"
+        ), {"rows": rows})
+
+
+def drop():
+    """Remove the scratch data."""
+    engine = bench_engine()
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        else:
+            Base.metadata.drop_all(conn)
+
+
+def legacy_export(db: Session, file_type: str, rows: int) -> int:
+    """The previous export: all records as dicts -> DataFrame -> in-memory file."""
+    data = [book.to_dict() for book in book_crud.get_all(db, limit=rows)]
+    df = pd.DataFrame(data)
+    if file_type == "csv":
+        return len(df.to_csv(index=False).encode("utf-8"))
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="books", index=False)
+    return output.getbuffer().nbytes
+
+
+def run_variant(variant: str, rows: int):
+    """Run one export in this process and print its measurements as JSON."""
+    kind, file_type = variant.split("-")
+    if kind == "cached":
+        Config.EXPORT_CACHE_DIR = tempfile.mkdtemp(prefix="export_bench_")
+        with Session(bind=bench_engine()) as db:
+            cached_export(book_crud, db, file_type)
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with Session(bind=bench_engine()) as db:
+        if kind == "cached":
+            with open(cached_export(book_crud, db, file_type), "rb") as f:
+                size = len(f.read())
+        elif kind == "legacy":
+            size = legacy_export(db, file_type, rows)
+        else:
+            size = 0
+            with tempfile.TemporaryFile() as output:
+                for chunk in export_records(book_crud, db, file_type):
+                    output.write(chunk)
+                    size += len(chunk)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if kind == "cached":
+        shutil.rmtree(Config.EXPORT_CACHE_DIR)
+    print(json.dumps({"seconds": elapsed, "bytes": size, "peak_kb": peak, "delta_kb": peak - baseline}))
+
+
+def main():
+    """Seed the scratch data and run every variant in a subprocess."""
+    parser = argparse.ArgumentParser(description="Benchmark CSV/Excel export.")
+    parser.add_argument("--rows", type=int, default=1000000, help="Seeded books, exported by the streaming variants")
+    parser.add_argument("--legacy-rows", type=int, default=200000, help="Books exported by the old variants")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.rows)
+        return
+
+    # Seeding a million rows is a deliberately slow statement
+    logging.getLogger("TeacherLibrary.slow_query").setLevel(logging.ERROR)
+    seed(args.rows)
+    try:
+        print(f"Database: {get_engine().dialect.name}, {args.rows} books")
+        print("=" * 90)
+        for variant, name in VARIANTS.items():
+            rows = args.legacy_rows if variant.startswith("legacy") else args.rows
+            completed = subprocess.run(
+                [sys.executable, __file__, "--variant", variant, "--rows", str(rows)],
+                capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                print(f"{name:<24} failed: {completed.stderr.strip().splitlines()[-1]}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(
+                f"{name:<24} {rows:>9} rows  {result['seconds']:7.1f} s  {rows / result['seconds']:9.0f} rows/s  "
+                f"{result['bytes'] / 1024 / 1024:7.1f} MiB file  peak RSS {result['peak_kb'] / 1024:7.1f} MiB "
+                f"(+{result['delta_kb'] / 1024:.1f})"
+            )
+    finally:
+        drop()
+
+
+if __name__ == "__main__":
+    main()
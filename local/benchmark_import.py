@@ -0,0 +1,252 @@
+"""
+Import benchmark: streaming batched import vs the old row-by-row import.
+
+Generates a synthetic books CSV (and optionally an .xlsx copy), then times
+`import_from_file` against the previous approach of reading the whole file,
+iterating with `iterrows()` and committing each row through `crud.create`.
+Reports rows/s for each, and with --memory the peak Python memory
+(tracemalloc, which slows the run down considerably). Also times the
+validation stage alone: batch validation through the compiled
+`TypeAdapter(list[BookSchema])` against validating one `BookSchema` per row.
+With --parquet, also imports a typed Parquet copy of the file (needs pyarrow).
+With --reimport, re-imports the same file through `diff_import` and
+`apply_import_diff` with no changes and with 1% of the rows changed.
+
+Usage:
+    python local/benchmark_import.py [--rows 100000] [--legacy-rows 5000] [--excel] [--parquet] [--memory] [--reimport]
+
+On PostgreSQL the tables live in a scratch schema that is dropped afterwards;
+on SQLite the configured database is used (e.g. DATABASE_URL=sqlite://).
+"""
+import argparse
+import csv
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+from openpyxl import Workbook
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from TeacherLibrary.data.database import Base, get_engine
+from TeacherLibrary.data.make_dataset import (
+    PARQUET_ROW_GROUP_SIZE, _clean_chunk, _iter_csv_chunks, apply_import_diff, arrow_schema, diff_import,
+    import_from_file
+)
+from TeacherLibrary.models.crud import book_crud
+from TeacherLibrary.models.schemas import Book
+from TeacherLibrary.models.validators import BookSchema, validate_batch
+
+SCHEMA = "import_bench"
+HEADER = ["book_number", "title", "author", "location", "total_count", "publication_year", "genre", "description"]
+
+
+def write_csv(path: str, rows: int):
+    """Write a synthetic books CSV; every 500th row has an unparseable year, every 1000th an out-of-range one."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            year = "unknown" if i % 500 == 499 else 99 if i % 1000 == 250 else 1900 + i % 120
+            writer.writerow([
+                i + 1, f"  Title {i} ", f"Author {i % 5000}", "gml.kælder", 1 + i % 5, year,
+                f"Genre {i % 40}", "lorem ipsum " * 10,
+            ])
+
+
+def write_excel(csv_path: str, path: str):
+    """Copy the CSV into an .xlsx file with a write-only workbook."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_parquet(csv_path: str, path: str):
+    """Copy the CSV into a Parquet file typed by the Book schema; unparseable numbers become nulls."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(Book.__table__, HEADER)
+    df = pd.read_csv(csv_path, dtype=str)
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(df[field.name], errors="coerce").astype("Int64")
+    pq.write_table(pa.Table.from_pandas(df, schema, preserve_index=False), path, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+
+@contextmanager
+def scratch_session():
+    """Yield a session whose tables are empty and discarded afterwards."""
+    engine = get_engine()
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            conn.commit()
+            conn = conn.execution_options(schema_translate_map={None: SCHEMA})
+            # Raw SQL (catalog version bumps) resolves to the scratch schema too
+            conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        Base.metadata.create_all(conn)
+        conn.commit()
+        try:
+            with Session(bind=conn) as db:
+                yield db
+        finally:
+            conn.rollback()
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            else:
+                Base.metadata.drop_all(conn)
+            conn.commit()
+
+
+def legacy_import(path: str, db: Session) -> int:
+    """The previous import: whole file in memory, one commit per row."""
+    df = pd.read_csv(path)
+    df = df.where(pd.notna(df), None)
+    success_count = 0
+    for _, row in df.iterrows():
+        try:
+            book_crud.create(db, row.to_dict())
+            success_count += 1
+        except Exception:
+            pass
+    return success_count
+
+
+def benchmark_validation(path: str, batch_size: int):
+    """Time only the validation stage over the cleaned rows of a CSV file."""
+    with open(path, "rb") as f:
+        batches = [_clean_chunk(chunk, Book.__table__)[0] for chunk, _ in _iter_csv_chunks(f, batch_size)]
+    rows = sum(len(batch) for batch in batches)
+
+    def per_row():
+        valid = 0
+        for batch in batches:
+            for row in batch:
+                try:
+                    BookSchema(**row).model_dump(exclude_unset=True)
+                    valid += 1
+                except ValueError:
+                    pass
+        return valid
+
+    def batched():
+        return sum(len(validate_batch(BookSchema, batch)[0]) for batch in batches)
+
+    for name, run in (("validate per row", per_row), ("validate TypeAdapter", batched)):
+        start = time.perf_counter()
+        valid = run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<22} {rows:>9} rows  {elapsed:8.2f} s  {rows / elapsed:10.0f} rows/s  valid={valid}")
+
+
+def write_changed_csv(path: str, changed_path: str, every: int):
+    """Copy a CSV with the title of every `every`-th row changed."""
+    with open(path, newline="", encoding="utf-8") as src, open(changed_path, "w", newline="", encoding="utf-8") as dst:
+        reader, writer = csv.reader(src), csv.writer(dst)
+        writer.writerow(next(reader))
+        for i, row in enumerate(reader):
+            if i % every == 0:
+                row[1] = f"Revised {row[1].strip()}"
+            writer.writerow(row)
+
+
+def reimport(path: str, db: Session, batch_size: int):
+    """Diff a file against the database and apply the changes; returns (changes, diff s, apply s)."""
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        diff = diff_import(f, book_crud, db, "csv", batch_size=batch_size)
+    diffed = time.perf_counter()
+    apply_import_diff(book_crud, db, diff)
+    return len(diff["inserts"]) + len(diff["updates"]), diffed - start, time.perf_counter() - diffed
+
+
+def measure(name: str, run, memory: bool) -> None:
+    """Run an import and print throughput (and peak memory if requested)."""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    imported, rows = run()
+    elapsed = time.perf_counter() - start
+    line = f"{name:<22} {rows:>9} rows  {elapsed:8.2f} s  {rows / elapsed:10.0f} rows/s  imported={imported}"
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f"  peak {peak / 1024 / 1024:.1f} MiB"
+    print(line)
+
+
+def main():
+    """Generate the input files and run each import."""
+    parser = argparse.ArgumentParser(description="Benchmark CSV/Excel import.")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows for the streaming import")
+    parser.add_argument("--legacy-rows", type=int, default=5000, help="Rows for the row-by-row import")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Streaming import batch size")
+    parser.add_argument("--excel", action="store_true", help="Also import an .xlsx copy")
+    parser.add_argument("--parquet", action="store_true", help="Also import a Parquet copy")
+    parser.add_argument("--memory", action="store_true", help="Trace peak Python memory (slow)")
+    parser.add_argument("--reimport", action="store_true", help="Also time diff-based re-imports")
+    args = parser.parse_args()
+
+    # The old import logs every rejected row
+    logging.getLogger("TeacherLibrary.models.crud").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "books.csv")
+        legacy_path = os.path.join(tmp, "books_legacy.csv")
+        write_csv(csv_path, args.rows)
+        write_csv(legacy_path, args.legacy_rows)
+
+        benchmark_validation(csv_path, args.batch_size)
+        print(f"Database: {get_engine().dialect.name}")
+        print("=" * 90)
+
+        with scratch_session() as db:
+            measure("row-by-row (old)", lambda: (legacy_import(legacy_path, db), args.legacy_rows), args.memory)
+
+        with scratch_session() as db:
+            def streaming_csv():
+                with open(csv_path, "rb") as f:
+                    imported, _ = import_from_file(f, book_crud, db, "csv", batch_size=args.batch_size)
+                return imported, args.rows
+            measure("streaming CSV", streaming_csv, args.memory)
+
+        if args.parquet:
+            parquet_path = os.path.join(tmp, "books.parquet")
+            write_parquet(csv_path, parquet_path)
+            with scratch_session() as db:
+                def streaming_parquet():
+                    with open(parquet_path, "rb") as f:
+                        imported, _ = import_from_file(f, book_crud, db, "parquet", batch_size=args.batch_size)
+                    return imported, args.rows
+                measure("streaming Parquet", streaming_parquet, args.memory)
+
+        if args.reimport:
+            changed_path = os.path.join(tmp, "books_changed.csv")
+            write_changed_csv(csv_path, changed_path, every=100)
+            with scratch_session() as db:
+                for name, path in (("initial", csv_path), ("no changes", csv_path), ("1% changed", changed_path)):
+                    changes, diff_s, apply_s = reimport(path, db, args.batch_size)
+                    print(f"re-import {name:<12} {changes:>9} changes  diff {diff_s:6.2f} s  apply {apply_s:6.2f} s")
+
+        if args.excel:
+            xlsx_path = os.path.join(tmp, "books.xlsx")
+            write_excel(csv_path, xlsx_path)
+            with scratch_session() as db:
+                def streaming_excel():
+                    with open(xlsx_path, "rb") as f:
+                        imported, _ = import_from_file(f, book_crud, db, "excel", batch_size=args.batch_size)
+                    return imported, args.rows
+                measure("streaming Excel", streaming_excel, args.memory)
+
+
+if __name__ == "__main__":
+    main()
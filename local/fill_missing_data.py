@@ -3,18 +3,76 @@ Script to fill in missing book data by searching Google Books API.
 
 Finds books with missing information (author, description, genre, year) and
 attempts to fill them in using title search on Google Books API.
+
+Incomplete books are selected in SQL and read in batches; each batch is
+looked up concurrently in a thread pool and written in one transaction (a
+book the database rejects is skipped without losing the rest). The
+metadata client's token bucket keeps the request rate within --rate and backs
+off on HTTP 429/5xx. Database reads and writes stay on the main thread. Point
+--base-url (or GOOGLE_BOOKS_URL) at a local stub server to try it without the
+real API. A local Open Library index (METADATA_PROVIDERS) is asked first, and
+Google Books fills in the fields it lacks.
 """
+import argparse
+import os
+import sqlite3
 import time
-from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, List, Set, Tuple
 
 import requests
 from sqlalchemy.orm import Session
 
+from TeacherLibrary.config import Config
+from TeacherLibrary.data.catalog_version import get_database_id
 from TeacherLibrary.data.database import SessionLocal
-from TeacherLibrary.models.schemas import Book
+from TeacherLibrary.data.metadata_client import (
+    MetadataProvider, create_metadata_client, create_metadata_provider, get_metadata_provider
+)
 from TeacherLibrary.models.crud import book_crud
 
 
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 200
+MISSING_FIELDS = ("author", "description", "genre", "publication_year")
+
+
+def _fetch_metadata(provider: MetadataProvider, title: str, author: Optional[str] = None) -> Optional[Dict]:
+    """
+    Look up a book by title (and author) and extract the fields this script fills.
+
+    Raises:
+        requests.RequestException: If the lookup failed
+    """
+    book_info = provider.volume_by_title(title, author)
+    if book_info is None:
+        return None
+
+    # Parse authors
+    authors = book_info.get("authors", [])
+    author_str = ", ".join(authors) if authors else None
+
+    # Extract publication year
+    published_date = book_info.get("publishedDate", "")
+    publication_year = None
+    if published_date:
+        try:
+            publication_year = int(published_date[:4])
+        except (ValueError, IndexError):
+            pass
+
+    # Get categories (genres)
+    categories = book_info.get("categories", [])
+    genre = categories[0] if categories else None
+
+    return {
+        "author": author_str,
+        "description": book_info.get("description"),
+        "genre": genre,
+        "publication_year": publication_year,
+    }
+
+
 def search_book_by_title(title: str, author: Optional[str] = None) -> Optional[Dict]:
     """
     Search for book metadata using title (and optionally author) on Google Books API.
@@ -27,109 +85,118 @@ def search_book_by_title(title: str, author: Optional[str] = None) -> Optional[D
         Dictionary with book data or None if not found
     """
     try:
-        # Construct search query
-        query = f"intitle:{title}"
-        if author:
-            query += f"+inauthor:{author}"
-
-        url = f"https://www.googleapis.com/books/v1/volumes?q={query}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-
-        if data.get("totalItems", 0) == 0:
-            return None
-
-        # Get first result
-        book_info = data["items"][0]["volumeInfo"]
-
-        # Parse authors
-        authors = book_info.get("authors", [])
-        author_str = ", ".join(authors) if authors else None
-
-        # Extract publication year
-        published_date = book_info.get("publishedDate", "")
-        publication_year = None
-        if published_date:
-            try:
-                publication_year = int(published_date[:4])
-            except (ValueError, IndexError):
-                pass
-
-        # Get categories (genres)
-        categories = book_info.get("categories", [])
-        genre = categories[0] if categories else None
-
-        return {
-            "author": author_str,
-            "description": book_info.get("description"),
-            "genre": genre,
-            "publication_year": publication_year,
-        }
-
+        return _fetch_metadata(get_metadata_provider(), title, author)
     except (requests.RequestException, KeyError, ValueError, IndexError):
         return None
 
 
-def fill_missing_book_data(db: Session, dry_run: bool = True) -> Dict:
+def _lookup(provider: MetadataProvider, title: str, author: Optional[str]) -> Tuple[Optional[Dict], Optional[str]]:
+    """Worker task: (fetched data or None, error message or None)."""
+    try:
+        return _fetch_metadata(provider, title, author), None
+    except (requests.RequestException, KeyError, ValueError, IndexError) as e:
+        return None, str(e)
+
+
+class EnrichmentCheckpoint:
+    """
+    SQLite record of per-book enrichment outcomes, so runs can resume.
+
+    Each looked-up book is stored with its outcome ('found', 'incomplete',
+    'not_found' or 'error') and a timestamp, keyed by the database's random
+    id (see get_database_id) and the book id, so a recreated database or
+    another DATABASE_URL never inherits outcomes of unrelated books with the
+    same ids. Books not found, or found without every missing field, are
+    skipped until the cool-down has passed; errors are retried. Filled books
+    need no entry to be skipped: they are no longer incomplete.
     """
-    Find books with missing data and fill them in using Google Books API.
 
-    Args:
-        db: Database session
-        dry_run: If True, only show what would be updated without saving
+    def __init__(self, path: str, database_id: str):
+        """Open (or create) the checkpoint database at path, for the database with database_id."""
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.database_id = database_id
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS book_outcomes ("
+            "database_id TEXT NOT NULL, book_id INTEGER NOT NULL, book_number INTEGER, "
+            "outcome TEXT NOT NULL, detail TEXT, processed_at REAL NOT NULL, "
+            "PRIMARY KEY (database_id, book_id))"
+        )
+
+    def skip_ids(self, retry_not_found_after: float) -> Set[int]:
+        """IDs of books not (fully) found less than retry_not_found_after seconds ago."""
+        rows = self._conn.execute(
+            "SELECT book_id FROM book_outcomes WHERE database_id = ? "
+            "AND outcome IN ('not_found', 'incomplete') AND processed_at > ?",
+            (self.database_id, time.time() - retry_not_found_after),
+        )
+        return {book_id for (book_id,) in rows}
+
+    def record(self, outcomes: List[Tuple[int, int, str, Optional[str]]]):
+        """Store (book_id, book_number, outcome, detail) tuples in one transaction."""
+        now = time.time()
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO book_outcomes "
+                "(database_id, book_id, book_number, outcome, detail, processed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.database_id, *outcome, now) for outcome in outcomes],
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Number of recorded books per outcome."""
+        return dict(self._conn.execute(
+            "SELECT outcome, COUNT(*) FROM book_outcomes WHERE database_id = ? GROUP BY outcome",
+            (self.database_id,),
+        ))
+
+    def clear(self):
+        """Forget all outcomes for this database (start over)."""
+        self._conn.execute("DELETE FROM book_outcomes WHERE database_id = ?", (self.database_id,))
+
+    def close(self):
+        """Close the checkpoint database."""
+        self._conn.close()
+
+
+def _enrich_batch(
+    pool: ThreadPoolExecutor,
+    provider: MetadataProvider,
+    batch: List[Tuple[tuple, List[str]]],
+    stats: Dict,
+) -> Tuple[List[Dict], List[Tuple[int, int, str, Optional[str]]]]:
+    """
+    Look up one batch of incomplete books concurrently.
 
     Returns:
-        Dictionary with statistics about the operation
+        Tuple of (update dicts with "id" plus the fields found,
+        checkpoint outcomes for every book in the batch)
     """
-    stats = {
-        "total_books": 0,
-        "books_with_missing_data": 0,
-        "books_updated": 0,
-        "books_not_found": 0,
-        "fields_filled": {
-            "author": 0,
-            "description": 0,
-            "genre": 0,
-            "publication_year": 0
-        }
+    futures = {
+        pool.submit(_lookup, provider, title, author): (book_id, book_number, title, missing_fields)
+        for (book_id, book_number, title, author), missing_fields in batch
     }
-
-    # Get all books
-    all_books = db.query(Book).all()
-    stats["total_books"] = len(all_books)
-
-    print(f"Analyzing {stats['total_books']} books...")
-    print("=" * 70)
-
-    for book in all_books:
-        # Check if book has missing data
-        missing_fields = []
-        if not book.author:
-            missing_fields.append("author")
-        if not book.description:
-            missing_fields.append("description")
-        if not book.genre:
-            missing_fields.append("genre")
-        if not book.publication_year:
-            missing_fields.append("publication_year")
-
-        if not missing_fields:
-            continue
-
-        stats["books_with_missing_data"] += 1
-
-        print(f"\n[{book.book_number}] {book.title}")
+    updates = []
+    outcomes = []
+    # Results are handled here, on the thread that owns the session
+    for future in as_completed(futures):
+        book_id, book_number, title, missing_fields = futures[future]
+        fetched_data, error = future.result()
+
+        print(f"\n[{book_number}] {title}")
         print(f"  Missing: {', '.join(missing_fields)}")
 
-        # Try to fetch data
-        print(f"  Searching Google Books...")
-        fetched_data = search_book_by_title(book.title, book.author)
+        if error:
+            print(f"  ✗ Lookup failed: {error}")
+            stats["lookup_errors"] += 1
+            outcomes.append((book_id, book_number, "error", error))
+            continue
 
         if not fetched_data:
             print(f"  ✗ Not found")
             stats["books_not_found"] += 1
+            outcomes.append((book_id, book_number, "not_found", None))
             continue
 
         # Prepare update data
@@ -137,34 +204,162 @@ def fill_missing_book_data(db: Session, dry_run: bool = True) -> Dict:
         for field in missing_fields:
             if field in fetched_data and fetched_data[field]:
                 update_data[field] = fetched_data[field]
-                stats["fields_filled"][field] += 1
                 print(f"  ✓ Found {field}: {str(fetched_data[field])[:50]}...")
 
         if update_data:
-            if dry_run:
-                print(f"  [DRY RUN] Would update: {', '.join(update_data.keys())}")
-            else:
-                try:
-                    book_crud.update(db, book.id, update_data)
-                    print(f"  ✓ Updated: {', '.join(update_data.keys())}")
-                    stats["books_updated"] += 1
-                except Exception as e:
-                    print(f"  ✗ Error updating: {e}")
-
-        # Rate limiting - be nice to the API
-        time.sleep(1)
+            updates.append({"id": book_id, **update_data})
+        # A book still missing fields is looked up again after the cool-down
+        outcome = "found" if len(update_data) == len(missing_fields) else "incomplete"
+        outcomes.append((book_id, book_number, outcome, ", ".join(update_data) or None))
+    return updates, outcomes
+
+
+def _count_filled_fields(stats: Dict, updates: List[Dict]):
+    """Add the fields set by updates to the fields_filled statistics."""
+    for update in updates:
+        for field in update:
+            if field != "id":
+                stats["fields_filled"][field] += 1
+
+
+def _write_updates(
+    db: Session, updates: List[Dict], outcomes: List[Tuple[int, int, str, Optional[str]]], stats: Dict
+) -> List[Tuple[int, int, str, Optional[str]]]:
+    """
+    Write one batch of updates, counting only what reached the database.
+
+    Returns:
+        The batch's outcomes, with books whose update failed marked as errors
+    """
+    try:
+        updated, errors = book_crud.update_many(db, updates)
+        failed = {updates[index]["id"]: message for index, message in errors}
+    except ValueError as e:
+        updated = 0
+        failed = {update["id"]: str(e) for update in updates}
+
+    if updated:
+        print(f"\n  ✓ Updated {updated} books")
+    for book_id, message in failed.items():
+        print(f"\n  ✗ Error updating book {book_id}: {message}")
+
+    stats["books_updated"] += updated
+    _count_filled_fields(stats, [update for update in updates if update["id"] not in failed])
+    return [
+        (book_id, book_number, "error", failed[book_id]) if book_id in failed
+        else (book_id, book_number, outcome, detail)
+        for book_id, book_number, outcome, detail in outcomes
+    ]
+
+
+def fill_missing_book_data(
+    db: Session,
+    dry_run: bool = True,
+    provider: Optional[MetadataProvider] = None,
+    workers: int = DEFAULT_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    checkpoint: Optional[EnrichmentCheckpoint] = None,
+    retry_not_found_after: float = Config.ENRICHMENT_RETRY_NOT_FOUND_DAYS * 86400,
+) -> Dict:
+    """
+    Find books with missing data and fill them in using Google Books API.
+
+    Only incomplete books are read: they are selected in SQL one batch at a
+    time, in id order after the previous batch, so the same session can
+    write between batches. Each batch is looked up concurrently and its
+    updates are written in one transaction, after which its outcomes go to
+    the checkpoint. A book
+    the database rejects is marked as an error without losing the rest of
+    its batch, and an interrupted run loses at most one batch of lookups.
+
+    Args:
+        db: Database session used for the reads and updates
+        dry_run: If True, only show what would be updated without saving
+        provider: Metadata provider to look books up with (default: the configured chain)
+        workers: Concurrent lookups; the remote client's rate limiter still applies
+        batch_size: Books read, looked up and written per batch
+        checkpoint: Skips books processed by earlier runs; updated unless dry_run
+        retry_not_found_after: Seconds before a book that was not found is looked up again
+
+    Returns:
+        Dictionary with statistics about the operation
+    """
+    provider = provider or get_metadata_provider()
+    stats = {
+        "total_books": 0,
+        "books_with_missing_data": 0,
+        "books_skipped": 0,
+        "books_updated": 0,
+        "books_not_found": 0,
+        "lookup_errors": 0,
+        "interrupted": False,
+        "fields_filled": {field: 0 for field in MISSING_FIELDS}
+    }
+
+    stats["total_books"] = book_crud.count(db)
+    skip_ids = checkpoint.skip_ids(retry_not_found_after) if checkpoint is not None else set()
+
+    print(f"Analyzing {stats['total_books']} books...")
+    if skip_ids:
+        print(f"Skipping {len(skip_ids)} books processed by earlier runs")
+    print("=" * 70)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    last_id = 0
+    try:
+        while True:
+            batch = book_crud.get_missing(
+                db, MISSING_FIELDS, ("id", "book_number", "title", "author"), after_id=last_id, limit=batch_size
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0][0]
+            stats["books_with_missing_data"] += len(batch)
+            pending = [item for item in batch if item[0][0] not in skip_ids]
+            stats["books_skipped"] += len(batch) - len(pending)
+            if not pending:
+                continue
+
+            updates, outcomes = _enrich_batch(pool, provider, pending, stats)
+            if updates:
+                if dry_run:
+                    print(f"\n  [DRY RUN] Would update {len(updates)} books")
+                    _count_filled_fields(stats, updates)
+                else:
+                    outcomes = _write_updates(db, updates, outcomes, stats)
+
+            if checkpoint is not None and not dry_run:
+                checkpoint.record(outcomes)
+    except KeyboardInterrupt:
+        # Completed batches are saved; the next run resumes after them
+        print("\n\n⏹  Interrupted - completed batches are saved in the checkpoint")
+        stats["interrupted"] = True
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
     return stats
 
 
 def main():
     """Run the data filling script."""
-    import sys
+    parser = argparse.ArgumentParser(description="Fill missing book data from Google Books.")
+    parser.add_argument("--update", action="store_true", help="Save changes to the database (default: dry run)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent lookups")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Books written per transaction")
+    parser.add_argument("--rate", type=float, default=Config.METADATA_RATE_LIMIT, help="Requests per second")
+    parser.add_argument("--burst", type=int, default=Config.METADATA_BURST, help="Requests allowed in a burst")
+    parser.add_argument("--base-url", default=Config.GOOGLE_BOOKS_URL, help="Volumes endpoint, e.g. a local stub")
+    parser.add_argument("--checkpoint", default=Config.ENRICHMENT_CHECKPOINT_PATH, help="Checkpoint file of earlier runs")
+    parser.add_argument(
+        "--retry-not-found-days", type=float, default=Config.ENRICHMENT_RETRY_NOT_FOUND_DAYS,
+        help="Look up books that were not found again after this many days",
+    )
+    parser.add_argument("--restart", action="store_true", help="Forget earlier runs and process every book")
+    args = parser.parse_args()
 
     # Check if user wants to actually update (not dry run)
-    dry_run = True
-    if len(sys.argv) > 1 and sys.argv[1] == "--update":
-        dry_run = False
+    dry_run = not args.update
+    if not dry_run:
         print("⚠️  LIVE UPDATE MODE - Changes will be saved to database!")
     else:
         print("🔍 DRY RUN MODE - No changes will be saved")
@@ -173,27 +368,72 @@ def main():
     print("=" * 70)
     print()
 
+    client = create_metadata_client(args.base_url, args.rate, args.burst, pool_size=args.workers)
+    provider = create_metadata_provider(remote=client)
     db = SessionLocal()
+    database_id = get_database_id(db)
+    db.commit()
+    checkpoint = EnrichmentCheckpoint(args.checkpoint, database_id)
+    if args.restart and not dry_run:
+        checkpoint.clear()
     try:
-        stats = fill_missing_book_data(db, dry_run=dry_run)
+        stats = fill_missing_book_data(
+            db,
+            dry_run=dry_run,
+            provider=provider,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            # A dry run with --restart ignores the checkpoint without clearing it
+            checkpoint=None if args.restart and dry_run else checkpoint,
+            retry_not_found_after=args.retry_not_found_days * 86400,
+        )
 
         print("\n" + "=" * 70)
         print("SUMMARY")
         print("=" * 70)
         print(f"Total books: {stats['total_books']}")
         print(f"Books with missing data: {stats['books_with_missing_data']}")
+        print(f"Books skipped (earlier runs): {stats['books_skipped']}")
         print(f"Books updated: {stats['books_updated']}")
         print(f"Books not found: {stats['books_not_found']}")
+        print(f"Lookup errors: {stats['lookup_errors']}")
         print(f"\nFields filled:")
         for field, count in stats['fields_filled'].items():
             if count > 0:
                 print(f"  - {field}: {count}")
 
+        for source in getattr(provider, "providers", [provider]):
+            if source.name == "local":
+                local = source.snapshot()
+                print(
+                    f"\nLocal index: {local['hits']} of {local['lookups']} lookups answered "
+                    f"({local['mean_ms']:.2f} ms each)"
+                )
+        cache = client.snapshot()
+        print(
+            f"Google Books lookups: {cache['lookups']} ({cache['hits']} cached, {cache['negative_hits']} cached not-found, "
+            f"{cache['requests']} requests, {cache['retries']} retries, {cache['errors']} errors) - "
+            f"cache hit rate {cache['hit_rate']:.0%}"
+        )
+
+        recorded = checkpoint.counts()
+        if recorded:
+            print(
+                f"Checkpoint: {recorded.get('found', 0)} found, {recorded.get('incomplete', 0)} incomplete, "
+                f"{recorded.get('not_found', 0)} not found, {recorded.get('error', 0)} errors ({args.checkpoint})"
+            )
+        if stats["interrupted"]:
+            print("\n⏹  Run interrupted - run the same command again to resume")
+
         if dry_run and stats['books_with_missing_data'] > 0:
             print(f"\n💡 Run with --update to save changes to database")
 
     finally:
         db.close()
+        # The chain may include the client; closing it twice is harmless
+        provider.close()
+        client.close()
+        checkpoint.close()
 
 
 if __name__ == "__main__":
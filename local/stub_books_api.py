@@ -0,0 +1,103 @@
+"""
+Local stand-in for the Google Books volumes endpoint.
+
+Answers `?q=...` searches with a made-up volume after a fixed latency, so the
+enrichment script can be run and timed without touching the real API. A share
+of the requests can be answered with "not found" or HTTP 429 to exercise
+negative caching and backoff.
+
+Usage:
+    python local/stub_books_api.py [--port 8765] [--latency 0.2] [--not-found 0.1] [--throttle 0.05]
+    GOOGLE_BOOKS_URL=http://127.0.0.1:8765/volumes METADATA_CACHE_PATH= \
+        python local/fill_missing_data.py --workers 8 --rate 20
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def _share(query: str, salt: str) -> float:
+    """Deterministic number in [0, 1) per query, so reruns get the same answers."""
+    digest = hashlib.sha256(f"{salt}:{query}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32
+
+
+def make_handler(latency: float, not_found: float, throttle: float):
+    """Request handler class with the given behaviour."""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Requests per query, so each query's nth attempt gets the same answer
+        # whatever order the server threads handle concurrent requests in
+        attempts = Counter()
+        attempts_lock = threading.Lock()
+
+        def _send(self, status: int, body: dict, headers: Optional[dict] = None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+            with self.attempts_lock:
+                self.attempts[query] += 1
+                attempt = self.attempts[query]
+            time.sleep(latency)
+            # Throttle a request once; its retry carries a different attempt count
+            if throttle and _share(f"{query}:{attempt}", "throttle") < throttle:
+                self._send(429, {"error": {"code": 429, "message": "Rate Limit Exceeded"}}, {"Retry-After": "1"})
+                return
+            if _share(query, "not-found") < not_found:
+                self._send(200, {"kind": "books#volumes", "totalItems": 0})
+                return
+            title = query.split("intitle:")[-1].split(" inauthor:")[0]
+            self._send(200, {
+                "kind": "books#volumes",
+                "totalItems": 1,
+                "items": [{"volumeInfo": {
+                    "title": title,
+                    "authors": ["Stub Author"],
+                    "publishedDate": str(1950 + int(_share(query, "year") * 70)),
+                    "description": f"Stub description of {title}.",
+                    "categories": ["Fiction"],
+                }}],
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main():
+    """Serve the stub until interrupted."""
+    parser = argparse.ArgumentParser(description="Stub Google Books volumes API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response")
+    parser.add_argument("--not-found", type=float, default=0.1, help="Share of queries with no result")
+    parser.add_argument("--throttle", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency, args.not_found, args.throttle))
+    print(f"Stub Google Books API on http://127.0.0.1:{args.port}/volumes")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Shared fixtures: every test runs against a fresh in-memory SQLite database."""
+import os
+
+# Configuration is read on import, so point it at SQLite before anything loads it
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["METADATA_CACHE_PATH"] = ""
+
+import pytest
+
+from TeacherLibrary.data.database import Base, get_engine, init_db, session_scope
+
+
+@pytest.fixture
+def db():
+    """Session on a freshly created schema, dropped again after the test."""
+    init_db()
+    with session_scope() as session:
+        yield session
+    Base.metadata.drop_all(get_engine())
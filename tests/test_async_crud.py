@@ -0,0 +1,80 @@
+"""Tests for AsyncCRUDBase on an in-memory aiosqlite database."""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from TeacherLibrary.config import Config
+from TeacherLibrary.data import database
+from TeacherLibrary.models.crud import async_book_crud
+
+
+@pytest.fixture(autouse=True)
+def fresh_async_engine(monkeypatch):
+    """Give every test its own in-memory aiosqlite engine, standing in for PostgreSQL."""
+    monkeypatch.setattr(database, "_async_engine", create_async_engine("sqlite+aiosqlite://"))
+    monkeypatch.setattr(database, "_async_session_factory", None)
+
+
+def _run(scenario):
+    """Run scenario(db) on a session from the async session factory, on a fresh schema."""
+    async def main():
+        await database.init_async_db()
+        try:
+            async with database.get_async_sessionmaker()() as db:
+                return await scenario(db)
+        finally:
+            await database.get_async_engine().dispose()
+
+    return asyncio.run(main())
+
+
+def test_sqlite_url_maps_to_aiosqlite(monkeypatch):
+    monkeypatch.setattr(Config, "DATABASE_URL", "sqlite://")
+    assert Config.get_async_database_url() == "sqlite+aiosqlite://"
+
+
+def test_create_and_get():
+    async def scenario(db):
+        book = await async_book_crud.create(db, {"title": "Holes", "author": "Louis Sachar", "total_count": 3})
+        fetched = await async_book_crud.get(db, book.id)
+        return book.id, fetched.title, fetched.total_count, await async_book_crud.get(db, book.id + 1)
+
+    book_id, title, total, missing = _run(scenario)
+    assert book_id == 1
+    assert (title, total) == ("Holes", 3)
+    assert missing is None
+
+
+def test_get_all_filters_and_sorts():
+    async def scenario(db):
+        for title, genre in [("Wonder", "Drama"), ("Holes", "Adventure"), ("Matilda", "Drama")]:
+            await async_book_crud.create(db, {"title": title, "genre": genre})
+        dramas = await async_book_crud.get_all(db, sort_by="title", genre="Drama")
+        page = await async_book_crud.get_all(db, skip=1, limit=1, sort_by="title")
+        found = await async_book_crud.get_all(db, search="hol")
+        return [b.title for b in dramas], [b.title for b in page], [b.title for b in found]
+
+    dramas, page, found = _run(scenario)
+    assert dramas == ["Matilda", "Wonder"]
+    assert page == ["Matilda"]
+    assert found == ["Holes"]
+
+
+def test_update_and_delete():
+    async def scenario(db):
+        book = await async_book_crud.create(db, {"title": "Holes"})
+        updated = await async_book_crud.update(db, book.id, {"author": "Louis Sachar"})
+        missing_update = await async_book_crud.update(db, book.id + 1, {"author": "Nobody"})
+        deleted = await async_book_crud.delete(db, book.id)
+        return (
+            updated.author, missing_update, deleted,
+            await async_book_crud.delete(db, book.id), await async_book_crud.get(db, book.id),
+        )
+
+    author, missing_update, deleted, deleted_again, after = _run(scenario)
+    assert author == "Louis Sachar"
+    assert missing_update is None
+    assert deleted is True
+    assert deleted_again is False
+    assert after is None
@@ -0,0 +1,59 @@
+"""Tests for the catalog change listener's local copy of the versions."""
+import threading
+import time
+
+from TeacherLibrary.data import catalog_version
+from TeacherLibrary.data.catalog_version import CatalogChangeListener
+from TeacherLibrary.models.crud import book_crud
+
+
+class InterleavedReads(dict):
+    """
+    Holds each thread's read until another thread has read too (or 0.2 s passed).
+
+    The thread named 'late' then writes last, so an unguarded read-then-write
+    would let its stale, lower version win.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.barrier = threading.Barrier(2)
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        try:
+            self.barrier.wait(timeout=0.2)
+        except threading.BrokenBarrierError:
+            pass
+        if threading.current_thread().name == "late":
+            time.sleep(0.05)
+        return value
+
+
+def test_local_commit_never_lowers_a_listened_version(db, monkeypatch):
+    listener = CatalogChangeListener(engine=None)
+    monkeypatch.setattr(catalog_version, "_listener", listener)
+    listener._apply("books", 5)
+
+    book_crud.create(db, {"title": "Holes"})  # Commits version 1
+    assert listener.versions["books"] == 5
+
+    db.info["pending_catalog_versions"] = {"books": 6}
+    db.commit()
+    assert listener.versions["books"] == 6
+
+
+def test_concurrent_updates_keep_the_highest_version():
+    listener = CatalogChangeListener(engine=None)
+    listener.versions = InterleavedReads()
+
+    threads = [
+        threading.Thread(target=listener._apply, args=("books", 10)),
+        threading.Thread(target=listener._apply, args=("books", 5), name="late"),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert listener.versions["books"] == 10
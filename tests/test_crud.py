@@ -0,0 +1,97 @@
+"""Tests for the CRUD writes, book checkout and the materials read model."""
+import pytest
+from sqlalchemy import event
+
+from TeacherLibrary.models.crud import book_crud, dvd_crud, materials_read_model
+
+
+def test_update_many_skips_only_rejected_rows(db):
+    book_crud.create_many(db, [{"title": title, "total_count": 2} for title in ("Holes", "Wonder", "Matilda")])
+    ids = [book.id for book in book_crud.get_all(db, sort_by="id")]
+
+    updated, errors = book_crud.update_many(db, [
+        {"id": ids[0], "author": "Louis Sachar"},
+        {"id": ids[1], "borrowed_count": 5},  # More than total_count: rejected by the check constraint
+        {"id": ids[2], "author": "Roald Dahl"},
+    ])
+
+    assert updated == 2
+    assert [index for index, _ in errors] == [1]
+    assert [book.author for book in book_crud.get_all(db, sort_by="id")] == ["Louis Sachar", None, "Roald Dahl"]
+
+
+def test_create_many_skips_only_rejected_rows(db):
+    inserted, errors = book_crud.create_many(db, [
+        {"title": "Holes", "book_number": 1},
+        {"title": "Wonder", "book_number": 1},  # Duplicate book number
+        {"title": "Matilda", "book_number": 2},
+    ])
+
+    assert inserted == 2
+    assert [index for index, _ in errors] == [1]
+    assert book_crud.count(db) == 2
+
+
+def test_materials_pages_merge_books_and_dvds_in_order(db):
+    book_crud.create_many(db, [{"title": title} for title in ("Holes", "Matilda", "Wonder")])
+    dvd_crud.create_many(db, [{"title": title, "director": "Unknown"} for title in ("Amelie", "Jaws")])
+
+    pages = [materials_read_model.get_all(db, skip=skip, limit=2, sort_by="title") for skip in (0, 2, 4)]
+
+    assert [row["title"] for rows, _ in pages for row in rows] == ["Amelie", "Holes", "Jaws", "Matilda", "Wonder"]
+    assert [total for _, total in pages] == [5, 5, 5]
+    assert materials_read_model.get_all(db, skip=0, limit=10, material_kind="dvd")[1] == 2
+
+
+def test_search_matches_within_a_single_column(db):
+    book_crud.create_many(db, [{"title": "Holes", "author": "Louis Sachar"}])
+
+    assert [book.title for book in book_crud.get_all(db, search="louis sach")] == ["Holes"]
+    assert book_crud.get_all(db, search="holes louis") == []
+    assert book_crud.get_all(db, search="holes\x1flouis") == []
+
+
+def test_checkout_and_return_stay_within_bounds(db):
+    book = book_crud.create(db, {"title": "Holes", "total_count": 2})
+
+    assert book_crud.checkout(db, book.id, 2) == 2
+    with pytest.raises(ValueError, match="only 0 available"):
+        book_crud.checkout(db, book.id)
+    assert book_crud.return_copies(db, book.id) == 1
+    with pytest.raises(ValueError, match="only 1 borrowed"):
+        book_crud.return_copies(db, book.id, 2)
+    assert book_crud.get(db, book.id).borrowed_count == 1
+
+
+def test_checkout_of_unknown_book_is_rejected(db):
+    with pytest.raises(ValueError, match="not found"):
+        book_crud.checkout(db, 999)
+
+
+def test_checkout_many_is_all_or_nothing(db):
+    book_crud.create_many(db, [{"title": "Holes", "total_count": 5}, {"title": "Wonder", "total_count": 1}])
+    holes, wonder = book_crud.get_all(db, sort_by="id")
+
+    with pytest.raises(ValueError, match="Wonder"):
+        book_crud.checkout_many(db, {holes.id: 3, wonder.id: 2})
+
+    assert [book.borrowed_count for book in book_crud.get_all(db, sort_by="id")] == [0, 0]
+    assert book_crud.checkout_many(db, {holes.id: 3, wonder.id: 1}) == {holes.id: 3, wonder.id: 1}
+
+
+def test_writes_reach_the_row_before_the_catalog_version(db):
+    book = book_crud.create(db, {"title": "Holes"})
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append("version" if "catalog_versions" in statement else statement.split()[0].upper())
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        book_crud.update(db, book.id, {"author": "Louis Sachar"})
+        book_crud.delete(db, book.id)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    writes = [statement for statement in statements if statement in ("UPDATE", "DELETE", "version")]
+    assert writes == ["UPDATE", "version", "DELETE", "version"]
@@ -0,0 +1,40 @@
+"""Tests for routing reads between the primary and a read replica."""
+from io import BytesIO
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from TeacherLibrary.data import database, export_cache
+from TeacherLibrary.data.catalog_version import get_catalog_version
+from TeacherLibrary.data.export_cache import ExportCache, cached_export
+from TeacherLibrary.data.make_dataset import diff_import
+from TeacherLibrary.models.crud import book_crud
+
+
+@pytest.fixture
+def lagging_replica(db, monkeypatch):
+    """A replica that has not caught up with any write to the primary."""
+    replica = create_engine("sqlite://", poolclass=StaticPool)
+    database.Base.metadata.create_all(replica)
+    monkeypatch.setattr(database, "get_replica_engine", lambda: replica)
+    yield replica
+    replica.dispose()
+
+
+def test_versions_and_the_data_behind_them_come_from_the_primary(db, lagging_replica, tmp_path, monkeypatch):
+    book_crud.create(db, {"book_number": 1, "title": "Holes"})
+    # In-memory SQLite has one connection; free it for the session under test
+    db.close()
+    monkeypatch.setattr(export_cache, "get_export_cache", lambda: ExportCache(tmp_path, max_bytes=10 ** 6))
+
+    with database.SessionLocal() as fresh:
+        # Plain reads do go to the replica
+        assert book_crud.count(fresh) == 0
+        assert get_catalog_version(fresh, "books") == 1
+
+        diff = diff_import(BytesIO(b"book_number,title\n1,Holes\n"), book_crud, fresh)
+        # Matched to the stored record, not listed as new
+        assert (diff["version"], diff["inserts"], len(diff["updates"])) == (1, [], 1)
+
+        assert "Holes" in cached_export(book_crud, fresh, "csv").read_text(encoding="utf-8-sig")
@@ -0,0 +1,36 @@
+"""Tests for the on-disk export cache."""
+from sqlalchemy import update
+
+from TeacherLibrary.data.export_cache import ExportCache, export_key
+from TeacherLibrary.models.schemas import DatabaseIdentity
+
+
+def _write(data: bytes):
+    return lambda output: output.write(data)
+
+
+def test_eviction_and_clear_leave_other_files_alone(tmp_path):
+    unrelated = tmp_path / "notes.txt"
+    unrelated.write_text("keep me")
+    in_flight = tmp_path / f"{'a' * 32}.xyz.tmp"
+    in_flight.write_bytes(b"partial")
+    cache = ExportCache(tmp_path, max_bytes=10)
+
+    first = cache.get_or_create("1" * 32, "csv", _write(b"12345678"))
+    cache.get_or_create("2" * 32, "csv", _write(b"12345678"))
+    assert not first.exists()
+    assert cache.evictions == 1
+
+    cache.clear()
+    assert unrelated.read_text() == "keep me"
+    assert in_flight.exists()
+    assert cache.snapshot()["files"] == 0
+
+
+def test_export_key_depends_on_database(db):
+    key = export_key(db, "books", "csv", {})
+    assert key == export_key(db, "books", "csv", {})
+
+    # A recreated database starts its catalog versions over, but gets a new id
+    db.execute(update(DatabaseIdentity).values(database_id="0" * 32))
+    assert export_key(db, "books", "csv", {}) != key
@@ -0,0 +1,48 @@
+"""Tests for the enrichment script."""
+import sqlite3
+
+from local.fill_missing_data import EnrichmentCheckpoint, fill_missing_book_data
+from TeacherLibrary.data.metadata_client import MetadataProvider
+from TeacherLibrary.models.crud import book_crud
+
+
+class TitleProvider(MetadataProvider):
+    """Knows every title except 'Unknown'."""
+
+    def volume_by_isbn(self, isbn):
+        return None
+
+    def volume_by_title(self, title, author=None):
+        if title == "Unknown":
+            return None
+        return {"title": title, "authors": ["Louis Sachar"], "publishedDate": "1998",
+                "description": f"About {title}.", "categories": ["Fiction"]}
+
+
+def test_checkpoint_leaves_other_tables_in_the_file_alone(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE outcomes (id INTEGER)")
+        conn.execute("INSERT INTO outcomes VALUES (1)")
+    conn.close()
+
+    checkpoint = EnrichmentCheckpoint(path, "db-1")
+    checkpoint.record([(7, 107, "not_found", None)])
+    checkpoint.close()
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT id FROM outcomes").fetchall() == [(1,)]
+        assert conn.execute("SELECT book_id, outcome FROM book_outcomes").fetchall() == [(7, "not_found")]
+    conn.close()
+
+
+def test_fill_reads_and_writes_on_one_in_memory_session(db):
+    book_crud.create_many(db, [{"title": title} for title in ("Holes", "Unknown", "Matilda")])
+    book_crud.create(db, {"title": "Wonder", "author": "R. J. Palacio", "description": "Auggie.",
+                          "genre": "Drama", "publication_year": 2012})
+
+    stats = fill_missing_book_data(db, dry_run=False, provider=TitleProvider(), workers=2, batch_size=2)
+
+    assert (stats["books_with_missing_data"], stats["books_updated"], stats["books_not_found"]) == (3, 2, 1)
+    books = {book.title: book for book in book_crud.get_all(db)}
+    assert [books[title].publication_year for title in ("Holes", "Unknown", "Matilda")] == [1998, None, 1998]
@@ -0,0 +1,17 @@
+"""Tests for the query and pool instrumentation."""
+import sqlite3
+
+from sqlalchemy.pool import StaticPool
+
+from TeacherLibrary.data.instrumentation import PoolStats
+
+
+def test_pool_snapshot_reports_pools_without_counters():
+    pool = StaticPool(lambda: sqlite3.connect(":memory:"))
+
+    snapshot = PoolStats().snapshot(pool)
+
+    assert snapshot["pool_size"] == 1
+    assert snapshot["checked_out"] == 0
+    assert snapshot["overflow"] == 0
+    assert snapshot["saturation"] == 0.0
@@ -0,0 +1,98 @@
+"""Tests for the diff-based re-import."""
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from TeacherLibrary.data.make_dataset import (
+    apply_import_diff, diff_import, export_records, load_processed_catalog, normalize_catalog, write_processed_catalog
+)
+from TeacherLibrary.models.crud import book_crud, dvd_crud
+
+
+def _csv(*lines: str) -> BytesIO:
+    return BytesIO("\n".join(lines).encode("utf-8"))
+
+
+def _seed_books(db):
+    file = _csv(
+        "book_number,title,author,publication_year",
+        "1,Holes,Louis Sachar,1998",
+        "2,Wonder,R. J. Palacio,2012",
+    )
+    apply_import_diff(book_crud, db, diff_import(file, book_crud, db))
+
+
+def test_diff_lists_inserts_updates_and_deletes(db):
+    _seed_books(db)
+    file = _csv(
+        "book_number,title,author,publication_year",
+        "1,Holes,Louis Sachar,1998",
+        "3,Matilda,Roald Dahl,1988",
+    )
+
+    diff = diff_import(file, book_crud, db, delete_missing=True)
+
+    assert diff["unchanged"] == 1
+    assert [row["book_number"] for row in diff["inserts"]] == [3]
+    assert [record["book_number"] for record in diff["deletes"]] == [2]
+    assert diff["errors"] == []
+
+
+def test_rejected_row_does_not_delete_its_record(db):
+    _seed_books(db)
+    file = _csv(
+        "book_number,title,author,publication_year",
+        "1,Holes,Louis Sachar,1998",
+        "2,Wonder,R. J. Palacio,20O2",
+    )
+
+    diff = diff_import(file, book_crud, db, delete_missing=True)
+    apply_import_diff(book_crud, db, diff)
+
+    assert diff["deletes"] == []
+    assert "Row 3: publication_year: not a number" in diff["errors"]
+    assert any(error.startswith("Deletions skipped") for error in diff["errors"])
+    assert book_crud.count(db) == 2
+
+
+def test_records_sharing_a_key_are_not_deleted(db):
+    dvd_crud.create_many(db, [
+        {"title": "Holes", "director": "Andrew Davis"},
+        {"title": "Holes", "director": "Andrew Davis"},
+        {"title": "Matilda", "director": "Danny DeVito"},
+    ])
+    file = _csv("title,director", "Holes,Andrew Davis")
+
+    diff = diff_import(file, dvd_crud, db, delete_missing=True)
+
+    assert [record["title"] for record in diff["deletes"]] == ["Matilda"]
+
+
+def test_reimporting_an_export_after_ingest_changes_nothing(db, tmp_path):
+    raw = pd.DataFrame(
+        {"book_number": [1, 2], "title": ["Holes", " Wonder "], "author": ["Louis Sachar", None],
+         "total_count": [3, 2], "borrowed_count": [1, None]},
+        index=[3, 4],
+    )
+    catalog, errors = normalize_catalog(raw)
+    assert errors == []
+    load_processed_catalog(db, write_processed_catalog(catalog, tmp_path / "books.csv"))
+
+    export = BytesIO(b"".join(export_records(book_crud, db, "csv")))
+    diff = diff_import(export, book_crud, db, delete_missing=True)
+
+    assert (diff["inserts"], diff["updates"], diff["deletes"]) == ([], [], [])
+    assert diff["unchanged"] == 2
+
+
+def test_diff_is_not_applied_over_a_later_write(db):
+    _seed_books(db)
+    diff = diff_import(_csv("book_number,title", "1,Holes", "3,Matilda"), book_crud, db)
+    book_crud.create(db, {"book_number": 4, "title": "Wonder"})
+
+    with pytest.raises(ValueError, match="changed since version"):
+        apply_import_diff(book_crud, db, diff)
+
+    assert book_crud.count(db) == 3
+    assert book_crud.get_all(db, book_number=1)[0].author == "Louis Sachar"
@@ -0,0 +1,68 @@
+"""Tests for the metadata provider chain."""
+import pytest
+import requests
+
+from TeacherLibrary.data.metadata_client import ChainProvider, MetadataProvider
+
+
+class FakeProvider(MetadataProvider):
+    """Answers every title lookup with a fixed volume (or error) and counts calls."""
+
+    def __init__(self, name, volume=None, error=None):
+        self.name = name
+        self.volume = volume
+        self.error = error
+        self.calls = 0
+
+    def volume_by_isbn(self, isbn):
+        return self.volume_by_title(isbn)
+
+    def volume_by_title(self, title, author=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.volume
+
+
+COMPLETE = {"title": "Holes", "authors": ["Louis Sachar"], "publishedDate": "1998",
+            "description": "Stanley digs holes.", "categories": ["Fiction"]}
+
+
+def test_complete_local_answer_stays_local():
+    local, google = FakeProvider("local", COMPLETE), FakeProvider("google", {"title": "Other"})
+
+    assert ChainProvider([local, google]).volume_by_title("Holes") == COMPLETE
+    assert google.calls == 0
+
+
+def test_later_provider_fills_only_missing_fields():
+    local = FakeProvider("local", {"title": "Holes", "authors": ["Louis Sachar"], "publishedDate": "1998",
+                                   "categories": []})
+    google = FakeProvider("google", {**COMPLETE, "authors": ["Someone Else"], "publishedDate": "2000"})
+
+    volume = ChainProvider([local, google]).volume_by_isbn("9780440414803")
+
+    assert volume["authors"] == ["Louis Sachar"]
+    assert volume["publishedDate"] == "1998"
+    assert volume["description"] == "Stanley digs holes."
+    assert volume["categories"] == ["Fiction"]
+
+
+def test_failing_provider_keeps_partial_answer_and_raises_without_one():
+    partial = {"title": "Holes"}
+    error = requests.ConnectionError("offline")
+
+    assert ChainProvider([FakeProvider("local", partial), FakeProvider("google", error=error)]).volume_by_title(
+        "Holes"
+    ) == partial
+    with pytest.raises(requests.ConnectionError):
+        ChainProvider([FakeProvider("local"), FakeProvider("google", error=error)]).volume_by_title("Holes")
+
+
+def test_provider_must_implement_both_lookups():
+    class TitleOnlyProvider(MetadataProvider):
+        def volume_by_title(self, title, author=None):
+            return None
+
+    with pytest.raises(TypeError):
+        TitleOnlyProvider()
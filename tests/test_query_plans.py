@@ -0,0 +1,155 @@
+"""
+Query plan regression checks for the list and search queries.
+
+Seeds books and DVDs into a scratch schema of the PostgreSQL database in
+TEST_POSTGRES_URL, runs the real queries emitted by `CRUDBase.get_all` and
+`MaterialsReadModel.get_all`, and asserts via EXPLAIN that every page query
+is answered from an index with no sequential scan. Separate total-count
+queries are not checked: an exact count over an unfiltered table reads it
+all by nature. Skipped when TEST_POSTGRES_URL is not set; the seed data is
+rolled back afterwards.
+"""
+import json
+import os
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from TeacherLibrary.config import Config
+from TeacherLibrary.data.database import Base
+from TeacherLibrary.models.crud import book_crud, dvd_crud, materials_read_model
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+SCHEMA = "plan_check"
+BOOKS = 50000
+DVDS = 20000
+GENRES = [f"Genre {i}" for i in range(40)]
+GENRE = GENRES[3]
+
+
+def _cases():
+    """(name, query) pairs for every list query shape, query taking a session."""
+    for crud, creator in ((book_crud, "author"), (dvd_crud, "director")):
+        table = crud.model.__tablename__
+        for sort_by in ("title", creator, "publication_year"):
+            yield f"{table}: sort by {sort_by}", lambda db, crud=crud, sort_by=sort_by: crud.get_all(
+                db, limit=50, sort_by=sort_by
+            )
+            yield f"{table}: genre filter, sort by {sort_by}", lambda db, crud=crud, sort_by=sort_by: crud.get_all(
+                db, limit=50, sort_by=sort_by, genre=GENRE
+            )
+    yield "materials: sort by title", lambda db: materials_read_model.get_all(db, limit=50, sort_by="title")
+    yield "materials: genre filter, sort by title", lambda db: materials_read_model.get_all(
+        db, limit=50, sort_by="title", genre=GENRE
+    )
+
+
+SEARCH_CASES = [
+    ("books: text search", lambda db: book_crud.get_all(db, limit=50, search="f00d")),
+    ("materials: text search", lambda db: materials_read_model.get_all(db, limit=50, search="f00d")),
+]
+
+
+@contextmanager
+def captured_statements(conn):
+    """Record every (statement, parameters) executed on a connection."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(conn, "before_cursor_execute", capture)
+
+
+def seed(conn, books: int, dvds: int):
+    """Create the schema in SCHEMA and fill it with synthetic rows."""
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(conn)
+
+    genre_array = "ARRAY[" + ", ".join(f"'{g}'" for g in GENRES) + "]"
+    # Roughly 10% of rows have no genre, the rest are spread over GENRES
+    genre_expr = f"CASE WHEN i % 10 = 0 THEN NULL ELSE ({genre_array})[1 + (i * 7919) % {len(GENRES)}] END"
+    conn.execute(text(
+        f"INSERT INTO {SCHEMA}.books (book_number, title, author, borrowed_count, total_count, "
+        "publication_year, genre, description) "
+        f"SELECT i, 'Title ' || md5(i::text), 'Author ' || (i % 5000), 0, 5, "
+        f"1900 + i % 120, {genre_expr}, repeat('lorem ipsum ', 10) "
+        f"FROM generate_series(1, {books}) AS i"
+    ))
+    conn.execute(text(
+        f"INSERT INTO {SCHEMA}.dvds (title, director, publication_year, genre) "
+        f"SELECT 'Film ' || md5(i::text), 'Director ' || (i % 2000), 1950 + i % 70, {genre_expr} "
+        f"FROM generate_series(1, {dvds}) AS i"
+    ))
+    conn.execute(text(f"ANALYZE {SCHEMA}.books"))
+    conn.execute(text(f"ANALYZE {SCHEMA}.dvds"))
+
+
+def plan_nodes(plan: dict):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+@pytest.fixture(scope="module")
+def plan_conn():
+    """Connection to the seeded scratch schema, rolled back after the module."""
+    engine = create_engine(Config.with_driver(POSTGRES_URL))
+    # Render every model table into the scratch schema
+    conn = engine.connect().execution_options(schema_translate_map={None: SCHEMA})
+    trans = conn.begin()
+    try:
+        seed(conn, BOOKS, DVDS)
+        yield conn
+    finally:
+        trans.rollback()
+        conn.close()
+        engine.dispose()
+
+
+def assert_page_queries_use_indexes(conn, run_query):
+    """Run a query and assert that every page query it emitted plans index scans only."""
+    with captured_statements(conn) as statements:
+        run_query(Session(bind=conn))
+
+    pages = [(statement, parameters) for statement, parameters in statements if "LIMIT" in statement]
+    assert pages, "no page query was emitted"
+    for statement, parameters in pages:
+        cursor = conn.connection.driver_connection.cursor()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = list(plan_nodes(plan[0]["Plan"]))
+
+        seq_scans = [n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"]
+        index_scans = [n.get("Index Name", "") for n in nodes if "Index" in n["Node Type"]]
+        assert not seq_scans, f"sequential scan on {', '.join(seq_scans)}"
+        assert index_scans, "no index scan"
+
+
+@pytest.mark.parametrize("run_query", [pytest.param(query, id=name) for name, query in _cases()])
+def test_list_query_uses_indexes(plan_conn, run_query):
+    assert_page_queries_use_indexes(plan_conn, run_query)
+
+
+@pytest.mark.parametrize("run_query", [pytest.param(query, id=name) for name, query in SEARCH_CASES])
+def test_text_search_uses_trigram_index(plan_conn, run_query):
+    trigram_indexed = plan_conn.execute(
+        text("SELECT 1 FROM pg_indexes WHERE schemaname = :schema AND indexname = 'ix_books_search_trgm'"),
+        {"schema": SCHEMA},
+    ).first()
+    if not trigram_indexed:
+        pytest.skip("pg_trgm is not installed on this server")
+    assert_page_queries_use_indexes(plan_conn, run_query)